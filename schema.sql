@@ -28,7 +28,8 @@ CREATE TABLE IF NOT EXISTS shops (
     checked_by VARCHAR(255) COMMENT '確認者',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    deleted_at TIMESTAMP NULL
+    deleted_at TIMESTAMP NULL,
+    KEY idx_shops_lookup (shop_name, is_online, category)
 );
 
 -- exchangeable_rewards table
@@ -40,7 +41,8 @@ CREATE TABLE IF NOT EXISTS m_exchangeable_rewards (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     deleted_at TIMESTAMP NULL,
-    UNIQUE KEY unique_exchangeable_reward (category, reward_name)
+    UNIQUE KEY unique_exchangeable_reward (category, reward_name),
+    KEY idx_exchangeable_rewards_lookup (category, reward_name, unit)
 );
 
 -- レコメンドタグマスタテーブル
@@ -108,7 +110,8 @@ CREATE TABLE IF NOT EXISTS card_recommend_tags (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     deleted_at TIMESTAMP NULL,
     FOREIGN KEY (card_id) REFERENCES cards(id),
-    FOREIGN KEY (recommend_tag_id) REFERENCES m_recommend_tags(id)
+    FOREIGN KEY (recommend_tag_id) REFERENCES m_recommend_tags(id),
+    UNIQUE KEY unique_card_recommend_tag (card_id, recommend_tag_id)
 );
 
 -- ポイント報酬関連テーブル（cards, shopsを参照）
@@ -120,6 +123,7 @@ CREATE TABLE IF NOT EXISTS point_rewards (
     spending_amount INT NOT NULL COMMENT '利用金額',
     given_points INT NOT NULL COMMENT '付与ポイント',
     remarks TEXT COMMENT '備考',
+    from_kakaku BOOLEAN DEFAULT FALSE NOT NULL COMMENT '価格.com由来フラグ',
     evidence TEXT,
     is_checked BOOLEAN,
     is_completed BOOLEAN,
@@ -127,7 +131,9 @@ CREATE TABLE IF NOT EXISTS point_rewards (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     deleted_at TIMESTAMP NULL,
     FOREIGN KEY (card_id) REFERENCES cards(id),
-    FOREIGN KEY (shop_id) REFERENCES shops(id)
+    FOREIGN KEY (shop_id) REFERENCES shops(id),
+    UNIQUE KEY unique_point_reward (card_id, shop_id),
+    KEY idx_point_rewards_card (card_id, deleted_at)
 );
 
 -- point_reward_conditions table
@@ -187,20 +193,31 @@ CREATE TABLE IF NOT EXISTS point_exchanges (
     UNIQUE KEY unique_point_exchange (card_id, exchangeable_reward_id)
 );
 
+-- 付帯保険・付帯サービスで繰り返し出現する文字列（本文のハッシュで1行にまとめる）
+-- text_dictionary table
+CREATE TABLE IF NOT EXISTS text_dictionary (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    content_hash CHAR(40) NOT NULL UNIQUE COMMENT '本文のSHA-1',
+    content TEXT NOT NULL COMMENT '本文',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- 付帯保険関連テーブル（cardsを参照）
 -- include_insurance table
 CREATE TABLE IF NOT EXISTS card_include_insurances (
     id INT AUTO_INCREMENT PRIMARY KEY,
     card_id INT NOT NULL,
-    category VARCHAR(255) NOT NULL COMMENT 'カテゴリ',
+    category_id BIGINT NOT NULL COMMENT 'カテゴリ（text_dictionary.id）',
     coverage_type VARCHAR(255) NOT NULL COMMENT '保険タイプ',
-    coverage_amount VARCHAR(255) NOT NULL COMMENT '保険金額',
+    coverage_amount_id BIGINT NOT NULL COMMENT '保険金額（text_dictionary.id）',
     remarks TEXT COMMENT '備考',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     deleted_at TIMESTAMP NULL,
     FOREIGN KEY (card_id) REFERENCES cards(id),
-    UNIQUE KEY unique_include_insurance (card_id, category, coverage_type)
+    CONSTRAINT fk_include_insurance_category FOREIGN KEY (category_id) REFERENCES text_dictionary(id),
+    CONSTRAINT fk_include_insurance_coverage_amount FOREIGN KEY (coverage_amount_id) REFERENCES text_dictionary(id),
+    UNIQUE KEY unique_include_insurance (card_id, category_id, coverage_type)
 );
 
 -- 付帯サービス関連テーブル（cardsを参照）
@@ -209,12 +226,13 @@ CREATE TABLE IF NOT EXISTS card_include_services (
     id INT AUTO_INCREMENT PRIMARY KEY,
     card_id INT NOT NULL,
     service_name VARCHAR(255) NOT NULL COMMENT 'サービス名',
-    service_content TEXT NOT NULL COMMENT 'サービス内容',
+    service_content_id BIGINT NOT NULL COMMENT 'サービス内容（text_dictionary.id）',
     remarks TEXT COMMENT '備考',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     deleted_at TIMESTAMP NULL,
     FOREIGN KEY (card_id) REFERENCES cards(id),
+    CONSTRAINT fk_include_service_content FOREIGN KEY (service_content_id) REFERENCES text_dictionary(id),
     UNIQUE KEY unique_include_service (card_id, service_name)
 );
 
@@ -232,6 +250,18 @@ CREATE TABLE IF NOT EXISTS shop_domains (
     FOREIGN KEY (shop_id) REFERENCES shops(id)
 );
 
+-- ショップの統合履歴（統合した旧ショップ→残したショップ。旧名は索引で統合先に解決する）
+-- shop_merges table
+CREATE TABLE IF NOT EXISTS shop_merges (
+    old_shop_id INT PRIMARY KEY,
+    new_shop_id INT NOT NULL,
+    old_shop_name VARCHAR(255) NOT NULL COMMENT '統合前のショップ名',
+    merged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (old_shop_id) REFERENCES shops(id),
+    FOREIGN KEY (new_shop_id) REFERENCES shops(id),
+    KEY idx_shop_merges_new (new_shop_id)
+);
+
 -- 年間ボーナス関連テーブル（cardsを参照）
 -- annual_bonus table
 CREATE TABLE IF NOT EXISTS card_annual_bonuses (
@@ -247,3 +277,198 @@ CREATE TABLE IF NOT EXISTS card_annual_bonuses (
     deleted_at TIMESTAMP NULL,
     FOREIGN KEY (card_id) REFERENCES cards(id)
 );
+
+-- クロールキュー（複数ノードでの分散クロール用）
+-- crawl_queue table
+CREATE TABLE IF NOT EXISTS crawl_queue (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL COMMENT 'クロール実行ID',
+    url VARCHAR(512) NOT NULL COMMENT 'カード詳細ページURL',
+    status VARCHAR(20) DEFAULT 'pending' NOT NULL COMMENT '状態（pending/leased/done/failed）',
+    lease_owner VARCHAR(255) COMMENT 'リース保持ノード',
+    lease_expires_at TIMESTAMP NULL COMMENT 'リース有効期限',
+    attempts INT DEFAULT 0 NOT NULL COMMENT '試行回数',
+    last_error TEXT COMMENT '最終エラー',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_crawl_queue (run_id, url),
+    KEY idx_crawl_queue_claim (run_id, status, lease_expires_at)
+);
+
+-- カードごとの再取得統計（差分更新のスケジューリング用）
+-- card_refresh_stats table
+CREATE TABLE IF NOT EXISTS card_refresh_stats (
+    kakaku_card_id VARCHAR(50) PRIMARY KEY COMMENT '価格.comのカードID',
+    ranking_position INT COMMENT '直近のランキング順位',
+    last_seen_at TIMESTAMP NULL COMMENT 'ランキングで最後に見つけた日時',
+    last_scraped_at TIMESTAMP NULL COMMENT '最終取得日時',
+    last_changed_at TIMESTAMP NULL COMMENT '内容が最後に変化した日時',
+    content_hash CHAR(40) COMMENT '取得内容のハッシュ',
+    scrape_count INT DEFAULT 0 NOT NULL COMMENT '取得回数',
+    change_count INT DEFAULT 0 NOT NULL COMMENT '内容の変化回数',
+    avg_scrape_seconds FLOAT COMMENT '1枚あたりの平均取得秒数',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- 項目単位の変更履歴（cardsと子テーブルの差分のみ保存）
+-- card_field_changes table
+CREATE TABLE IF NOT EXISTS card_field_changes (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    card_id INT NOT NULL,
+    entity VARCHAR(32) NOT NULL COMMENT '対象テーブル',
+    entity_key VARCHAR(512) NOT NULL DEFAULT '' COMMENT '子テーブルの行キー',
+    field_name VARCHAR(64) NOT NULL COMMENT '項目名（行の追加・削除は__row__）',
+    old_value TEXT COMMENT '変更前の値',
+    new_value TEXT COMMENT '変更後の値',
+    run_id VARCHAR(64) COMMENT '実行ID',
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    KEY idx_card_field_changes (card_id, changed_at),
+    KEY idx_card_field_changes_field (card_id, field_name, changed_at)
+);
+
+-- カード画像（MinIOに保存した画像の管理）
+-- card_images table
+CREATE TABLE IF NOT EXISTS card_images (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    card_id INT NOT NULL,
+    source_url VARCHAR(512) NOT NULL COMMENT '取得元URL',
+    etag VARCHAR(255) COMMENT '取得元のETag',
+    last_modified VARCHAR(255) COMMENT '取得元のLast-Modified',
+    content_hash CHAR(64) COMMENT '画像のSHA-256',
+    object_key VARCHAR(255) COMMENT '画像のオブジェクトキー',
+    thumbnail_key VARCHAR(255) COMMENT 'サムネイルのオブジェクトキー',
+    content_type VARCHAR(100) COMMENT 'Content-Type',
+    size_bytes INT COMMENT 'サイズ（バイト）',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    deleted_at TIMESTAMP NULL,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    UNIQUE KEY unique_card_image (card_id, source_url),
+    KEY idx_card_images_hash (content_hash)
+);
+
+-- 全文検索用の文書テーブル（カード名・備考・付帯サービス・付帯保険をまとめたもの）
+-- card_search_documents table
+CREATE TABLE IF NOT EXISTS card_search_documents (
+    card_id INT PRIMARY KEY,
+    card_name VARCHAR(255) NOT NULL COMMENT 'カード名（NFKC正規化済み）',
+    body MEDIUMTEXT NOT NULL COMMENT '検索対象本文（NFKC正規化済み）',
+    content_hash CHAR(40) NOT NULL COMMENT '文書のハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    FULLTEXT KEY ft_card_search (card_name, body) WITH PARSER ngram
+);
+
+-- 類似カード検索用の特徴ベクトル（国際ブランド・年会費・利用枠・ポイント・交換先・保険・サービス）
+-- card_feature_vectors table
+CREATE TABLE IF NOT EXISTS card_feature_vectors (
+    card_id INT PRIMARY KEY,
+    annual_fee INT COMMENT '年会費（円、年会費の原文から抽出）',
+    vector BLOB NOT NULL COMMENT '特徴ベクトル（float32の配列）',
+    content_hash CHAR(40) NOT NULL COMMENT 'ベクトルのハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id)
+);
+
+-- ポイント交換のグラフから求めた最良の円換算額（ポイント交換の行が変わったときだけ再計算）
+-- point_exchange_values table
+CREATE TABLE IF NOT EXISTS point_exchange_values (
+    point_id INT PRIMARY KEY,
+    yen_per_point DOUBLE NOT NULL COMMENT '1ポイントあたりの最良の円換算額',
+    best_reward_id INT NOT NULL COMMENT '経路の終点の交換先',
+    path TEXT NOT NULL COMMENT '交換経路',
+    graph_hash CHAR(40) NOT NULL COMMENT '計算に使った入力のハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (point_id) REFERENCES m_points(id),
+    FOREIGN KEY (best_reward_id) REFERENCES m_exchangeable_rewards(id)
+);
+
+-- card_exchange_values table
+CREATE TABLE IF NOT EXISTS card_exchange_values (
+    card_id INT PRIMARY KEY,
+    yen_per_point DOUBLE NOT NULL COMMENT '1ポイントあたりの最良の円換算額',
+    best_reward_id INT NOT NULL COMMENT '経路の終点の交換先',
+    path TEXT NOT NULL COMMENT '交換経路',
+    graph_hash CHAR(40) NOT NULL COMMENT '計算に使った入力のハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    FOREIGN KEY (best_reward_id) REFERENCES m_exchangeable_rewards(id)
+);
+
+-- 実行記録（1回の実行の件数・スループットと、カード1枚ごとの結果・処理段階ごとの所要時間）
+-- scrape_runs table
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL COMMENT '実行ID（変更履歴・クロールキューのrun_idと同じ）',
+    command VARCHAR(32) NOT NULL COMMENT 'サブコマンド',
+    owner VARCHAR(255) NOT NULL COMMENT '実行ノード（ホスト名:プロセスID）',
+    status VARCHAR(20) DEFAULT 'running' NOT NULL COMMENT '状態（running/completed/failed）',
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '開始日時',
+    finished_at TIMESTAMP NULL COMMENT '終了日時',
+    cards_ok INT DEFAULT 0 NOT NULL COMMENT '成功したカード数',
+    cards_failed INT DEFAULT 0 NOT NULL COMMENT '失敗したカード数',
+    retries INT DEFAULT 0 NOT NULL COMMENT '再試行回数の合計',
+    elapsed_seconds FLOAT COMMENT '所要時間（秒）',
+    cards_per_minute FLOAT COMMENT 'スループット（枚/分）',
+    KEY idx_scrape_runs_command (command, finished_at),
+    KEY idx_scrape_runs_run_id (run_id)
+);
+
+-- scrape_run_items table
+CREATE TABLE IF NOT EXISTS scrape_run_items (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    scrape_run_id INT NOT NULL,
+    kakaku_card_id VARCHAR(50) NOT NULL COMMENT '価格.comのカードID',
+    url VARCHAR(512) NOT NULL COMMENT 'カード詳細ページURL',
+    status VARCHAR(20) NOT NULL COMMENT '結果（ok/failed）',
+    fetch_seconds FLOAT NOT NULL COMMENT '詳細ページの読み込みとカード項目の取得（秒）',
+    parse_seconds FLOAT NOT NULL COMMENT '還元率・交換・保険・サービスの表の読み取り（秒）',
+    db_seconds FLOAT NOT NULL COMMENT '保存と変更履歴の記録（秒）',
+    total_seconds FLOAT NOT NULL COMMENT '1枚の合計（秒）',
+    retries INT DEFAULT 0 NOT NULL COMMENT '再試行回数',
+    error_class VARCHAR(255) COMMENT '例外のクラス名',
+    error_message TEXT COMMENT 'エラーメッセージ',
+    browser_profile VARCHAR(10) DEFAULT 'none' NOT NULL COMMENT 'ブラウザプロファイルの状態（none/cold/warm）',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (scrape_run_id) REFERENCES scrape_runs(id),
+    KEY idx_scrape_run_items_run (scrape_run_id, total_seconds),
+    KEY idx_scrape_run_items_card (kakaku_card_id, status)
+);
+
+-- 絞り込み検索用に、カードごとに求めた(属性, 値)（内容が変わったカードだけ求め直す）
+-- card_facets table
+CREATE TABLE IF NOT EXISTS card_facets (
+    card_id INT PRIMARY KEY,
+    facet_keys TEXT NOT NULL COMMENT '属性=値 の改行区切り（掲載終了したカードは空）',
+    content_hash CHAR(40) NOT NULL COMMENT 'facet_keysのハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id)
+);
+
+-- (属性, 値)ごとのカードIDのビットマップ（国際ブランド・発行会社・ポイント・タグ・追加機能）
+-- card_facet_bitmaps table
+CREATE TABLE IF NOT EXISTS card_facet_bitmaps (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    facet VARCHAR(50) NOT NULL COMMENT '属性（brand/issuer/point/tag/feature/all）',
+    facet_value VARCHAR(255) NOT NULL COMMENT '値',
+    bitmap BLOB NOT NULL COMMENT 'カードID番目のビットを立てたビット列（zlib圧縮）',
+    cardinality INT NOT NULL COMMENT 'カード数',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_card_facet_bitmap (facet, facet_value)
+);
+
+-- ホストごとのリクエストレート（分散クロールの全ワーカーで共有するトークンバケット）
+-- host_rate_limits table
+CREATE TABLE IF NOT EXISTS host_rate_limits (
+    host VARCHAR(255) PRIMARY KEY,
+    rate DOUBLE NOT NULL COMMENT '全ワーカー合計のリクエストレート（件/秒）',
+    next_slot_at DOUBLE NOT NULL DEFAULT 0 COMMENT '次のリクエストを送れる時刻（UNIX時刻・秒）',
+    rate_updated_at DOUBLE NOT NULL DEFAULT 0 COMMENT 'レートを最後に変更した時刻（UNIX時刻・秒）'
+);
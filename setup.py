@@ -15,6 +15,9 @@ setup(
         "gspread",
         "python-dotenv",
         "tenacity",
+        "minio",
+        "Pillow",
+        "numpy",
     ],
     python_requires=">=3.8",
 ) 
\ No newline at end of file
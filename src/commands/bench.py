@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import json
+import statistics
+import subprocess
+from typing import Dict, Any, List
+
+# サブコマンドごとに読み込まれるモジュール（main.COMMANDSと対応）
+STARTUP_TARGETS = {
+    "cli": None,
+    "discover": "commands.discover",
+    "scrape": "commands.scrape",
+    "scrape-ids": "commands.scrape_ids",
+    "export": "commands.export",
+    "sheets": "commands.sheets",
+    "replay": "commands.replay",
+    "refresh": "commands.refresh",
+    "history": "commands.history",
+    "images": "commands.images",
+    "search": "commands.search",
+    "similar": "commands.similar",
+    "tags": "commands.tags",
+    "shops": "commands.shops",
+    "exchanges": "commands.exchanges",
+    "facets": "commands.facets",
+    "runs": "commands.runs",
+    "fixture-server": "commands.fixture_server",
+    "migrate": "commands.migrate",
+}
+
+
+def measure_startup(module: str, repeat: int) -> List[float]:
+    """新しいPythonプロセスでCLIとサブコマンドのモジュールを読み込むまでの時間を計測"""
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import main"
+    if module:
+        code += f"; import importlib; importlib.import_module({module!r})"
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=src_dir, check=True)
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """起動時間またはクエリ性能を計測"""
+    if args.suite == "queries" or (args.suite in ("storage", "writes") and "mysql" in args.backends):
+        from services.query_benchmark import check_bench_database
+
+        try:
+            check_bench_database(args.database)
+        except ValueError as e:
+            raise SystemExit(str(e))
+    if args.suite == "queries":
+        run_queries(args)
+    elif args.suite == "storage":
+        run_storage(args)
+    elif args.suite == "records":
+        run_records(args)
+    elif args.suite == "writes":
+        run_writes(args)
+    elif args.suite == "exchanges":
+        run_exchanges(args)
+    elif args.suite == "facets":
+        run_facets(args)
+    else:
+        run_startup(args)
+
+
+def run_startup(args) -> None:
+    """サブコマンドごとの起動時間を計測"""
+    results = {}
+    for name, module in STARTUP_TARGETS.items():
+        timings = measure_startup(module, args.repeat or 5)
+        results[name] = {
+            "median_ms": statistics.median(timings) * 1000,
+            "min_ms": min(timings) * 1000,
+            "max_ms": max(timings) * 1000,
+        }
+        print(f"{name:<12} median={results[name]['median_ms']:.1f}ms min={results[name]['min_ms']:.1f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"startup": results}, f, indent=2)
+
+
+def run_queries(args) -> None:
+    """ベンチマーク用DBで検索クエリのレイテンシと実行計画を計測し、ベースラインと比較"""
+    from services.query_benchmark import run_query_benchmark, compare_with_baseline
+
+    result = run_query_benchmark(args.database, scale=args.scale, repeat=args.repeat or 200)
+    print(f"ダミーデータ: {result['rows']}")
+    for name, query in result["queries"].items():
+        plan = ", ".join(f"{step['table']}:{step['type']}({step['key']})" for step in query["plan"])
+        print(f"{name:<28} p50={query['p50_ms']:.2f}ms p95={query['p95_ms']:.2f}ms {plan}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"性能劣化: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+def run_storage(args) -> None:
+    """MySQLとSQLiteで同じスクレイピング相当の書き込みとエクスポートの速度を比較"""
+    from services.storage_benchmark import compare_backends
+
+    results = compare_backends(args.backends, args.database, cards=args.cards or 300)
+    for name, result in results.items():
+        print(
+            f"{name:<28} 新規 {result['insert']['cards_per_sec']:.1f}枚/秒 (p95={result['insert']['p95_ms']:.1f}ms) "
+            f"再取得 {result['update']['cards_per_sec']:.1f}枚/秒 (p95={result['update']['p95_ms']:.1f}ms) "
+            f"書き出し {result['export']['rows']}行 {result['export']['ms']:.1f}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"storage": results}, f, indent=2, ensure_ascii=False)
+
+
+def run_records(args) -> None:
+    """カード1枚分のデータを辞書とレコードで保持したときのメモリと変換時間を比較"""
+    from services.record_benchmark import run_record_benchmark
+
+    result = run_record_benchmark(cards=args.cards or 2000, repeat=args.repeat or 5)
+    for name in ("memory_bytes_per_card", "build_ms", "to_params_ms"):
+        print(f"{name:<24} dict={result[name]['dict']:.1f} record={result[name]['record']:.1f}")
+    print(f"{'batch_ms':<24} from_records={result['batch_ms']['from_records']:.1f} to_params={result['batch_ms']['to_params']:.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"records": result}, f, indent=2)
+
+
+def run_writes(args) -> None:
+    """同時に書き込むライター数を変えて、DatabaseHandlerの書き込みスループットを計測"""
+    from services.write_benchmark import run_write_benchmark
+
+    result = run_write_benchmark(args.backends, args.database, args.writers, cards=args.cards or 100)
+    for backend, levels in result["backends"].items():
+        for level in levels:
+            print(
+                f"{backend:<8} writers={level['writers']:<3} {level['ops_per_sec']:.0f}ops/秒 "
+                f"{level['cards_per_sec']:.1f}枚/秒 p50={level['latency']['p50_ms']:.2f}ms p99={level['latency']['p99_ms']:.2f}ms "
+                f"commits={level['commits']} deadlocks={level['deadlocks']} busy={level['busy']} failed={level['failed_ops']}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"writes": result}, f, indent=2, ensure_ascii=False)
+
+
+def run_exchanges(args) -> None:
+    """全カード分のポイント交換グラフの構築と、最良の円換算額の経路の計算時間を計測"""
+    from services.exchange_benchmark import run_exchange_benchmark
+
+    result = run_exchange_benchmark(cards=args.cards or 2000, repeat=args.repeat or 5)
+    print(f"{result['cards']}枚 / 頂点{result['nodes']} / 辺{result['edges']} / 最長経路{result['max_path_length']}辺")
+    for name in ("build_ms", "solve_ms", "card_values_ms"):
+        print(f"{name:<16} {result[name]:.1f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"exchanges": result}, f, indent=2)
+
+
+def run_facets(args) -> None:
+    """ダミーのカードのビットマップで、条件式の絞り込みと属性ごとの件数の計算時間を計測"""
+    from services.facet_benchmark import run_facet_benchmark
+
+    result = run_facet_benchmark(cards=args.cards or 5000, repeat=args.repeat or 200)
+    print(f"{result['cards']}枚 / ビットマップ{result['bitmaps']}件 / 圧縮後{result['compressed_bytes']:,}バイト")
+    for query in result["queries"]:
+        print(f"{query['filter_us']:>8.1f}µs {query['counts_us']:>8.1f}µs {query['matches']:>6}枚  {query['expression']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"facets": result}, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,34 @@
+import sys
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.crawl_queue import CrawlQueue
+from services.card_scraper import CardScraper
+from services.url_discovery import RankingDiscovery
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """ランキングページからカード詳細URLを取得
+
+    URLは1ページ読み終えるごとに書き出す（途中で失敗してもそれまでのURLは残る）。
+    """
+    db_handler = create_database_handler()
+    scraper = CardScraper(db_handler)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        discovery = RankingDiscovery(
+            scraper, db_handler, config["base_url"], max_pages=args.max_pages or config["max_pages"]
+        )
+        for page_urls in discovery.pages():
+            output.writelines(f"{url}\n" for url in page_urls)
+            output.flush()
+        print(discovery.describe())
+
+        # 分散クロール用のキューに登録
+        if args.enqueue:
+            CrawlQueue(db_handler, args.enqueue).enqueue(discovery.urls)
+            print(f"キューに登録しました: {len(discovery.urls)}件 (run_id={args.enqueue})")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        scraper.close()
+        db_handler.close()
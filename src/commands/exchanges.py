@@ -0,0 +1,24 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.exchange_values import ExchangeValueStore
+from services.exchange_graph import ExchangeValueEngine, describe
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """ポイント交換のグラフから、ポイント・カードごとの最良の円換算額と交換経路を計算して表示"""
+    db_handler = create_database_handler()
+    try:
+        print(describe(ExchangeValueEngine(db_handler).refresh(force=args.rebuild)))
+        store = ExchangeValueStore(db_handler)
+        if args.kakaku_card_id:
+            card_id = db_handler.get_card_id(args.kakaku_card_id)
+            value = store.get_card_value(card_id) if card_id is not None else None
+            if value is None:
+                print(f"交換価値が見つかりません: {args.kakaku_card_id}")
+                return
+            print(f"{value['yen_per_point']:.3f}円/ポイント\t{value['path']}")
+            return
+        for program in store.top_programs(args.limit):
+            print(f"{program['yen_per_point']:.3f}円/ポイント\t{program['point_name']}\t{program['path']}")
+    finally:
+        db_handler.close()
@@ -0,0 +1,39 @@
+import os
+import csv
+import json
+from typing import Dict, Any, List
+from models.database import create_database_handler
+
+
+EXPORTERS = {
+    "cards": "get_all_cards",
+    "point_rewards": "get_all_point_rewards",
+    "card_include_insurances": "get_include_insurances",
+    "card_include_services": "get_include_services",
+}
+
+
+def _write(path: str, fmt: str, rows: List[Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "json":
+            json.dump(rows, f, ensure_ascii=False, indent=2, default=str)
+            return
+        if not rows:
+            return
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """DBの内容をCSVまたはJSONファイルに書き出す"""
+    os.makedirs(args.output, exist_ok=True)
+    db_handler = create_database_handler()
+    try:
+        for table in args.tables or list(EXPORTERS):
+            rows = getattr(db_handler, EXPORTERS[table])()
+            path = os.path.join(args.output, f"{table}.{args.format}")
+            _write(path, args.format, rows)
+            print(f"{table}: {len(rows)}件 -> {path}")
+    finally:
+        db_handler.close()
@@ -0,0 +1,40 @@
+import time
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.card_facets import CardFacetStore, FACETS, popcount
+from services.facet_filter import FacetIndex, FilterSyntaxError
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """国際ブランド・発行会社・ポイント・タグ・追加機能の組み合わせでカードを絞り込み、属性ごとの件数を表示"""
+    db_handler = create_database_handler()
+    try:
+        store = CardFacetStore(db_handler)
+        if args.rebuild:
+            result = store.rebuild()
+            print(f"絞り込みインデックス更新: カード{result['cards']}件 / ビットマップ{result['bitmaps']}件")
+
+        started_at = time.perf_counter()
+        index = FacetIndex.load(store)
+        print(f"インデックス読み込み: {len(index)}枚 / ビットマップ{len(index.bitmaps)}件 ({(time.perf_counter() - started_at) * 1000:.1f}ms)")
+
+        expression = " ".join(args.expression)
+        started_at = time.perf_counter()
+        try:
+            bitmap = index.filter(expression)
+        except FilterSyntaxError as e:
+            print(e)
+            return
+        filter_us = (time.perf_counter() - started_at) * 1000000
+        started_at = time.perf_counter()
+        counts = index.counts(bitmap, args.facets or FACETS)
+        counts_us = (time.perf_counter() - started_at) * 1000000
+
+        for card in store.describe_cards(index.card_ids(bitmap, args.limit)):
+            print(f"{card['kakaku_card_id']}\t{card['card_name']}")
+        print(f"{popcount(bitmap)}枚 (絞り込み{filter_us:.0f}µs / 件数{counts_us:.0f}µs)")
+        for facet in FACETS:
+            if facet in counts:
+                print(f"[{facet}] " + " / ".join(f"{value}: {count}" for value, count in counts[facet][:args.values]))
+    finally:
+        db_handler.close()
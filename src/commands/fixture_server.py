@@ -0,0 +1,27 @@
+from typing import Dict, Any
+from services.fixture_server import FixtureSite, FaultConfig, create_server, RANKING_PATH, DETAIL_PATH
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """価格.comの代わりにランキング・カード詳細ページを返すサーバーを起動（Ctrl+Cで終了）"""
+    faults = FaultConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        slow_resource_rate=args.slow_resource_rate,
+        slow_resource_ms=args.slow_resource_ms,
+    )
+    site = FixtureSite(args.cards, args.per_page, args.seed, faults, args.recorded)
+    server = create_server(args.host, args.port, site)
+    base_url = f"http://{args.advertise or f'localhost:{args.port}'}"
+    print(f"フィクスチャサーバーを起動しました: カード{args.cards}枚 / {site.pages}ページ")
+    print(f"  KAKAKU_RANKING_URL={base_url}{RANKING_PATH}")
+    print(f"  KAKAKU_DETAIL_URL={base_url}{DETAIL_PATH}?id={{}}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"フィクスチャサーバーを終了しました: {dict(site.stats)}")
@@ -0,0 +1,23 @@
+import json
+from datetime import datetime
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.change_history import CardHistory
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """カードの変更履歴、または指定日時時点の内容を表示"""
+    db_handler = create_database_handler()
+    try:
+        card_id = db_handler.get_card_id(args.kakaku_card_id)
+        if card_id is None:
+            raise SystemExit(f"カードが見つかりません: {args.kakaku_card_id}")
+
+        history = CardHistory(db_handler)
+        if args.as_of:
+            result = history.as_of(card_id, datetime.fromisoformat(args.as_of))
+        else:
+            result = history.changes(card_id, args.field)
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+    finally:
+        db_handler.close()
@@ -0,0 +1,15 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.card_images import CardImageStore
+from services.image_pipeline import ImagePipeline
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """登録済みのカード画像を再確認し、変更があったものだけ保存し直す"""
+    db_handler = create_database_handler()
+    try:
+        store = CardImageStore(db_handler)
+        targets = [(image["card_id"], image["source_url"]) for image in store.get_all()]
+        ImagePipeline(store, workers=args.workers).run(targets)
+    finally:
+        db_handler.close()
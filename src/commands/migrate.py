@@ -0,0 +1,25 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.migrations import MigrationRunner
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """未適用のスキーママイグレーションを適用"""
+    db_handler = create_database_handler()
+    try:
+        if db_handler.dialect == "sqlite":
+            print("SQLiteは接続時にschema.sqlから最新のスキーマを作成するため、マイグレーションは不要です")
+            return
+        runner = MigrationRunner(db_handler)
+        if args.status:
+            for migration in runner.status():
+                state = migration["applied_at"] or "未適用"
+                if migration["modified"]:
+                    state = f"{state}（適用後にファイルが変更されています）"
+                print(f"{migration['version']:04d}_{migration['name']}\t{state}")
+            return
+        applied = runner.migrate(dry_run=args.dry_run)
+        if not applied:
+            print("未適用のマイグレーションはありません")
+    finally:
+        db_handler.close()
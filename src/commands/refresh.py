@@ -0,0 +1,34 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.refresh_stats import RefreshStatsStore
+from services.card_scraper import CardScraper
+from services.refresh_scheduler import RefreshScheduler
+from models.run_sweep import create_sweep
+from commands.scrape import scrape_urls
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """古くなっている可能性の高いカードから予算内で再取得"""
+    db_handler = create_database_handler()
+    try:
+        scheduler = RefreshScheduler(RefreshStatsStore(db_handler))
+        kakaku_card_ids = scheduler.plan(max_pages=args.max_pages, max_seconds=args.max_seconds, ids=args.ids)
+        print(f"再取得対象: {len(kakaku_card_ids)}件")
+
+        if args.dry_run:
+            for item in scheduler.describe(kakaku_card_ids):
+                print(
+                    f"{item['kakaku_card_id']}\tpriority={item['priority']:.3f}\t"
+                    f"rank={item['ranking_position']}\tlast={item['last_scraped_at']}\t"
+                    f"changes/day={item['change_rate_per_day']:.3f}"
+                )
+            return
+
+        card_urls = [config["detail_url_template"].format(kakaku_card_id) for kakaku_card_id in kakaku_card_ids]
+        scraper = CardScraper(db_handler)
+        try:
+            scrape_urls(db_handler, scraper, card_urls, args.concurrency, create_sweep(db_handler, args.sweep), args.command)
+        finally:
+            scraper.close()
+    finally:
+        db_handler.close()
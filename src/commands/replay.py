@@ -0,0 +1,30 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.crawl_queue import CrawlQueue
+from services.card_scraper import CardScraper
+from services.crawl_worker import run_worker
+from models.run_sweep import create_sweep
+from commands.scrape import scrape_urls
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """URL一覧ファイル、または分散クロールで失敗したURLを再処理"""
+    if args.run_id:
+        db_handler = create_database_handler()
+        try:
+            count = CrawlQueue(db_handler, args.run_id).requeue_failed()
+            print(f"失敗したURLを再登録しました: {count}件 (run_id={args.run_id})")
+        finally:
+            db_handler.close()
+        run_worker(args.run_id)
+        return
+
+    with open(args.file, encoding="utf-8") as f:
+        card_urls = [line.strip() for line in f if line.strip()]
+    db_handler = create_database_handler()
+    scraper = CardScraper(db_handler)
+    try:
+        scrape_urls(db_handler, scraper, card_urls, args.concurrency, create_sweep(db_handler, args.sweep), args.command)
+    finally:
+        scraper.close()
+        db_handler.close()
@@ -0,0 +1,58 @@
+import sys
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.run_ledger import STAGES
+from services.run_report import build_report
+
+
+def seconds(value) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """実行記録から、直近の実行のスループット・時間がかかったカード・失敗が続くカード・前回までからの悪化を表示"""
+    db_handler = create_database_handler()
+    try:
+        report = build_report(
+            db_handler,
+            command=None if args.command_name == "all" else args.command_name,
+            runs=args.runs,
+            baseline=args.baseline,
+            tolerance=args.tolerance,
+            limit=args.limit,
+        )
+    finally:
+        db_handler.close()
+
+    if not report["runs"]:
+        print("実行記録がありません")
+        return
+
+    print("直近の実行（1枚あたりの平均秒数: " + " / ".join(STAGES) + "）")
+    for item in report["runs"]:
+        stages = " / ".join(seconds(item[f"{stage}_seconds"]) for stage in STAGES)
+        print(
+            f"  #{item['id']} {item['started_at']} {item['command']:<10} "
+            f"{item['cards_per_minute'] or 0:.1f}枚/分 成功{item['cards_ok']} 失敗{item['cards_failed']} "
+            f"再試行{item['retries']} [{stages}]"
+        )
+
+    print(f"時間がかかったカード（#{report['runs'][0]['id']}）")
+    for item in report["slowest"]:
+        stages = " / ".join(seconds(item[f"{stage}_seconds"]) for stage in STAGES)
+        print(f"  {item['kakaku_card_id']}\t{item['total_seconds']:.2f}秒 [{stages}] {item['status']} 再試行{item['retries']}")
+
+    if len(report["profiles"]) > 1:
+        print("ブラウザプロファイル別の詳細ページ取得時間")
+        for item in report["profiles"]:
+            print(f"  {item['browser_profile']:<5} {item['cards']}枚 平均{item['fetch_seconds']:.2f}秒 最大{item['max_fetch_seconds']:.2f}秒")
+
+    if report["hotspots"]:
+        print("失敗が多いカード")
+        for item in report["hotspots"]:
+            print(f"  {item['kakaku_card_id']}\t{item['error_class']}\t{item['failures']}回（{item['runs']}実行）\t{item['error_message']}")
+
+    for regression in report["regressions"]:
+        print(f"性能劣化: {regression}")
+    if report["regressions"] and args.check:
+        sys.exit(1)
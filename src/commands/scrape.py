@@ -0,0 +1,114 @@
+from typing import Dict, Any, Iterable, Optional
+from models.database import DatabaseHandler, create_database_handler
+from models.change_history import ChangeHistoryRecorder
+from models.search_index import CardSearchIndex
+from models.card_vectors import CardVectorStore
+from models.card_facets import CardFacetStore
+from services.tag_rules import TagEngine, describe as describe_tags
+from services.exchange_graph import ExchangeValueEngine, describe as describe_exchanges
+from models.run_sweep import RunSweep, create_sweep, describe_sweep
+from models.run_ledger import RunLedger
+from services.card_scraper import CardScraper
+from services.card_pipeline import process_card_url, create_image_pipeline
+from services.crawl_worker import run_worker, run_local_workers, run_threaded, selenium_url_for
+from services.rate_limiter import describe_pacers
+from services.url_discovery import UrlStream
+
+
+def scrape_urls(
+    db_handler: DatabaseHandler,
+    scraper: CardScraper,
+    card_urls: Iterable[str],
+    concurrency: int = 1,
+    sweep: Optional[RunSweep] = None,
+    command: str = "scrape",
+    from_ranking: bool = False,
+) -> None:
+    """カード詳細URLを順に（concurrencyが2以上なら並列に）処理
+
+    sweepを渡すと、最後に今回見つからなかったカード・子テーブルの行を論理削除する。
+    from_rankingはURLをランキングから取得したかどうかで、Trueのときだけ論理削除済みのカードを復活させる
+    （カードID指定・再取得では、掲載終了のカードを掲載中に戻さない）。
+    カードごとの結果と処理段階ごとの所要時間は、実行記録（scrape_runs・scrape_run_items）に残す。
+    """
+    history = ChangeHistoryRecorder(db_handler)
+    images = create_image_pipeline(db_handler)
+    # 並列実行では実行記録と変更履歴をそれぞれ別のロックでワーカースレッドから書き込むため、
+    # 実行記録には変更履歴と共有しない専用の接続を使う
+    ledger = RunLedger(create_database_handler(db_handler.database), command, history.run_id)
+    status = "failed"
+    try:
+        # 複数のWebDriverで並列に取得（同時実行数はペーサーが自動調整）
+        if concurrency > 1:
+            run_threaded(
+                card_urls, concurrency, history=history, images=images, sweep=sweep, ledger=ledger, from_ranking=from_ranking
+            )
+            status = "completed"
+            return
+
+        # 各カードの詳細情報を取得
+        for url in card_urls:
+            try:
+                process_card_url(scraper, db_handler, url, history, images, sweep, ledger, from_ranking)
+            except Exception as e:
+                print(f"[ERROR] カード情報の取得に失敗: {url}")
+                print(e)
+                continue
+        print(describe_pacers())
+        status = "completed"
+    finally:
+        history.flush()
+        print(f"変更履歴: {history.written}件")
+        summary = ledger.finish(status)
+        ledger.db_handler.close()
+        print(f"実行記録: 成功{summary['ok']}件 / 失敗{summary['failed']}件 / 再試行{summary['retries']}回 ({summary['cards_per_minute']:.1f}枚/分)")
+        if sweep:
+            print(describe_sweep(sweep.sweep()))
+        # 内容が変わったカードの検索用文書だけを更新
+        print(f"検索インデックス更新: {CardSearchIndex(db_handler).refresh(history.changed_card_ids)}件")
+        # 類似カード検索用の特徴ベクトルも内容が変わったカードだけ作り直す
+        print(f"特徴ベクトル更新: {CardVectorStore(db_handler).refresh(history.changed_card_ids)}件")
+        # 内容が変わったカードだけレコメンドタグのルールを判定し直す
+        print(describe_tags(TagEngine(db_handler).run(history.changed_card_ids)))
+        # 絞り込み用のビットマップは、タグの判定後に内容が変わったカードの分だけ更新
+        facets = CardFacetStore(db_handler).refresh(history.changed_card_ids)
+        print(f"絞り込みインデックス更新: カード{facets['cards']}件 / ビットマップ{facets['bitmaps']}件")
+        # ポイント交換の行が変わっていれば、ポイント・カードごとの最良の円換算額を計算し直す
+        print(describe_exchanges(ExchangeValueEngine(db_handler).refresh()))
+        # 詳細取得中に見つけたカード画像をまとめて保存
+        if images:
+            images.run()
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """URL取得から詳細取得・保存までを実行
+
+    ランキングのURL取得は別のWebDriverで進め、見つけたURLから順に詳細を取得する。
+    --run-idを指定した場合は、共有キューが空になるまでワーカーとして処理する。
+    """
+    if args.run_id:
+        if args.processes > 1:
+            run_local_workers(args.run_id, args.processes, args.batch_size)
+        else:
+            run_worker(args.run_id, batch_size=args.batch_size)
+        return
+
+    db_handler = create_database_handler()
+    sweep = create_sweep(db_handler, args.sweep)
+    # カード一覧ページからURLを取得（詳細取得と並行して次のページへ進む）
+    stream = UrlStream(
+        config["base_url"],
+        max_pages=args.max_pages or config["max_pages"],
+        selenium_url=selenium_url_for(args.concurrency),
+        sweep=sweep,
+    ).start()
+    scraper = None
+    try:
+        scraper = CardScraper(db_handler)
+        scrape_urls(db_handler, scraper, stream, args.concurrency, sweep, args.command, from_ranking=True)
+    finally:
+        stream.close()
+        print(stream.describe())
+        if scraper:
+            scraper.close()
+        db_handler.close()
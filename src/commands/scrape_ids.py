@@ -0,0 +1,17 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from services.card_scraper import CardScraper
+from models.run_sweep import create_sweep
+from commands.scrape import scrape_urls
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """指定した価格.comカードIDのみ詳細を取得"""
+    card_urls = [config["detail_url_template"].format(kakaku_card_id) for kakaku_card_id in args.ids]
+    db_handler = create_database_handler()
+    scraper = CardScraper(db_handler)
+    try:
+        scrape_urls(db_handler, scraper, card_urls, args.concurrency, create_sweep(db_handler, args.sweep), args.command)
+    finally:
+        scraper.close()
+        db_handler.close()
@@ -0,0 +1,24 @@
+import time
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.search_index import CardSearchIndex
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """カード名・備考・付帯サービス・付帯保険を全文検索"""
+    db_handler = create_database_handler()
+    try:
+        index = CardSearchIndex(db_handler)
+        if args.rebuild:
+            print(f"検索インデックス更新: {index.refresh()}件")
+        if not args.query:
+            return
+
+        started_at = time.perf_counter()
+        results = index.search(" ".join(args.query), limit=args.limit)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        for result in results:
+            print(f"{result['score']:.3f}\t{result['kakaku_card_id']}\t{result['card_name']}")
+        print(f"{len(results)}件 ({elapsed_ms:.1f}ms)")
+    finally:
+        db_handler.close()
@@ -0,0 +1,16 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from services.sheets_handler import SheetsHandler
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """DBの内容でスプレッドシートを更新"""
+    db_handler = create_database_handler()
+    try:
+        sheets_handler = SheetsHandler()
+        sheets_handler.connect()
+        print("スプレッドシートの更新を開始します...")
+        sheets_handler.batch_update(db_handler)
+        print("スプレッドシートの更新が完了しました。")
+    finally:
+        db_handler.close()
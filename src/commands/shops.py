@@ -0,0 +1,40 @@
+import time
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.shop_identity import canonical_shop_name
+from models.shop_merge import ShopMerger, describe_merge
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """ショップ名の照合（表記揺れの確認）と、重複したショップの統合"""
+    db_handler = create_database_handler()
+    try:
+        if args.action == "match":
+            match_names(db_handler, args.names, args.category)
+        else:
+            merge_shops(db_handler, args.fuzzy, args.dry_run)
+    finally:
+        db_handler.close()
+
+
+def match_names(db_handler, names, category: str) -> None:
+    started_at = time.perf_counter()
+    index = db_handler.shops.index
+    print(f"索引読み込み: {len(index)}件 ({(time.perf_counter() - started_at) * 1000:.1f}ms)")
+    for name in names:
+        started_at = time.perf_counter()
+        shop_id = index.resolve(name, category)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        label = "未登録" if shop_id is None else f"ID {shop_id} ({index.shops.get(shop_id, ('', ''))[0]})"
+        print(f"{name}\t{canonical_shop_name(name)}\t{label}\t{elapsed_ms:.3f}ms")
+
+
+def merge_shops(db_handler, fuzzy: bool, dry_run: bool) -> None:
+    merger = ShopMerger(db_handler)
+    merges = merger.plan(fuzzy=fuzzy)
+    for merge in merges:
+        old = ", ".join(f"{shop_name} (ID {shop_id})" for shop_id, shop_name in merge["old"])
+        print(f"{merge['new_shop_name']} (ID {merge['new_shop_id']}、{merge['reason']}) <- {old}")
+    print(describe_merge(merger.apply(merges, dry_run=dry_run), dry_run))
+    if dry_run:
+        print("（--dry-runのため反映していません）")
@@ -0,0 +1,41 @@
+import time
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.card_vectors import CardVectorStore
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """指定したカードに特徴（国際ブランド・年会費・利用枠・ポイント・交換先・保険・サービス）が近いカードを検索"""
+    # NumPyの読み込みはこのサブコマンドを使うときだけ行う
+    from services.similarity import SimilarityIndex, parse_weights
+
+    try:
+        weights = parse_weights(args.weight)
+    except ValueError as e:
+        print(e)
+        return
+    db_handler = create_database_handler()
+    try:
+        store = CardVectorStore(db_handler)
+        if args.rebuild:
+            print(f"特徴ベクトル更新: {store.refresh()}件")
+
+        started_at = time.perf_counter()
+        index = SimilarityIndex.load(store)
+        print(f"インデックス読み込み: {len(index)}件 ({(time.perf_counter() - started_at) * 1000:.1f}ms)")
+        if not args.kakaku_card_id:
+            return
+
+        started_at = time.perf_counter()
+        try:
+            results = index.query(args.kakaku_card_id, args.limit, args.metric, weights, args.cheaper)
+        except KeyError as e:
+            print(e.args[0])
+            return
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        for result in results:
+            fee = "不明" if result["annual_fee"] is None else f"{result['annual_fee']:,}円"
+            print(f"{result['score']:.3f}\t{result['kakaku_card_id']}\t{fee}\t{result['card_name']}")
+        print(f"{len(results)}件 ({elapsed_ms:.1f}ms)")
+    finally:
+        db_handler.close()
@@ -0,0 +1,32 @@
+from typing import Dict, Any
+from models.database import create_database_handler
+from models.recommend_tags import RecommendTagStore
+from models.card_facets import CardFacetStore
+
+
+def run(args, config: Dict[str, Any]) -> None:
+    """全カードにレコメンドタグのルールを適用し、card_recommend_tagsを更新"""
+    db_handler = create_database_handler()
+    try:
+        if args.show:
+            card_id = db_handler.get_card_id(args.show)
+            if card_id is None:
+                print(f"カードが見つかりません: {args.show}")
+                return
+            for tag in RecommendTagStore(db_handler).get_card_tags(card_id):
+                print(f"{tag['tag_category']}\t{tag['tag_name']}")
+            return
+
+        # NumPyの読み込みはタグを判定するときだけ行う
+        from services.tag_rules import TagEngine, describe
+
+        result = TagEngine(db_handler).run(dry_run=args.dry_run)
+        print(describe(result))
+        if args.dry_run:
+            print("（--dry-runのため反映していません）")
+            return
+        # タグが変わったカードの絞り込み用ビットマップを更新
+        facets = CardFacetStore(db_handler).refresh()
+        print(f"絞り込みインデックス更新: カード{facets['cards']}件 / ビットマップ{facets['bitmaps']}件")
+    finally:
+        db_handler.close()
@@ -0,0 +1,15 @@
+import os
+from typing import Dict, Any
+from dotenv import load_dotenv
+
+
+def load_config() -> Dict[str, Any]:
+    """.envと環境変数から各サブコマンド共通の設定を読み込む"""
+    load_dotenv()
+    return {
+        "base_url": os.getenv("KAKAKU_RANKING_URL", "https://kakaku.com/card/ranking/"),
+        "detail_url_template": os.getenv("KAKAKU_DETAIL_URL", "https://kakaku.com/card/item.asp?id={}"),
+        "max_pages": int(os.getenv("KAKAKU_MAX_PAGES", "0")),
+        "selenium_url": os.getenv("SELENIUM_URL", "http://selenium:4444/wd/hub"),
+        "spreadsheet_id": os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID"),
+    }
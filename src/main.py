@@ -1,59 +1,219 @@
-from models.database import DatabaseHandler
-from services.sheets_handler import SheetsHandler
-from services.card_scraper import CardScraper
-from dotenv import load_dotenv
+import sys
+import argparse
+import importlib
+from config import load_config
 
-load_dotenv()
+# 実行の最後に見つからなかった行を論理削除するかどうか（models.run_sweep.SWEEP_MODESと対応）
+SWEEP_MODES = ["apply", "dry-run", "off"]
+SWEEP_HELP = "実行の最後に、今回のページになかった付帯保険・付帯サービス・ポイント交換の行を論理削除（apply）/ 件数の表示のみ（dry-run）/ 何もしない（off）"
 
+# サブコマンドと実装モジュールの対応
+# 各モジュールは選択されたときだけimportする（Selenium・Google APIの読み込みを避けるため）
+COMMANDS = {
+    "discover": "commands.discover",
+    "scrape": "commands.scrape",
+    "scrape-ids": "commands.scrape_ids",
+    "export": "commands.export",
+    "sheets": "commands.sheets",
+    "replay": "commands.replay",
+    "refresh": "commands.refresh",
+    "history": "commands.history",
+    "images": "commands.images",
+    "search": "commands.search",
+    "similar": "commands.similar",
+    "tags": "commands.tags",
+    "shops": "commands.shops",
+    "exchanges": "commands.exchanges",
+    "facets": "commands.facets",
+    "runs": "commands.runs",
+    "fixture-server": "commands.fixture_server",
+    "migrate": "commands.migrate",
+    "bench": "commands.bench",
+}
 
-def main():
-    db_handler = DatabaseHandler()
-    sheets_handler = SheetsHandler()
-    scraper = CardScraper(db_handler, sheets_handler)
 
-    try:
-        # カード一覧ページからURLを取得
-        base_url = "https://kakaku.com/card/ranking/"
-        card_urls = scraper.get_card_urls(base_url)
-
-        # 各カードの詳細情報を取得
-        for url in card_urls:
-            try:
-                # カード情報の取得
-                card_data = scraper.scrape_card_detail(url)
-                # カード情報のupsert
-                card_id = db_handler.upsert_card(card_data)
-
-                # # ポイント還元情報の取得と保存
-                # rewards = scraper.scrape_point_rewards(card_id)
-                # for reward in rewards:
-                #     db_handler.upsert_point_reward(reward)
-
-                # ポイント交換情報の取得と保存
-                exchanges = scraper.scrape_point_exchange(card_id)
-                for exchange in exchanges:
-                    db_handler.upsert_point_exchange(exchange)
-
-                # 付帯保険情報の取得と保存
-                scraper.scrape_include_insurance(card_id)
-
-                # 付帯サービス情報の取得と保存
-                scraper.scrape_include_services(card_id)
-
-            except Exception as e:
-                print(f"[ERROR] カード情報の取得に失敗: {url}")
-                print(e)
-                continue
-
-        # スプレッドシートの更新
-        # print("スプレッドシートの更新を開始します...")
-        # sheets_handler.batch_update(db_handler)
-        # print("スプレッドシートの更新が完了しました。")
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="価格.comクレジットカード情報のスクレイピング")
+    parser.add_argument("--profile", choices=["cprofile", "sample"], default=None,
+                        help="CardScraper・DatabaseHandlerの各メソッドをプロファイルする（cprofile: 決定的 / sample: サンプリング）")
+    parser.add_argument("--profile-scope", choices=["stage", "card"], default="stage",
+                        help="プロファイルの単位（stage: メソッドごとに合算 / card: カード1枚ごと）")
+    parser.add_argument("--profile-dir", default=None, help="プロファイルの出力先（省略時 profiles/実行日時）")
+    parser.add_argument("--profile-interval", type=float, default=5, help="sample: サンプリング間隔（ミリ秒）")
+    subparsers = parser.add_subparsers(dest="command")
+
+    discover = subparsers.add_parser("discover", help="ランキングページからカード詳細URLを取得")
+    discover.add_argument("--max-pages", type=int, default=None, help="取得するランキングページ数（省略時は最後のページまで）")
+    discover.add_argument("--output", default=None, help="URL一覧の出力先ファイル")
+    discover.add_argument("--enqueue", metavar="RUN_ID", default=None, help="分散クロール用のキューに登録する実行ID")
+
+    scrape = subparsers.add_parser("scrape", help="URL取得から詳細取得・保存までを実行")
+    scrape.add_argument("--max-pages", type=int, default=None, help="取得するランキングページ数（省略時は最後のページまで）")
+    scrape.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="起動するWebDriverの数（実際の同時読み込み数はMAX_CONCURRENCYまで自動調整）",
+    )
+    scrape.add_argument("--run-id", default=None, help="指定すると共有キューのワーカーとして処理する")
+    scrape.add_argument("--processes", type=int, default=1, help="このノードで起動するワーカープロセス数")
+    scrape.add_argument("--batch-size", type=int, default=1, help="1回のリースで取得するURL数")
+    scrape.add_argument("--sweep", choices=SWEEP_MODES, default="apply",
+                        help=SWEEP_HELP + "。ランキングを最後まで取得した場合は、載っていないカードも対象にする")
+
+    scrape_ids = subparsers.add_parser("scrape-ids", help="指定した価格.comカードIDのみ取得")
+    scrape_ids.add_argument("ids", nargs="+", help="価格.comのカードID")
+    scrape_ids.add_argument("--concurrency", type=int, default=1, help="起動するWebDriverの数")
+    scrape_ids.add_argument("--sweep", choices=SWEEP_MODES, default="apply", help=SWEEP_HELP)
+
+    export = subparsers.add_parser("export", help="DBの内容をファイルに書き出す")
+    export.add_argument("--format", choices=["csv", "json"], default="csv")
+    export.add_argument("--output", default="export", help="出力先ディレクトリ")
+    export.add_argument("--tables", nargs="*", default=None, help="書き出すテーブル")
+
+    subparsers.add_parser("sheets", help="DBの内容でスプレッドシートを更新")
+
+    replay = subparsers.add_parser("replay", help="URL一覧ファイルまたは失敗したURLを再処理")
+    source = replay.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", default=None, help="discover --outputで出力したURL一覧")
+    source.add_argument("--run-id", default=None, help="失敗したURLを再処理する分散クロールの実行ID")
+    replay.add_argument("--concurrency", type=int, default=1, help="起動するWebDriverの数")
+    replay.add_argument("--sweep", choices=SWEEP_MODES, default="apply", help=SWEEP_HELP)
+
+    refresh = subparsers.add_parser("refresh", help="古くなっている可能性の高いカードから予算内で再取得")
+    refresh.add_argument("--max-pages", type=int, default=None, help="読み込むページ数の上限")
+    refresh.add_argument("--max-seconds", type=float, default=None, help="実行時間の上限（秒、過去の平均取得時間から見積もる）")
+    refresh.add_argument("--ids", nargs="*", default=None, help="予算に関係なく必ず取得する価格.comカードID")
+    refresh.add_argument("--concurrency", type=int, default=1, help="起動するWebDriverの数")
+    refresh.add_argument("--dry-run", action="store_true", help="対象カードと優先度を表示するだけで取得しない")
+    refresh.add_argument("--sweep", choices=SWEEP_MODES, default="apply", help=SWEEP_HELP)
+
+    history = subparsers.add_parser("history", help="カードの変更履歴、または指定日時時点の内容を表示")
+    history.add_argument("kakaku_card_id", help="価格.comのカードID")
+    history.add_argument("--as-of", default=None, help="この日時時点の内容を復元（例：2025-01-01 または 2025-01-01T09:00）")
+    history.add_argument("--field", default=None, help="指定した項目の変更のみ表示")
+
+    images = subparsers.add_parser("images", help="登録済みのカード画像を再確認してMinIOに保存")
+    images.add_argument("--workers", type=int, default=8, help="ダウンロード・アップロードの並列数")
+
+    search = subparsers.add_parser("search", help="カード名・備考・付帯サービス・付帯保険を全文検索")
+    search.add_argument("query", nargs="*", help="検索語（空白区切りの語をすべて含むカードを検索）")
+    search.add_argument("--limit", type=int, default=20, help="表示件数")
+    search.add_argument("--rebuild", action="store_true", help="全カードの検索用文書を作り直す")
+
+    similar = subparsers.add_parser("similar", help="指定したカードに特徴が近いカードを検索")
+    similar.add_argument("kakaku_card_id", nargs="?", default=None, help="価格.comのカードID")
+    similar.add_argument("--limit", type=int, default=10, help="表示件数")
+    similar.add_argument("--metric", choices=["cosine", "weighted"], default="cosine",
+                         help="cosine: コサイン類似度 / weighted: 重み付きユークリッド距離")
+    similar.add_argument("--weight", nargs="*", default=None, metavar="GROUP=WEIGHT",
+                         help="特徴量グループの重み（brand, fee, limit, point, exchange, insurance, service。例：fee=3 brand=0.5）")
+    similar.add_argument("--cheaper", action="store_true", help="年会費が指定したカードより安いカードのみ表示")
+    similar.add_argument("--rebuild", action="store_true", help="全カードの特徴ベクトルを作り直す")
+
+    tags = subparsers.add_parser("tags", help="全カードにレコメンドタグのルールを適用")
+    tags.add_argument("--dry-run", action="store_true", help="追加・削除されるタグの件数を表示するだけで反映しない")
+    tags.add_argument("--show", metavar="KAKAKU_CARD_ID", default=None, help="指定したカードに付いているタグを表示")
 
+    shops = subparsers.add_parser("shops", help="ショップ名の照合と、表記揺れで重複したショップの統合")
+    shops_actions = shops.add_subparsers(dest="action", required=True)
+    match = shops_actions.add_parser("match", help="ショップ名が索引でどのショップに解決されるかを表示")
+    match.add_argument("names", nargs="+", help="ショップ名")
+    match.add_argument("--category", default="", help="あいまい一致で比較するショップカテゴリ")
+    merge = shops_actions.add_parser("merge", help="正規化した名前が同じショップを統合し、参照を付け替える")
+    merge.add_argument("--fuzzy", action="store_true", help="あいまい一致（同じカテゴリで1〜2文字違い）のショップも統合")
+    merge.add_argument("--dry-run", action="store_true", help="統合するショップと件数を表示するだけで反映しない")
+
+    exchanges = subparsers.add_parser("exchanges", help="ポイント交換の経路から、ポイント・カードごとの最良の円換算額を計算")
+    exchanges.add_argument("kakaku_card_id", nargs="?", default=None, help="価格.comのカードID（省略時は円換算額が高いポイントを表示）")
+    exchanges.add_argument("--limit", type=int, default=20, help="表示件数")
+    exchanges.add_argument("--rebuild", action="store_true", help="ポイント交換に変更がなくても計算し直す")
+
+    facets = subparsers.add_parser("facets", help="国際ブランド・発行会社・ポイント・タグ・追加機能の組み合わせでカードを絞り込む")
+    facets.add_argument("expression", nargs="*",
+                        help='条件式（属性=値 と AND / OR / NOT・括弧。例：brand=visa AND NOT feature=etc_card。省略時は全カード）')
+    facets.add_argument("--facets", nargs="*", choices=["brand", "issuer", "point", "tag", "feature"], default=None,
+                        help="件数を表示する属性（省略時は全て）")
+    facets.add_argument("--limit", type=int, default=20, help="表示するカード数")
+    facets.add_argument("--values", type=int, default=10, help="属性ごとに表示する値の数")
+    facets.add_argument("--rebuild", action="store_true", help="全カードのビットマップを作り直す")
+
+    runs = subparsers.add_parser("runs", help="実行記録から、スループットの推移・時間がかかったカード・失敗が続くカードを表示")
+    runs.add_argument("--command", dest="command_name", default="scrape",
+                      help="対象のサブコマンド（scrape, scrape-ids, replay, refresh, worker。allで全て）")
+    runs.add_argument("--runs", type=int, default=10, help="表示する実行の数")
+    runs.add_argument("--baseline", type=int, default=5, help="最新の実行と比べる過去の実行の数（中央値と比較）")
+    runs.add_argument("--tolerance", type=float, default=0.2, help="スループット・段階ごとの所要時間の悪化を許容する割合")
+    runs.add_argument("--limit", type=int, default=10, help="時間がかかったカード・失敗が多いカードの表示件数")
+    runs.add_argument("--check", action="store_true", help="悪化があれば終了コード1で終了")
+
+    fixture = subparsers.add_parser("fixture-server", help="価格.comの代わりにランキング・カード詳細ページを返すローカルサーバーを起動（負荷試験用）")
+    fixture.add_argument("--host", default="0.0.0.0", help="待ち受けるアドレス")
+    fixture.add_argument("--port", type=int, default=8080, help="待ち受けるポート")
+    fixture.add_argument("--advertise", default=None, metavar="HOST:PORT",
+                         help="起動時に表示するURLのホスト（docker-composeではfixtures:8080）")
+    fixture.add_argument("--cards", type=int, default=1000, help="合成するカードの枚数")
+    fixture.add_argument("--per-page", type=int, default=20, help="ランキング1ページあたりのカード数")
+    fixture.add_argument("--seed", type=int, default=0, help="合成するページ内容・エラーの乱数シード")
+    fixture.add_argument("--recorded", default=None, metavar="DIR",
+                         help="保存したページ（ranking-N.html・item-カードID.html）のディレクトリ。あればそのまま返す")
+    fixture.add_argument("--latency-ms", type=float, default=0, help="ページごとに加える遅延（ミリ秒）")
+    fixture.add_argument("--jitter-ms", type=float, default=0, help="遅延に加えるばらつきの最大値（ミリ秒）")
+    fixture.add_argument("--error-rate", type=float, default=0, help="500エラーを返す割合")
+    fixture.add_argument("--throttle-rate", type=float, default=0, help="429（アクセス制限）を返す割合")
+    fixture.add_argument("--slow-resource-rate", type=float, default=0, help="読み込みの遅い画像を含める詳細ページの割合")
+    fixture.add_argument("--slow-resource-ms", type=float, default=3000, help="遅い画像の応答時間（ミリ秒）")
+
+    migrate = subparsers.add_parser("migrate", help="未適用のスキーママイグレーションを適用")
+    migrate.add_argument("--status", action="store_true", help="各マイグレーションの適用状況を表示")
+    migrate.add_argument("--dry-run", action="store_true", help="適用するマイグレーションを表示するだけで実行しない")
+
+    bench = subparsers.add_parser("bench", help="起動時間・クエリ性能を計測")
+    bench.add_argument("suite", nargs="?", choices=["startup", "queries", "storage", "records", "writes", "exchanges", "facets"], default="startup",
+                       help="startup: サブコマンドごとの起動時間 / queries: ベンチマーク用DBで検索クエリのレイテンシと実行計画"
+                            " / storage: MySQLとSQLiteで同じ書き込み・書き出しの速度を比較"
+                            " / records: 辞書とレコードでメモリと変換時間を比較"
+                            " / writes: 同時書き込み数ごとのDatabaseHandlerの書き込みスループット"
+                            " / exchanges: 全カード分のポイント交換グラフの構築と最良経路の計算時間"
+                            " / facets: ビットマップでの絞り込みと属性ごとの件数の計算時間")
+    bench.add_argument("--repeat", type=int, default=None, help="計測回数（省略時 startup: 5, queries: 200）")
+    bench.add_argument("--output", default=None, help="結果のJSON出力先")
+    bench.add_argument("--database", default="card_db_bench", help="queries/storage/writes: 作り直すベンチマーク用データベース名")
+    bench.add_argument("--scale", type=float, default=1.0, help="queries: ダミーデータ件数の倍率")
+    bench.add_argument("--baseline", default=None, help="queries: 比較するベースラインのJSON（悪化していれば終了コード1）")
+    bench.add_argument("--tolerance", type=float, default=0.5, help="queries: p95の悪化を許容する割合")
+    bench.add_argument("--backends", nargs="*", choices=["mysql", "sqlite"], default=["mysql", "sqlite"],
+                       help="storage/writes: 比較するバックエンド")
+    bench.add_argument("--cards", type=int, default=None,
+                       help="storage/records/writes/exchanges/facets: カード枚数（省略時 storage: 300, records: 2000, writes: ライターあたり100, exchanges: 2000, facets: 5000）")
+    bench.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8], help="writes: 同時に書き込むライター数")
+
+    return parser
+
+
+def main(argv=None) -> None:
+    parser = build_parser()
+    argv = list(sys.argv[1:] if argv is None else argv)
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # サブコマンドなしの場合は従来どおり全件のスクレイピングを実行
+        args = parser.parse_args(argv + ["scrape"])
+
+    config = load_config()
+    command = importlib.import_module(COMMANDS[args.command])
+    if not args.profile:
+        command.run(args, config)
+        return
+
+    # プロファイルを取るときだけ読み込む
+    from services import profiler
+
+    profiler.configure(args.profile, args.profile_scope, args.profile_dir, args.profile_interval / 1000)
+    try:
+        command.run(args, config)
     finally:
-        scraper.close()
-        db_handler.close()
+        profiler.finish()
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,242 @@
+import zlib
+import hashlib
+import unicodedata
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.records import BRAND_FIELDS
+
+# 有無で絞り込む追加機能の項目（原文が空・「なし」などでなければ「あり」とみなす）
+FEATURE_FIELDS = ("etc_card", "family_card", "digital_wallet", "code_payment")
+ABSENT_VALUES = {"", "-", "ー", "なし", "無し", "不可", "非対応", "発行不可", "対応なし"}
+
+# 絞り込みに使う属性（facet=値 の形で指定する）
+FACETS = ("brand", "issuer", "point", "tag", "feature")
+
+# 掲載中の全カードのビットマップ（NOTの基準になる）
+ALL_KEY = ("all", "all")
+
+FacetKey = Tuple[str, str]
+
+
+def has_feature(text: Optional[str]) -> bool:
+    return unicodedata.normalize("NFKC", text or "").strip() not in ABSENT_VALUES
+
+
+def card_facet_keys(card: Dict[str, Any], tags: Iterable[str]) -> List[FacetKey]:
+    """カード1枚が属する(属性, 値)の一覧（cardsの行にissuer_name・point_nameを結合したもの）"""
+    keys = [ALL_KEY]
+    keys += [("brand", field) for field in BRAND_FIELDS if card[field]]
+    if card["issuer_name"]:
+        keys.append(("issuer", card["issuer_name"]))
+    if card["point_name"]:
+        keys.append(("point", card["point_name"]))
+    keys += [("tag", tag_name) for tag_name in tags]
+    keys += [("feature", field) for field in FEATURE_FIELDS if has_feature(card[field])]
+    return sorted(set(keys))
+
+
+def serialize_keys(keys: Iterable[FacetKey]) -> str:
+    return "\n".join(f"{facet}={value}" for facet, value in keys)
+
+
+def parse_keys(text: str) -> List[FacetKey]:
+    return [tuple(line.split("=", 1)) for line in text.split("\n") if line]
+
+
+def encode_bitmap(bitmap: int) -> bytes:
+    """カードID番目のビットを立てた整数を、リトルエンディアンのバイト列にしてzlibで圧縮する"""
+    return zlib.compress(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"))
+
+
+def decode_bitmap(data: bytes) -> int:
+    return int.from_bytes(zlib.decompress(data), "little")
+
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(bitmap: int) -> int:
+        # Python 3.9以前にはint.bit_countがないため、2進表記の1を数える（3.10以降の10倍ほど遅い）
+        return bin(bitmap).count("1")
+
+
+def bitmap_of(card_ids: Iterable[int]) -> int:
+    bitmap = 0
+    for card_id in card_ids:
+        bitmap |= 1 << card_id
+    return bitmap
+
+
+class CardFacetStore:
+    """絞り込み検索用に、(属性, 値)ごとにカードIDのビットマップをcard_facet_bitmapsへ保存する
+
+    カードごとの(属性, 値)はcard_facetsに保存し、内容が変わったカードだけcards・タグから求め直す。
+    求め直した結果が変わった(属性, 値)のビットマップだけを、card_facetsの全行から作り直して置き換える
+    （同時に更新したワーカーがあっても、最後に更新した側がcard_facetsの最新の内容で揃える）。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, batch_size: int = 500):
+        self.db_handler = db_handler
+        self.batch_size = batch_size
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def refresh(self, card_ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """指定したカード（省略時は全カード）と掲載終了したカードを求め直し、更新したカード・ビットマップの件数を返す"""
+        self.db_handler._ensure_connection()
+        try:
+            card_ids = set(self._all_card_ids() if card_ids is None else card_ids) | self._deleted_card_ids()
+            stored = self._stored_keys()
+            changed_keys: Set[FacetKey] = set()
+            changed_cards = []
+            ordered = sorted(card_ids)
+            for start in range(0, len(ordered), self.batch_size):
+                batch = ordered[start:start + self.batch_size]
+                current = self._current_keys(batch)
+                for card_id in batch:
+                    keys = current.get(card_id, [])
+                    previous = stored.get(card_id, [])
+                    if keys == previous:
+                        continue
+                    changed_keys.update(set(keys) ^ set(previous))
+                    text = serialize_keys(keys)
+                    changed_cards.append((card_id, text, hashlib.sha1(text.encode("utf-8")).hexdigest()))
+
+            cursor = self.connection.cursor()
+            if changed_cards:
+                cursor.executemany(
+                    f"""
+                    INSERT INTO card_facets (card_id, facet_keys, content_hash) VALUES (%s, %s, %s)
+                    {self.db_handler.upsert_clause(["card_id"], ["facet_keys", "content_hash"])}
+                    """,
+                    changed_cards,
+                )
+            bitmaps = self._bitmaps_from(self._stored_keys(cursor), changed_keys) if changed_keys else {}
+            upserts = [(facet, value, encode_bitmap(bitmap), popcount(bitmap)) for (facet, value), bitmap in bitmaps.items() if bitmap]
+            if upserts:
+                cursor.executemany(
+                    f"""
+                    INSERT INTO card_facet_bitmaps (facet, facet_value, bitmap, cardinality) VALUES (%s, %s, %s, %s)
+                    {self.db_handler.upsert_clause(["facet", "facet_value"], ["bitmap", "cardinality"])}
+                    """,
+                    upserts,
+                )
+            empty = [key for key, bitmap in bitmaps.items() if not bitmap]
+            if empty:
+                cursor.executemany("DELETE FROM card_facet_bitmaps WHERE facet = %s AND facet_value = %s", empty)
+            self.connection.commit()
+            return {"cards": len(changed_cards), "bitmaps": len(bitmaps)}
+        except Error as e:
+            print(f"絞り込みインデックス更新エラー: {e}")
+            self.db_handler.reconnect()
+            return self.refresh(card_ids)
+
+    def rebuild(self) -> Dict[str, int]:
+        """保存済みの内容を捨てて全カードから作り直す"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("DELETE FROM card_facet_bitmaps")
+            cursor.execute("DELETE FROM card_facets")
+            self.connection.commit()
+        except Error as e:
+            print(f"絞り込みインデックス削除エラー: {e}")
+            self.db_handler.reconnect()
+            return self.rebuild()
+        return self.refresh()
+
+    def _all_card_ids(self) -> List[int]:
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT id FROM cards WHERE deleted_at IS NULL")
+        return [row[0] for row in cursor.fetchall()]
+
+    def _deleted_card_ids(self) -> Set[int]:
+        """ビットマップに残っている掲載終了のカード"""
+        cursor = self.connection.cursor()
+        cursor.execute(
+            """
+            SELECT f.card_id FROM card_facets f
+            JOIN cards c ON c.id = f.card_id
+            WHERE c.deleted_at IS NOT NULL AND f.facet_keys <> ''
+            """
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def _stored_keys(self, cursor=None) -> Dict[int, List[FacetKey]]:
+        cursor = cursor or self.connection.cursor()
+        cursor.execute("SELECT card_id, facet_keys FROM card_facets")
+        return {card_id: parse_keys(facet_keys) for card_id, facet_keys in cursor.fetchall()}
+
+    def _current_keys(self, card_ids: List[int]) -> Dict[int, List[FacetKey]]:
+        """掲載中のカードの(属性, 値)（掲載終了・存在しないカードは含めない）"""
+        placeholders = ", ".join(["%s"] * len(card_ids))
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(
+            f"""
+            SELECT c.id, i.issuer_name, p.point_name, {", ".join(f"c.{field}" for field in BRAND_FIELDS + FEATURE_FIELDS)}
+            FROM cards c
+            LEFT JOIN m_issuers i ON i.id = c.issuer_id
+            LEFT JOIN m_points p ON p.id = c.point_id
+            WHERE c.id IN ({placeholders}) AND c.deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        cards = {card["id"]: card for card in cursor.fetchall()}
+        cursor = self.connection.cursor()
+        cursor.execute(
+            f"""
+            SELECT ct.card_id, t.tag_name FROM card_recommend_tags ct
+            JOIN m_recommend_tags t ON t.id = ct.recommend_tag_id
+            WHERE ct.card_id IN ({placeholders}) AND ct.deleted_at IS NULL AND t.deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        tags: Dict[int, List[str]] = defaultdict(list)
+        for card_id, tag_name in cursor.fetchall():
+            tags[card_id].append(tag_name)
+        return {card_id: card_facet_keys(card, tags[card_id]) for card_id, card in cards.items()}
+
+    def _bitmaps_from(self, stored: Dict[int, List[FacetKey]], keys: Set[FacetKey]) -> Dict[FacetKey, int]:
+        members: Dict[FacetKey, List[int]] = {key: [] for key in keys}
+        for card_id, card_keys in stored.items():
+            for key in card_keys:
+                if key in members:
+                    members[key].append(card_id)
+        return {key: bitmap_of(card_ids) for key, card_ids in members.items()}
+
+    def load(self) -> Dict[FacetKey, int]:
+        """保存済みの全ビットマップ"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT facet, facet_value, bitmap FROM card_facet_bitmaps")
+            bitmaps = {(facet, value): decode_bitmap(bytes(bitmap)) for facet, value, bitmap in cursor.fetchall()}
+            self.connection.commit()
+            return bitmaps
+        except Error as e:
+            print(f"絞り込みインデックス取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.load()
+
+    def describe_cards(self, card_ids: List[int]) -> List[Dict[str, Any]]:
+        """表示用のカードID・価格.comカードID・カード名（card_idsの順）"""
+        if not card_ids:
+            return []
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                f"SELECT id, kakaku_card_id, card_name FROM cards WHERE id IN ({', '.join(['%s'] * len(card_ids))})",
+                card_ids,
+            )
+            cards = {card["id"]: card for card in cursor.fetchall()}
+            self.connection.commit()
+            return [cards[card_id] for card_id in card_ids if card_id in cards]
+        except Error as e:
+            print(f"カード取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.describe_cards(card_ids)
@@ -0,0 +1,125 @@
+from typing import List, Dict, Any, Tuple, Iterable
+from mysql.connector import Error
+from models.database import DatabaseHandler
+
+IMAGE_UPDATE_COLUMNS = [
+    "etag", "last_modified", "content_hash", "object_key", "thumbnail_key", "content_type", "size_bytes",
+]
+
+# IN句1つあたりの件数（SQLiteのバインド変数の上限を超えないようにする）
+LOOKUP_BATCH_SIZE = 500
+
+
+class CardImageStore:
+    """カード画像の取得元と保存先の対応を管理する"""
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.db_handler = db_handler
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        """登録済みの全画像を取得"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM card_images WHERE deleted_at IS NULL")
+            rows = cursor.fetchall()
+            self.connection.commit()
+            return rows
+        except Error as e:
+            print(f"カード画像取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.get_all()
+
+    def get_known(self, keys: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], Dict[str, Any]]:
+        """(card_id, source_url) をキーに登録済みの画像情報を取得"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            card_ids = sorted({card_id for card_id, _ in keys})
+            wanted = set(keys)
+            known = {}
+            for start in range(0, len(card_ids), LOOKUP_BATCH_SIZE):
+                chunk = card_ids[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"SELECT * FROM card_images WHERE card_id IN ({placeholders})", chunk)
+                for row in cursor.fetchall():
+                    key = (row["card_id"], row["source_url"])
+                    if key in wanted:
+                        known[key] = row
+            self.connection.commit()
+            return known
+        except Error as e:
+            print(f"カード画像取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.get_known(keys)
+
+    def get_uploaded_hashes(self, hashes: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """アップロード済みのハッシュと、そのオブジェクトキー・サムネイルキーを取得"""
+        hashes = list(set(hashes))
+        if not hashes:
+            return {}
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            uploaded = {}
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                chunk = hashes[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"""
+                    SELECT content_hash, object_key, thumbnail_key FROM card_images
+                    WHERE content_hash IN ({placeholders}) AND object_key IS NOT NULL
+                    """,
+                    chunk,
+                )
+                for content_hash, object_key, thumbnail_key in cursor.fetchall():
+                    uploaded[content_hash] = (object_key, thumbnail_key)
+            self.connection.commit()
+            return uploaded
+        except Error as e:
+            print(f"カード画像ハッシュ取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.get_uploaded_hashes(hashes)
+
+    def upsert_many(self, images: List[Dict[str, Any]]) -> None:
+        """画像情報をまとめて更新または挿入"""
+        if not images:
+            return
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                f"""
+                INSERT INTO card_images (
+                    card_id, source_url, etag, last_modified, content_hash,
+                    object_key, thumbnail_key, content_type, size_bytes
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                {self.db_handler.upsert_clause(["card_id", "source_url"], IMAGE_UPDATE_COLUMNS)}
+                """,
+                [
+                    (
+                        image["card_id"],
+                        image["source_url"],
+                        image["etag"],
+                        image["last_modified"],
+                        image["content_hash"],
+                        image["object_key"],
+                        image["thumbnail_key"],
+                        image["content_type"],
+                        image["size_bytes"],
+                    )
+                    for image in images
+                ],
+            )
+            self.connection.commit()
+        except Error as e:
+            print(f"カード画像更新エラー: {e}")
+            self.db_handler.reconnect()
+            self.upsert_many(images)
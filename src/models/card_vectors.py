@@ -0,0 +1,266 @@
+import re
+import math
+import zlib
+import hashlib
+import unicodedata
+from array import array
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.records import BRAND_FIELDS
+from models.text_dictionary import resolved_table
+
+# 特徴量のグループと次元数（ポイント・交換先・保険・サービスは名前のハッシュで固定長の枠に振り分ける）
+# 変更した場合は similar --rebuild で全カードのベクトルを作り直す
+FEATURE_GROUPS = (
+    ("brand", len(BRAND_FIELDS)),
+    ("fee", 2),
+    ("limit", 2),
+    ("point", 16),
+    ("exchange", 32),
+    ("insurance", 16),
+    ("service", 32),
+)
+
+
+def _feature_slices() -> Dict[str, slice]:
+    slices = {}
+    start = 0
+    for name, size in FEATURE_GROUPS:
+        slices[name] = slice(start, start + size)
+        start += size
+    return slices
+
+
+FEATURE_SLICES = _feature_slices()
+VECTOR_DIMENSION = sum(size for _, size in FEATURE_GROUPS)
+
+# 金額を0〜1に収めるときの上限（log1pで圧縮し、超えた分は1にする）
+FEE_SCALE = 150000
+LIMIT_SCALE = 10000000
+
+YEN_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(万)?円")
+
+
+def parse_yen_amounts(text: Optional[str]) -> List[int]:
+    """文中の金額（「1,375円」「100万円」など）を円単位で取り出す"""
+    text = unicodedata.normalize("NFKC", text or "").replace(",", "")
+    return [int(float(number) * (10000 if man else 1)) for number, man in YEN_PATTERN.findall(text)]
+
+
+def parse_annual_fee(text: Optional[str]) -> Optional[int]:
+    """年会費の原文から、条件なしでかかる年会費（円）を求める（読み取れなければNone）
+
+    「初年度無料 2年目以降1,375円」のように複数の金額がある場合は最も高い金額とする。
+    """
+    amounts = parse_yen_amounts(text)
+    if amounts:
+        return max(amounts)
+    if text and "無料" in text:
+        return 0
+    return None
+
+
+def parse_limit(text: Optional[str]) -> Optional[int]:
+    """利用可能枠の原文から上限額（円）を求める（「10万円～100万円」は100万円）"""
+    amounts = parse_yen_amounts(text)
+    return max(amounts) if amounts else None
+
+
+def scale_amount(amount: Optional[int], upper: int) -> float:
+    if not amount:
+        return 0.0
+    return min(1.0, math.log1p(amount) / math.log1p(upper))
+
+
+def bucket(group: str, key: Any) -> int:
+    """名前・IDを特徴量グループ内の位置に振り分ける（実行ごとに変わらないCRC32を使う）"""
+    feature = FEATURE_SLICES[group]
+    size = feature.stop - feature.start
+    return feature.start + zlib.crc32(str(key).encode("utf-8")) % size
+
+
+def build_vector(
+    card: Dict[str, Any],
+    exchanges: Iterable[Tuple[int, int, int]],
+    insurances: Iterable[Tuple[str, str]],
+    services: Iterable[str],
+) -> List[float]:
+    """カード1枚の特徴ベクトル
+
+    card: cardsの行 / exchanges: (交換先ID, 交換前, 交換後) / insurances: (カテゴリ, 保険タイプ) / services: サービス名
+    """
+    vector = [0.0] * VECTOR_DIMENSION
+    for offset, field in enumerate(BRAND_FIELDS):
+        vector[FEATURE_SLICES["brand"].start + offset] = 1.0 if card[field] else 0.0
+
+    fee = parse_annual_fee(card["annual_fee_raw"])
+    fee_start = FEATURE_SLICES["fee"].start
+    vector[fee_start] = scale_amount(fee, FEE_SCALE)
+    vector[fee_start + 1] = 1.0 if fee == 0 else 0.0
+
+    limit_start = FEATURE_SLICES["limit"].start
+    vector[limit_start] = scale_amount(parse_limit(card["shopping_limit"]), LIMIT_SCALE)
+    vector[limit_start + 1] = scale_amount(parse_limit(card["cashing_limit"]), LIMIT_SCALE)
+
+    vector[bucket("point", card["point_id"])] = 1.0
+    for reward_id, before_value, after_value in exchanges:
+        # 1ポイントあたりの交換レート（1より高いレートは1として扱う）
+        rate = min(1.0, after_value / before_value) if before_value else 0.0
+        position = bucket("exchange", reward_id)
+        vector[position] = max(vector[position], rate)
+    for category, coverage_type in insurances:
+        vector[bucket("insurance", f"{category}:{coverage_type}")] = 1.0
+    for service_name in services:
+        vector[bucket("service", unicodedata.normalize("NFKC", service_name))] = 1.0
+    return vector
+
+
+class CardVectorStore:
+    """類似カード検索用の特徴ベクトルをcard_feature_vectorsに保存する
+
+    ベクトルはfloat32の配列をそのままBLOBに保存し、内容が変わったカードの行だけを更新する。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, batch_size: int = 500):
+        self.db_handler = db_handler
+        self.batch_size = batch_size
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def refresh(self, card_ids: Optional[Iterable[int]] = None) -> int:
+        """指定したカード（省略時は全カード）のベクトルを作り直し、更新した件数を返す"""
+        if card_ids is None:
+            card_ids = self._all_card_ids()
+        card_ids = sorted(set(card_ids))
+        updated = 0
+        for start in range(0, len(card_ids), self.batch_size):
+            updated += self._refresh_batch(card_ids[start:start + self.batch_size])
+        return updated
+
+    def _all_card_ids(self) -> List[int]:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT id FROM cards WHERE deleted_at IS NULL")
+            card_ids = [row[0] for row in cursor.fetchall()]
+            self.connection.commit()
+            return card_ids
+        except Error as e:
+            print(f"特徴ベクトル対象カード取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self._all_card_ids()
+
+    def build_vectors(self, card_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """カードと子テーブルをまとめて読み込み、特徴ベクトルを組み立てる"""
+        placeholders = ", ".join(["%s"] * len(card_ids))
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(
+            f"""
+            SELECT id, point_id, annual_fee_raw, shopping_limit, cashing_limit, {", ".join(BRAND_FIELDS)}
+            FROM cards WHERE id IN ({placeholders})
+            """,
+            card_ids,
+        )
+        cards = {card["id"]: card for card in cursor.fetchall()}
+        exchanges: Dict[int, List[Tuple[int, int, int]]] = {card_id: [] for card_id in cards}
+        insurances: Dict[int, List[Tuple[str, str]]] = {card_id: [] for card_id in cards}
+        services: Dict[int, List[str]] = {card_id: [] for card_id in cards}
+
+        cursor = self.connection.cursor()
+        cursor.execute(
+            f"""
+            SELECT card_id, exchangeable_reward_id, before_value, after_value FROM point_exchanges
+            WHERE card_id IN ({placeholders}) AND deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        for card_id, reward_id, before_value, after_value in cursor.fetchall():
+            if card_id in exchanges:
+                exchanges[card_id].append((reward_id, before_value, after_value))
+        cursor.execute(
+            f"""
+            SELECT card_id, category, coverage_type FROM {resolved_table("card_include_insurances")}
+            WHERE card_id IN ({placeholders}) AND deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        for card_id, category, coverage_type in cursor.fetchall():
+            if card_id in insurances:
+                insurances[card_id].append((category, coverage_type))
+        cursor.execute(
+            f"""
+            SELECT card_id, service_name FROM card_include_services
+            WHERE card_id IN ({placeholders}) AND deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        for card_id, service_name in cursor.fetchall():
+            if card_id in services:
+                services[card_id].append(service_name)
+
+        result = {}
+        for card_id, card in cards.items():
+            vector = array("f", build_vector(card, exchanges[card_id], insurances[card_id], services[card_id])).tobytes()
+            result[card_id] = {
+                "annual_fee": parse_annual_fee(card["annual_fee_raw"]),
+                "vector": vector,
+                "content_hash": hashlib.sha1(vector).hexdigest(),
+            }
+        return result
+
+    def _refresh_batch(self, card_ids: List[int]) -> int:
+        self.db_handler._ensure_connection()
+        try:
+            vectors = self.build_vectors(card_ids)
+            placeholders = ", ".join(["%s"] * len(card_ids))
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"SELECT card_id, content_hash FROM card_feature_vectors WHERE card_id IN ({placeholders})",
+                card_ids,
+            )
+            stored = dict(cursor.fetchall())
+            changed = [
+                (card_id, row["annual_fee"], row["vector"], row["content_hash"])
+                for card_id, row in vectors.items()
+                if stored.get(card_id) != row["content_hash"]
+            ]
+            if changed:
+                cursor.executemany(
+                    f"""
+                    INSERT INTO card_feature_vectors (card_id, annual_fee, vector, content_hash)
+                    VALUES (%s, %s, %s, %s)
+                    {self.db_handler.upsert_clause(["card_id"], ["annual_fee", "vector", "content_hash"])}
+                    """,
+                    changed,
+                )
+            self.connection.commit()
+            return len(changed)
+        except Error as e:
+            print(f"特徴ベクトル更新エラー: {e}")
+            self.db_handler.reconnect()
+            return self._refresh_batch(card_ids)
+
+    def load(self) -> List[Tuple[Any, ...]]:
+        """掲載中の全カードの(カードID, 価格.comカードID, カード名, 年会費, ベクトル)"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                """
+                SELECT v.card_id, c.kakaku_card_id, c.card_name, v.annual_fee, v.vector
+                FROM card_feature_vectors v
+                JOIN cards c ON c.id = v.card_id
+                WHERE c.deleted_at IS NULL
+                ORDER BY v.card_id
+                """
+            )
+            rows = cursor.fetchall()
+            self.connection.commit()
+            return rows
+        except Error as e:
+            print(f"特徴ベクトル取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.load()
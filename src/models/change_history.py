@@ -0,0 +1,279 @@
+import uuid
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.records import CARD_FIELDS as RECORD_CARD_FIELDS
+from models.text_dictionary import resolved_table
+
+
+# 履歴対象のカード項目（kakaku_card_idはカードの識別子なので除く）
+CARD_FIELDS = RECORD_CARD_FIELDS[1:]
+
+# 子テーブルごとの行キーと履歴対象の項目
+CHILD_ENTITIES = {
+    "point_exchanges": (("exchangeable_reward_id",), ("before_value", "after_value", "remarks")),
+    "card_include_insurances": (("category", "coverage_type"), ("coverage_amount", "remarks")),
+    "card_include_services": (("service_name",), ("service_content", "remarks")),
+}
+
+ROW_FIELD = "__row__"
+ROW_PRESENT = "1"
+
+Delta = Tuple[int, str, str, str, Optional[str], Optional[str]]
+# エンティティ名 → 行キー → 項目 → 値
+CardState = Dict[str, Dict[str, Dict[str, Optional[str]]]]
+
+
+def normalize(value: Any) -> Optional[str]:
+    """比較・保存用に値を文字列へ正規化（真偽値はMySQLのTINYINTと同じ表現にする）"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def row_key(entity: str, row: Dict[str, Any]) -> str:
+    key_fields, _ = CHILD_ENTITIES[entity]
+    return "\t".join(normalize(row[field]) or "" for field in key_fields)
+
+
+class ChangeHistoryRecorder:
+    """1回の実行で発生した項目単位の差分を記録する
+
+    保存の直前にload_previous()でそのカードの前回の内容だけを読み込み、差分はメモリ上で計算する。
+    同じ実行で2回目以降に取得したカードは、前回記録した内容と比較する。
+    差分はバッファにため、一定件数ごとにまとめてINSERTする。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, run_id: Optional[str] = None, flush_size: int = 500):
+        self.db_handler = db_handler
+        self.run_id = run_id or uuid.uuid4().hex
+        self.flush_size = flush_size
+        # この実行で記録したカードの内容
+        self._snapshot: Dict[int, CardState] = {}
+        self._buffer: List[Delta] = []
+        self._lock = threading.Lock()
+        self.written = 0
+        # この実行で内容が変化したカード（検索インデックス等の差分更新に使う）
+        self.changed_card_ids = set()
+
+    def load_previous(self, db_handler: DatabaseHandler, kakaku_card_id: str) -> CardState:
+        """保存する前に、カードと子テーブルの現在の内容を読み込む（未登録のカードは空）
+
+        スレッドごとの接続で読めるよう、呼び出し側のdb_handlerを使う。
+        """
+        db_handler._ensure_connection()
+        try:
+            cursor = db_handler.connection.cursor(dictionary=True)
+            cursor.execute(
+                f"SELECT id, {', '.join(CARD_FIELDS)} FROM cards WHERE kakaku_card_id = %s", (kakaku_card_id,)
+            )
+            card = cursor.fetchone()
+            previous: CardState = {}
+            if card is not None:
+                previous["cards"] = {"": {field: normalize(card[field]) for field in CARD_FIELDS}}
+                for entity, (key_fields, fields) in CHILD_ENTITIES.items():
+                    cursor.execute(
+                        f"SELECT {', '.join(key_fields + fields)} FROM {resolved_table(entity)} "
+                        "WHERE card_id = %s AND deleted_at IS NULL",
+                        (card["id"],),
+                    )
+                    previous[entity] = {
+                        row_key(entity, row): {field: normalize(row[field]) for field in fields}
+                        for row in cursor.fetchall()
+                    }
+            db_handler.connection.commit()
+            return previous
+        except Error as e:
+            print(f"変更履歴の読み込みエラー: {e}")
+            db_handler.reconnect()
+            return self.load_previous(db_handler, kakaku_card_id)
+
+    def record_card(
+        self,
+        card_id: int,
+        card_data: Dict[str, Any],
+        exchanges: List[Dict[str, Any]],
+        insurances: List[Dict[str, Any]],
+        services: List[Dict[str, Any]],
+        previous: Optional[CardState] = None,
+    ) -> int:
+        """1枚のカードについて前回（load_previous()で読み込んだ内容）との差分をバッファに追加し、追加した件数を返す"""
+        scraped: CardState = {
+            "cards": {"": {field: normalize(card_data.get(field)) for field in CARD_FIELDS}},
+            "point_exchanges": self._rows("point_exchanges", exchanges),
+            "card_include_insurances": self._rows("card_include_insurances", insurances),
+            "card_include_services": self._rows("card_include_services", services),
+        }
+        with self._lock:
+            recorded = self._snapshot.get(card_id)
+            if recorded is not None:
+                previous = recorded
+            deltas = []
+            for entity, rows in scraped.items():
+                deltas.extend(self._diff(card_id, entity, (previous or {}).get(entity, {}), rows))
+            self._snapshot[card_id] = scraped
+            self._buffer.extend(deltas)
+            if deltas:
+                self.changed_card_ids.add(card_id)
+            if len(self._buffer) >= self.flush_size:
+                self._flush_locked()
+        return len(deltas)
+
+    def _rows(self, entity: str, rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Optional[str]]]:
+        _, fields = CHILD_ENTITIES[entity]
+        return {row_key(entity, row): {field: normalize(row.get(field)) for field in fields} for row in rows}
+
+    def _diff(
+        self,
+        card_id: int,
+        entity: str,
+        previous: Dict[str, Dict[str, Optional[str]]],
+        current: Dict[str, Dict[str, Optional[str]]],
+    ) -> List[Delta]:
+        deltas = []
+        for key, values in current.items():
+            old_values = previous.get(key)
+            if old_values is None:
+                # 新しい行は追加のみ記録（項目の値は現在の行から復元できる）
+                deltas.append((card_id, entity, key, ROW_FIELD, None, ROW_PRESENT))
+                continue
+            for field, value in values.items():
+                if old_values.get(field) != value:
+                    deltas.append((card_id, entity, key, field, old_values.get(field), value))
+        for key in previous.keys() - current.keys():
+            deltas.append((card_id, entity, key, ROW_FIELD, ROW_PRESENT, None))
+        return deltas
+
+    def flush(self) -> int:
+        """バッファ内の差分を書き込む"""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        if not self._buffer:
+            return 0
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.db_handler.connection.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO card_field_changes (
+                    card_id, entity, entity_key, field_name, old_value, new_value, run_id
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                [delta + (self.run_id,) for delta in self._buffer],
+            )
+            self.db_handler.connection.commit()
+            count = len(self._buffer)
+            self.written += count
+            self._buffer = []
+            return count
+        except Error as e:
+            print(f"変更履歴の書き込みエラー: {e}")
+            self.db_handler.reconnect()
+            return self._flush_locked()
+
+
+class CardHistory:
+    """変更履歴から任意の日時時点のカード内容を復元する
+
+    現在の内容を起点に、指定日時より後の差分だけを新しい順に巻き戻す。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.db_handler = db_handler
+
+    def as_of(self, card_id: int, when: datetime) -> Optional[Dict[str, Any]]:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.db_handler.connection.cursor(dictionary=True)
+            state: Dict[str, Dict[str, Dict[str, Optional[str]]]] = {}
+
+            cursor.execute(f"SELECT {', '.join(CARD_FIELDS)} FROM cards WHERE id = %s", (card_id,))
+            card = cursor.fetchone()
+            if card is None:
+                return None
+            state["cards"] = {"": {field: normalize(card[field]) for field in CARD_FIELDS}}
+            for entity, (key_fields, fields) in CHILD_ENTITIES.items():
+                cursor.execute(
+                    f"SELECT {', '.join(key_fields + fields)} FROM {resolved_table(entity)} WHERE card_id = %s",
+                    (card_id,),
+                )
+                state[entity] = {
+                    row_key(entity, row): {field: normalize(row[field]) for field in fields}
+                    for row in cursor.fetchall()
+                }
+
+            # 行の有無は、指定日時以前の最後の追加・削除で決まる
+            cursor.execute(
+                """
+                SELECT entity, entity_key, old_value, new_value, changed_at > %s AS after
+                FROM card_field_changes
+                WHERE card_id = %s AND field_name = %s
+                ORDER BY changed_at, id
+                """,
+                (when, card_id, ROW_FIELD),
+            )
+            presence: Dict[Tuple[str, str], bool] = {}
+            for row in cursor.fetchall():
+                target = (row["entity"], row["entity_key"])
+                if row["after"]:
+                    presence.setdefault(target, row["old_value"] == ROW_PRESENT)
+                else:
+                    presence[target] = row["new_value"] == ROW_PRESENT
+
+            cursor.execute(
+                """
+                SELECT entity, entity_key, field_name, old_value
+                FROM card_field_changes
+                WHERE card_id = %s AND changed_at > %s AND field_name <> %s
+                ORDER BY changed_at DESC, id DESC
+                """,
+                (card_id, when, ROW_FIELD),
+            )
+            for change in cursor.fetchall():
+                row = state.get(change["entity"], {}).get(change["entity_key"])
+                if row is not None:
+                    row[change["field_name"]] = change["old_value"]
+            self.db_handler.connection.commit()
+        except Error as e:
+            print(f"変更履歴の復元エラー: {e}")
+            self.db_handler.reconnect()
+            return self.as_of(card_id, when)
+
+        if presence.get(("cards", ""), True) is False:
+            return None
+        result: Dict[str, Any] = dict(state["cards"][""])
+        for entity in CHILD_ENTITIES:
+            result[entity] = [
+                values for key, values in state[entity].items()
+                if presence.get((entity, key), True)
+            ]
+        return result
+
+    def changes(self, card_id: int, field_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """カードの変更履歴を古い順に取得（field_name指定時はその項目のみ）"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.db_handler.connection.cursor(dictionary=True)
+            query = """
+                SELECT entity, entity_key, field_name, old_value, new_value, run_id, changed_at
+                FROM card_field_changes
+                WHERE card_id = %s
+            """
+            params: List[Any] = [card_id]
+            if field_name:
+                query += " AND field_name = %s"
+                params.append(field_name)
+            cursor.execute(query + " ORDER BY changed_at, id", params)
+            rows = cursor.fetchall()
+            self.db_handler.connection.commit()
+            return rows
+        except Error as e:
+            print(f"変更履歴の取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.changes(card_id, field_name)
@@ -0,0 +1,279 @@
+import os
+import socket
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+
+
+class CrawlQueue:
+    """MySQL上のリース方式ワークキュー
+
+    複数ノードが同じrun_idのキューを共有し、SELECT ... FOR UPDATE SKIP LOCKED で
+    URLをリースとして取得する。リースは定期的に延長し、期限切れのものは他ノードが回収する。
+    """
+
+    def __init__(
+        self,
+        db_handler: DatabaseHandler,
+        run_id: str,
+        owner: Optional[str] = None,
+        lease_seconds: int = 300,
+        max_attempts: int = 3,
+    ):
+        if db_handler.dialect != "mysql":
+            raise ValueError("分散クロールのキューはMySQLでのみ利用できます（DB_BACKEND=mysql）")
+        self.db_handler = db_handler
+        self.run_id = run_id
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def enqueue(self, urls: List[str]) -> int:
+        """URLをキューに一括登録（登録済みのURLは無視）"""
+        if not urls:
+            return 0
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                "INSERT IGNORE INTO crawl_queue (run_id, url) VALUES (%s, %s)",
+                [(self.run_id, url) for url in urls],
+            )
+            self.connection.commit()
+            return cursor.rowcount
+        except Error as e:
+            print(f"キュー登録エラー: {e}")
+            self.db_handler.reconnect()
+            return self.enqueue(urls)
+
+    def claim(self, batch_size: int = 1) -> List[Tuple[int, str]]:
+        """未処理または期限切れのURLをリースとして取得"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            # 試行回数を使い切ったままリース切れになったものは失敗として確定させる
+            cursor.execute(
+                """
+                UPDATE crawl_queue SET
+                    status = 'failed',
+                    lease_owner = NULL,
+                    last_error = 'lease expired'
+                WHERE run_id = %s
+                  AND status = 'leased'
+                  AND lease_expires_at < CURRENT_TIMESTAMP
+                  AND attempts >= %s
+                """,
+                (self.run_id, self.max_attempts),
+            )
+            self.connection.commit()
+            cursor.execute(
+                """
+                SELECT id, url FROM crawl_queue
+                WHERE run_id = %s
+                  AND attempts < %s
+                  AND (
+                    status = 'pending'
+                    OR (status = 'leased' AND lease_expires_at < CURRENT_TIMESTAMP)
+                  )
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                (self.run_id, self.max_attempts, batch_size),
+            )
+            rows = cursor.fetchall()
+            if rows:
+                ids = [row[0] for row in rows]
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(
+                    f"""
+                    UPDATE crawl_queue SET
+                        status = 'leased',
+                        lease_owner = %s,
+                        lease_expires_at = CURRENT_TIMESTAMP + INTERVAL %s SECOND,
+                        attempts = attempts + 1
+                    WHERE id IN ({placeholders})
+                    """,
+                    (self.owner, self.lease_seconds, *ids),
+                )
+            self.connection.commit()
+            return [(row[0], row[1]) for row in rows]
+        except Error as e:
+            print(f"キュー取得エラー: {e}")
+            self.connection.rollback()
+            self.db_handler.reconnect()
+            return self.claim(batch_size)
+
+    def heartbeat(self, item_ids: List[int]) -> int:
+        """保持中のリースの有効期限を延長"""
+        if not item_ids:
+            return 0
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            placeholders = ", ".join(["%s"] * len(item_ids))
+            cursor.execute(
+                f"""
+                UPDATE crawl_queue SET
+                    lease_expires_at = CURRENT_TIMESTAMP + INTERVAL %s SECOND
+                WHERE id IN ({placeholders})
+                  AND status = 'leased'
+                  AND lease_owner = %s
+                """,
+                (self.lease_seconds, *item_ids, self.owner),
+            )
+            self.connection.commit()
+            return cursor.rowcount
+        except Error as e:
+            print(f"リース延長エラー: {e}")
+            self.db_handler.reconnect()
+            return 0
+
+    def complete(self, item_id: int) -> None:
+        """処理完了としてマーク"""
+        self._finish(item_id, "done", None)
+
+    def fail(self, item_id: int, error: str) -> None:
+        """処理失敗としてマーク（試行回数が残っていれば再度pendingに戻す）"""
+        self._finish(item_id, None, error)
+
+    def _finish(self, item_id: int, status: Optional[str], error: Optional[str]) -> None:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            if status is None:
+                cursor.execute(
+                    """
+                    UPDATE crawl_queue SET
+                        status = IF(attempts >= %s, 'failed', 'pending'),
+                        lease_owner = NULL,
+                        lease_expires_at = NULL,
+                        last_error = %s
+                    WHERE id = %s AND lease_owner = %s
+                    """,
+                    (self.max_attempts, error, item_id, self.owner),
+                )
+            else:
+                cursor.execute(
+                    """
+                    UPDATE crawl_queue SET
+                        status = %s,
+                        lease_owner = NULL,
+                        lease_expires_at = NULL
+                    WHERE id = %s AND lease_owner = %s
+                    """,
+                    (status, item_id, self.owner),
+                )
+            self.connection.commit()
+        except Error as e:
+            print(f"キュー更新エラー: {e}")
+            self.db_handler.reconnect()
+            self._finish(item_id, status, error)
+
+    def requeue_failed(self) -> int:
+        """失敗として確定したURLを試行回数をリセットしてpendingに戻す"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                """
+                UPDATE crawl_queue SET
+                    status = 'pending',
+                    attempts = 0,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
+                WHERE run_id = %s AND status = 'failed'
+                """,
+                (self.run_id,),
+            )
+            self.connection.commit()
+            return cursor.rowcount
+        except Error as e:
+            print(f"キュー再登録エラー: {e}")
+            self.db_handler.reconnect()
+            return self.requeue_failed()
+
+    def is_drained(self) -> bool:
+        """処理待ち・処理中のURLが残っていないか"""
+        return self.stats().get("remaining", 0) == 0
+
+    def stats(self) -> Dict[str, Any]:
+        """状態ごとの件数を取得"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                """
+                SELECT status, COUNT(*) FROM crawl_queue
+                WHERE run_id = %s
+                GROUP BY status
+                """,
+                (self.run_id,),
+            )
+            counts = {status: count for status, count in cursor.fetchall()}
+            cursor.execute(
+                """
+                SELECT COUNT(*) FROM crawl_queue
+                WHERE run_id = %s
+                  AND (
+                    status = 'pending'
+                    OR (
+                      status = 'leased'
+                      AND (lease_expires_at >= CURRENT_TIMESTAMP OR attempts < %s)
+                    )
+                  )
+                """,
+                (self.run_id, self.max_attempts),
+            )
+            counts["remaining"] = cursor.fetchone()[0]
+            self.connection.commit()
+            return counts
+        except Error as e:
+            print(f"キュー状態取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.stats()
+
+
+class LeaseHeartbeat(threading.Thread):
+    """保持中のリースを一定間隔で延長するバックグラウンドスレッド
+
+    mysql-connectorの接続はスレッド間で共有できないため、専用の接続を使う。
+    """
+
+    def __init__(self, run_id: str, owner: str, lease_seconds: int, interval: float):
+        super().__init__(daemon=True)
+        self.run_id = run_id
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self._item_ids = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def hold(self, item_id: int) -> None:
+        with self._lock:
+            self._item_ids.add(item_id)
+
+    def release(self, item_id: int) -> None:
+        with self._lock:
+            self._item_ids.discard(item_id)
+
+    def run(self) -> None:
+        db_handler = DatabaseHandler()
+        queue = CrawlQueue(db_handler, self.run_id, self.owner, self.lease_seconds)
+        try:
+            while not self._stop_event.wait(self.interval):
+                with self._lock:
+                    item_ids = list(self._item_ids)
+                queue.heartbeat(item_ids)
+        finally:
+            db_handler.close()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=self.interval)
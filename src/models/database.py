@@ -1,15 +1,51 @@
 import os
+from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Callable
 from dotenv import load_dotenv
+from models.records import CARD_FIELDS, CardRecord, ExchangeRecord, InsuranceRecord, ServiceRecord
+from models.text_dictionary import TextDictionary, resolved_table
+from models.shop_identity import ShopIdentityIndex, canonical_shop_name
 
 load_dotenv()
 
+# upsert_cardで一意キー（kakaku_card_id）が重複したときに更新する列
+# deleted_atは再びランキングで見つかった行を復活させるためにNULLで上書きする（RunSweepが論理削除した行）
+CARD_UPDATE_COLUMNS = list(CARD_FIELDS[1:]) + ["deleted_at"]
+
+# ランキング以外（カードID指定・再取得など）で取得したときは、掲載終了の状態を変えない
+CARD_REFRESH_COLUMNS = list(CARD_FIELDS[1:])
+
+POINT_REWARD_UPDATE_COLUMNS = ["spending_amount", "given_points", "remarks", "from_kakaku"]
+
+EXCHANGE_UPDATE_COLUMNS = ["before_value", "after_value", "remarks", "deleted_at"]
+
+
+def create_database_handler(database: Optional[str] = None) -> "DatabaseHandler":
+    """DB_BACKEND（mysql / sqlite）に応じたDatabaseHandlerを作成"""
+    if os.getenv("DB_BACKEND", "mysql") == "sqlite":
+        from models.sqlite_database import SQLiteDatabaseHandler
+        return SQLiteDatabaseHandler(database)
+    return DatabaseHandler(database)
+
 
 class DatabaseHandler:
-    def __init__(self):
+    """MySQLのストレージバックエンド
+
+    SQLite版（models/sqlite_database.py）はこのクラスを継承し、接続とSQLの方言の違い
+    （upsert_clause, insert_ignore, update_ignore, batch）だけを差し替える。
+    """
+
+    dialect = "mysql"
+    insert_ignore = "INSERT IGNORE"
+    update_ignore = "UPDATE IGNORE"
+
+    def __init__(self, database: Optional[str] = None):
+        self.database = database or os.getenv("MYSQL_DATABASE", "card_db")
         self.connection = None
+        self.texts = TextDictionary(self)
+        self.shops = ShopIdentityIndex(self)
         self.connect()
 
     def connect(self) -> None:
@@ -19,7 +55,7 @@ class DatabaseHandler:
                 host=os.getenv("MYSQL_HOST", "mysql"),
                 user=os.getenv("MYSQL_USER", "root"),
                 password=os.getenv("MYSQL_PASSWORD", "root"),
-                database=os.getenv("MYSQL_DATABASE", "card_db"),
+                database=self.database,
                 port=int(os.getenv("MYSQL_PORT", "3306")),
                 connect_timeout=60,
                 pool_size=5,
@@ -41,6 +77,20 @@ class DatabaseHandler:
             print(f"データベース再接続エラー: {e}")
             raise
 
+    def upsert_clause(self, conflict_columns: List[str], update_columns: List[str]) -> str:
+        """一意キーが重複したときに指定した列を更新する句（MySQLは重複したキーを自動で判定）"""
+        assignments = ",\n".join(f"{column} = VALUES({column})" for column in update_columns)
+        return f"ON DUPLICATE KEY UPDATE\n{assignments}"
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """1枚分の書き込みなどをまとめる区間（MySQLでは各メソッドが従来どおりコミットする）"""
+        yield
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """書き込みがコミットされてからキャッシュを更新する（MySQLでは各メソッドがコミット済みなのですぐ実行する）"""
+        callback()
+
     def _ensure_connection(self) -> None:
         """接続が有効か確認し、必要に応じて再接続"""
         try:
@@ -102,23 +152,89 @@ class DatabaseHandler:
             return self.get_card_id(kakaku_card_id)
     
     def get_shop_id(self, shop_data: Dict[str, Any]) -> int:
-        """ショップIDを取得"""
+        """ショップIDを取得（表記揺れはショップの索引で既存のショップに寄せる）"""
         self._ensure_connection()
         try:
+            shop_id = self.shops.resolve(shop_data["shop_name"], shop_data["category"])
+            if shop_id is not None:
+                return shop_id
             cursor = self.connection.cursor()
             cursor.execute("SELECT id FROM shops WHERE shop_name = %s AND is_online = %s AND category = %s", (shop_data["shop_name"], shop_data["is_online"], shop_data["category"]))
             result = cursor.fetchone()
             if result:
-                return result[0]
+                shop_id = result[0]
             else:
                 cursor.execute("INSERT INTO shops (shop_name, is_online, category, created_by) VALUES (%s, %s, %s, %s)", (shop_data["shop_name"], shop_data["is_online"], shop_data["category"], "batch"))
                 self.connection.commit()
-                return cursor.lastrowid
+                shop_id = cursor.lastrowid
+            # batch()の区間がロールバックされたときに、存在しないショップを索引に残さない
+            self.after_commit(lambda: self.shops.add(shop_id, shop_data["shop_name"], shop_data["category"]))
+            return shop_id
         except Error as e:
             print(f"ショップID取得エラー: {e}")
             self.reconnect()
             return self.get_shop_id(shop_data)
-        
+
+    def get_shop_ids(self, shops: List[Dict[str, Any]]) -> Dict[str, int]:
+        """複数ショップのIDを一括で取得（未登録のショップはまとめて登録）
+
+        shop_nameはshopsテーブルでユニークなため、ショップ名をキーにしたIDの辞書を返す。
+        索引で解決できた名前はDBに問い合わせず、残りだけをまとめて取得・登録する。
+        """
+        shops_by_name = {}
+        for shop in shops:
+            shops_by_name.setdefault(shop["shop_name"], shop)
+        if not shops_by_name:
+            return {}
+        self._ensure_connection()
+        try:
+            shop_ids = {}
+            for name, shop in shops_by_name.items():
+                shop_id = self.shops.resolve(name, shop["category"])
+                if shop_id is not None:
+                    shop_ids[name] = shop_id
+            # 同じ呼び出しの中の表記揺れは、正規化した名前ごとに最初の1件だけを登録する
+            representatives = {}
+            for name in shops_by_name:
+                if name not in shop_ids:
+                    representatives.setdefault(canonical_shop_name(name), name)
+            names = list(representatives.values())
+            if not names:
+                return shop_ids
+
+            cursor = self.connection.cursor()
+            placeholders = ", ".join(["%s"] * len(names))
+            query = f"SELECT shop_name, id FROM shops WHERE shop_name IN ({placeholders})"
+            cursor.execute(query, names)
+            found = dict(cursor.fetchall())
+
+            missing = [shops_by_name[name] for name in names if name not in found]
+            if missing:
+                cursor.executemany(
+                    f"{self.insert_ignore} INTO shops (shop_name, is_online, category, created_by) VALUES (%s, %s, %s, %s)",
+                    [(shop["shop_name"], shop["is_online"], shop["category"], "batch") for shop in missing],
+                )
+                self.connection.commit()
+                cursor.execute(query, names)
+                found = dict(cursor.fetchall())
+            # 索引への追加はコミット後（batch()の区間がロールバックされたら追加しない）
+            self.after_commit(lambda: self._add_shops(found, shops_by_name))
+            shop_ids.update(found)
+            for name in shops_by_name:
+                if name not in shop_ids:
+                    representative = representatives[canonical_shop_name(name)]
+                    if representative in found:
+                        shop_ids[name] = found[representative]
+            return shop_ids
+        except Error as e:
+            print(f"ショップID一括取得エラー: {e}")
+            self.reconnect()
+            return self.get_shop_ids(shops)
+
+    def _add_shops(self, found: Dict[str, int], shops_by_name: Dict[str, Dict[str, Any]]) -> None:
+        for name, shop_id in found.items():
+            self.shops.add(shop_id, name, shops_by_name[name]["category"])
+
     def get_reward_id(self, reward_data: Dict[str, Any]) -> int:
         """ポイントIDを取得"""
         self._ensure_connection()
@@ -137,13 +253,13 @@ class DatabaseHandler:
             self.reconnect()
             return self.get_reward_id(reward_data)  
 
-    def upsert_card(self, card_data: Dict[str, Any]) -> int:
-        """カード情報を更新または挿入"""
+    def upsert_card(self, card_data: CardRecord, revive: bool = True) -> int:
+        """カード情報を更新または挿入（reviveがFalseなら論理削除済みのカードは論理削除のまま更新する）"""
         self._ensure_connection()
         try:
             cursor = self.connection.cursor()
             cursor.execute(
-                """
+                f"""
                 INSERT INTO cards (
                     kakaku_card_id, card_name, official_url, grade, issuer_id, point_id,
                     visa, mastercard, jcb, amex, diners, unionpay,
@@ -152,87 +268,25 @@ class DatabaseHandler:
                     revolving_interest_rate, cashing_interest_rate,
                     payment_methods, closing_date, remarks, annual_bonus_raw,
                     etc_card, family_card, electronic_money, electronic_money_charge,
-                    electronic_money_point, digital_wallet, code_payment
+                    electronic_money_point, digital_wallet, code_payment, deleted_at
                 ) VALUES (
                     %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
                     %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s
-                ) ON DUPLICATE KEY UPDATE
-                    card_name = VALUES(card_name),
-                    official_url = VALUES(official_url),
-                    grade = VALUES(grade),
-                    issuer_id = VALUES(issuer_id),
-                    point_id = VALUES(point_id),
-                    visa = VALUES(visa),
-                    mastercard = VALUES(mastercard),
-                    jcb = VALUES(jcb),
-                    amex = VALUES(amex),
-                    diners = VALUES(diners),
-                    unionpay = VALUES(unionpay),
-                    eligibility = VALUES(eligibility),
-                    application_method = VALUES(application_method),
-                    screening_period = VALUES(screening_period),
-                    annual_fee_raw = VALUES(annual_fee_raw),
-                    shopping_limit = VALUES(shopping_limit),
-                    cashing_limit = VALUES(cashing_limit),
-                    revolving_interest_rate = VALUES(revolving_interest_rate),
-                    cashing_interest_rate = VALUES(cashing_interest_rate),
-                    payment_methods = VALUES(payment_methods),
-                    closing_date = VALUES(closing_date),
-                    remarks = VALUES(remarks),
-                    annual_bonus_raw = VALUES(annual_bonus_raw),
-                    etc_card = VALUES(etc_card),
-                    family_card = VALUES(family_card),
-                    electronic_money = VALUES(electronic_money),
-                    electronic_money_charge = VALUES(electronic_money_charge),
-                    electronic_money_point = VALUES(electronic_money_point),
-                    digital_wallet = VALUES(digital_wallet),
-                    code_payment = VALUES(code_payment)
+                    %s, %s, %s, %s, %s, %s, %s, NULL
+                ) {self.upsert_clause(["kakaku_card_id"], CARD_UPDATE_COLUMNS if revive else CARD_REFRESH_COLUMNS)}
                 """,
-                (
-                    card_data["kakaku_card_id"],
-                    card_data["card_name"],
-                    card_data["official_url"],
-                    card_data["grade"],
-                    card_data["issuer_id"],
-                    card_data["point_id"],
-                    card_data["visa"],
-                    card_data["mastercard"],
-                    card_data["jcb"],
-                    card_data["amex"],
-                    card_data["diners"],
-                    card_data["unionpay"],
-                    card_data["eligibility"],
-                    card_data["application_method"],
-                    card_data["screening_period"],
-                    card_data["annual_fee_raw"],
-                    card_data["shopping_limit"],
-                    card_data["cashing_limit"],
-                    card_data["revolving_interest_rate"],
-                    card_data["cashing_interest_rate"],
-                    card_data["payment_methods"],
-                    card_data["closing_date"],
-                    card_data["remarks"],
-                    card_data["annual_bonus_raw"],
-                    card_data["etc_card"],
-                    card_data["family_card"],
-                    card_data["electronic_money"],
-                    card_data["electronic_money_charge"],
-                    card_data["electronic_money_point"],
-                    card_data["digital_wallet"],
-                    card_data["code_payment"]
-                ),
+                card_data.to_params(),
             )
             self.connection.commit()
             
             # 挿入または更新されたカードのIDを取得
-            cursor.execute("SELECT id FROM cards WHERE kakaku_card_id = %s", (card_data["kakaku_card_id"],))
+            cursor.execute("SELECT id FROM cards WHERE kakaku_card_id = %s", (card_data.kakaku_card_id,))
             result = cursor.fetchone()
             return result[0] if result else None
         except Error as e:
             print(f"カード情報更新エラー: {e}")
             self.reconnect()
-            return self.upsert_card(card_data)
+            return self.upsert_card(card_data, revive)
         
     def upsert_point_reward(self, point_reward_data: Dict[str, Any]) -> None:
         """ポイント還元情報を更新または挿入"""
@@ -240,15 +294,11 @@ class DatabaseHandler:
         try:
             cursor = self.connection.cursor()
             cursor.execute(
-                """
+                f"""
                 INSERT INTO point_rewards (
                     card_id, shop_id, spending_amount, given_points, remarks, from_kakaku
                 ) VALUES (%s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    spending_amount = VALUES(spending_amount),
-                    given_points = VALUES(given_points),
-                    remarks = VALUES(remarks),
-                    from_kakaku = VALUES(from_kakaku)
+                {self.upsert_clause(["card_id", "shop_id"], POINT_REWARD_UPDATE_COLUMNS)}
                 """,
                 (
                     point_reward_data["card_id"],
@@ -265,53 +315,100 @@ class DatabaseHandler:
             self.reconnect()
             return self.upsert_point_reward(point_reward_data)
 
-    def upsert_point_exchange(self, point_exchange_data: Dict[str, Any]) -> None:
+    def upsert_point_rewards(self, point_rewards: List[Dict[str, Any]]) -> None:
+        """ポイント還元情報を複数行のINSERT 1文でまとめて更新または挿入"""
+        if not point_rewards:
+            return
+        self._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(point_rewards))
+            params = []
+            for reward in point_rewards:
+                params.extend((
+                    reward["card_id"],
+                    reward["shop_id"],
+                    reward["spending_amount"],
+                    reward["given_points"],
+                    reward["remarks"],
+                    reward["from_kakaku"],
+                ))
+            cursor.execute(
+                f"""
+                INSERT INTO point_rewards (
+                    card_id, shop_id, spending_amount, given_points, remarks, from_kakaku
+                ) VALUES {values}
+                {self.upsert_clause(["card_id", "shop_id"], POINT_REWARD_UPDATE_COLUMNS)}
+                """,
+                params,
+            )
+            self.connection.commit()
+        except Error as e:
+            print(f"ポイント還元情報一括更新エラー: {e}")
+            self.reconnect()
+            return self.upsert_point_rewards(point_rewards)
+
+    def upsert_point_exchange(self, point_exchange_data: ExchangeRecord) -> None:
         """ポイント交換情報を更新または挿入"""
         self._ensure_connection()
         try:
             cursor = self.connection.cursor()
             cursor.execute(
-                """
+                f"""
                 INSERT INTO point_exchanges (
-                    card_id, exchangeable_reward_id, before_value, after_value, remarks
-                ) VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    before_value = VALUES(before_value),
-                    after_value = VALUES(after_value),
-                    remarks = VALUES(remarks)
+                    card_id, exchangeable_reward_id, before_value, after_value, remarks, deleted_at
+                ) VALUES (%s, %s, %s, %s, %s, NULL)
+                {self.upsert_clause(["card_id", "exchangeable_reward_id"], EXCHANGE_UPDATE_COLUMNS)}
                 """,
-                (
-                    point_exchange_data["card_id"],
-                    point_exchange_data["exchangeable_reward_id"],
-                    point_exchange_data["before_value"],
-                    point_exchange_data["after_value"],
-                    point_exchange_data["remarks"],
-                ),
+                point_exchange_data.to_params(),
             )
             self.connection.commit()
         except Error as e:
             print(f"ポイント交換情報更新エラー: {e}")
 
-    def upsert_include_insurance(self, include_insurance_data: Dict[str, Any]) -> None:
-        """付帯保険情報を更新または挿入"""
+    def upsert_point_exchanges(self, point_exchanges: List[ExchangeRecord]) -> None:
+        """ポイント交換情報をexecutemanyでまとめて更新または挿入"""
+        if not point_exchanges:
+            return
+        self._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                f"""
+                INSERT INTO point_exchanges (
+                    card_id, exchangeable_reward_id, before_value, after_value, remarks, deleted_at
+                ) VALUES (%s, %s, %s, %s, %s, NULL)
+                {self.upsert_clause(["card_id", "exchangeable_reward_id"], EXCHANGE_UPDATE_COLUMNS)}
+                """,
+                [exchange.to_params() for exchange in point_exchanges],
+            )
+            self.connection.commit()
+        except Error as e:
+            print(f"ポイント交換情報一括更新エラー: {e}")
+            self.reconnect()
+            return self.upsert_point_exchanges(point_exchanges)
+
+    def upsert_include_insurance(self, include_insurance_data: InsuranceRecord) -> None:
+        """付帯保険情報を更新または挿入（カテゴリと保険金額はtext_dictionaryのIDで保存）"""
         self._ensure_connection()
         try:
+            category = include_insurance_data.category or ""
+            coverage_amount = include_insurance_data.coverage_amount
+            text_ids = self.texts.intern([category, coverage_amount])
             cursor = self.connection.cursor()
             cursor.execute(
-                """
+                f"""
                 INSERT INTO card_include_insurances (
-                    card_id, category, coverage_type, coverage_amount, remarks
-                ) VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    coverage_amount = VALUES(coverage_amount),
-                    remarks = VALUES(remarks)
+                    card_id, category_id, coverage_type, coverage_amount_id, remarks, deleted_at
+                ) VALUES (%s, %s, %s, %s, %s, NULL)
+                {self.upsert_clause(["card_id", "category_id", "coverage_type"], ["coverage_amount_id", "remarks", "deleted_at"])}
                 """,
                 (
-                    include_insurance_data["card_id"],
-                    include_insurance_data["category"],
-                    include_insurance_data["coverage_type"],
-                    include_insurance_data["coverage_amount"],
-                    include_insurance_data["remarks"],
+                    include_insurance_data.card_id,
+                    text_ids[category],
+                    include_insurance_data.coverage_type,
+                    text_ids[coverage_amount],
+                    include_insurance_data.remarks,
                 ),
             )
             self.connection.commit()
@@ -320,25 +417,25 @@ class DatabaseHandler:
             self.reconnect()
             return self.upsert_include_insurance(include_insurance_data)
 
-    def upsert_include_service(self, include_service_data: Dict[str, Any]) -> None:
-        """付帯サービス情報を更新または挿入"""
+    def upsert_include_service(self, include_service_data: ServiceRecord) -> None:
+        """付帯サービス情報を更新または挿入（サービス内容はtext_dictionaryのIDで保存）"""
         self._ensure_connection()
         try:
+            service_content = include_service_data.service_content or ""
+            text_ids = self.texts.intern([service_content])
             cursor = self.connection.cursor()
             cursor.execute(
-                """
+                f"""
                 INSERT INTO card_include_services (
-                    card_id, service_name, service_content, remarks
-                ) VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    service_content = VALUES(service_content),
-                    remarks = VALUES(remarks)
+                    card_id, service_name, service_content_id, remarks, deleted_at
+                ) VALUES (%s, %s, %s, %s, NULL)
+                {self.upsert_clause(["card_id", "service_name"], ["service_content_id", "remarks", "deleted_at"])}
                 """,
                 (
-                    include_service_data["card_id"],
-                    include_service_data["service_name"],
-                    include_service_data["service_content"],
-                    include_service_data["remarks"],
+                    include_service_data.card_id,
+                    include_service_data.service_name,
+                    text_ids[service_content],
+                    include_service_data.remarks,
                 ),
             )
             self.connection.commit()
@@ -413,6 +510,38 @@ class DatabaseHandler:
             self.reconnect()
             return self.get_all_point_rewards()
 
+    def get_include_insurances(self, card_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """付帯保険情報を取得（カテゴリと保険金額は本文に戻す）"""
+        self._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            query = f"SELECT * FROM {resolved_table('card_include_insurances')} WHERE deleted_at IS NULL"
+            if card_id is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(f"{query} AND card_id = %s", (card_id,))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"付帯保険情報取得エラー: {e}")
+            self.reconnect()
+            return self.get_include_insurances(card_id)
+
+    def get_include_services(self, card_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """付帯サービス情報を取得（サービス内容は本文に戻す）"""
+        self._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            query = f"SELECT * FROM {resolved_table('card_include_services')} WHERE deleted_at IS NULL"
+            if card_id is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(f"{query} AND card_id = %s", (card_id,))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"付帯サービス情報取得エラー: {e}")
+            self.reconnect()
+            return self.get_include_services(card_id)
+
     def insert_point_reward(self, reward_data: Dict[str, Any]) -> None:
         """ポイント還元情報を挿入"""
         self._ensure_connection()
@@ -0,0 +1,138 @@
+import hashlib
+from typing import List, Dict, Any, Optional, Set
+from mysql.connector import Error
+from models.database import DatabaseHandler
+
+
+def graph_hash(inputs: Dict[str, List[tuple]]) -> str:
+    """交換グラフの入力（ポイント・交換先・交換レート）のハッシュ"""
+    digest = hashlib.sha1()
+    for name in sorted(inputs):
+        digest.update(name.encode("utf-8"))
+        for row in inputs[name]:
+            digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ExchangeValueStore:
+    """交換グラフの入力の読み込みと、ポイント・カードごとの最良の円換算額の保存
+
+    保存した行には入力のハッシュ（graph_hash）を持たせ、ポイント交換の行が変わっていなければ計算し直さない。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.db_handler = db_handler
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def load_inputs(self) -> Dict[str, List[tuple]]:
+        """ポイント（ID, 名前）・交換先（ID, カテゴリ, 名前, 単位）・交換レート（カード, ポイント, 交換先, 交換前, 交換後）"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT id, point_name FROM m_points WHERE deleted_at IS NULL ORDER BY id")
+            programs = [tuple(row) for row in cursor.fetchall()]
+            cursor.execute("SELECT id, category, reward_name, unit FROM m_exchangeable_rewards WHERE deleted_at IS NULL ORDER BY id")
+            rewards = [tuple(row) for row in cursor.fetchall()]
+            cursor.execute(
+                """
+                SELECT e.card_id, c.point_id, e.exchangeable_reward_id, e.before_value, e.after_value
+                FROM point_exchanges e
+                JOIN cards c ON c.id = e.card_id
+                WHERE e.deleted_at IS NULL AND c.deleted_at IS NULL AND e.before_value > 0
+                ORDER BY e.card_id, e.exchangeable_reward_id
+                """
+            )
+            exchanges = [tuple(row) for row in cursor.fetchall()]
+            self.connection.commit()
+            return {"programs": programs, "rewards": rewards, "exchanges": exchanges}
+        except Error as e:
+            print(f"交換グラフ入力取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.load_inputs()
+
+    def stored_hashes(self) -> Set[str]:
+        """保存済みの円換算額の計算に使った入力のハッシュ（全行が同じ入力から計算されていれば1件）"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                """
+                SELECT DISTINCT graph_hash FROM point_exchange_values
+                UNION
+                SELECT DISTINCT graph_hash FROM card_exchange_values
+                """
+            )
+            hashes = {row[0] for row in cursor.fetchall()}
+            self.connection.commit()
+            return hashes
+        except Error as e:
+            print(f"交換グラフのハッシュ取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.stored_hashes()
+
+    def save(self, input_hash: str, programs: List[tuple], cards: List[tuple]) -> None:
+        """ポイント・カードごとの(ID, 円換算額, 交換先ID, 経路)で保存済みの行を置き換える"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            for table, key, rows in (
+                ("point_exchange_values", "point_id", programs),
+                ("card_exchange_values", "card_id", cards),
+            ):
+                cursor.execute(f"DELETE FROM {table}")
+                if rows:
+                    cursor.executemany(
+                        f"""
+                        INSERT INTO {table} ({key}, yen_per_point, best_reward_id, path, graph_hash)
+                        VALUES (%s, %s, %s, %s, %s)
+                        """,
+                        [row + (input_hash,) for row in rows],
+                    )
+            self.connection.commit()
+        except Error as e:
+            print(f"交換価値保存エラー: {e}")
+            self.db_handler.reconnect()
+            self.save(input_hash, programs, cards)
+
+    def top_programs(self, limit: int) -> List[Dict[str, Any]]:
+        """1ポイントあたりの円換算額が高いポイント"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT p.point_name, v.yen_per_point, v.path
+                FROM point_exchange_values v
+                JOIN m_points p ON p.id = v.point_id
+                ORDER BY v.yen_per_point DESC, p.point_name
+                LIMIT %s
+                """,
+                (limit,),
+            )
+            programs = cursor.fetchall()
+            self.connection.commit()
+            return programs
+        except Error as e:
+            print(f"交換価値取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.top_programs(limit)
+
+    def get_card_value(self, card_id: int) -> Optional[Dict[str, Any]]:
+        """カードのポイントの最良の円換算額と交換経路"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT yen_per_point, best_reward_id, path, updated_at FROM card_exchange_values WHERE card_id = %s",
+                (card_id,),
+            )
+            value = cursor.fetchone()
+            self.connection.commit()
+            return value
+        except Error as e:
+            print(f"カードの交換価値取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.get_card_value(card_id)
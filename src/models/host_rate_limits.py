@@ -0,0 +1,85 @@
+from typing import Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+
+# DBサーバーの現在時刻（UNIX時刻・秒）。ノード間の時計のずれの影響を受けないよう、時刻はすべてDB側で求める
+NOW = "UNIX_TIMESTAMP(NOW(6))"
+
+
+class HostRateLimitStore:
+    """host_rate_limitsの1行を、複数のプロセス・ノードで共有するトークンバケットとして使う
+
+    next_slot_atは次のリクエストを送れる時刻で、reserve()は1文のUPDATEでそれを1/rate秒進めて自分の枠を確保する
+    （行ロックで直列化されるため、全ワーカー合計のリクエストレートがrateを超えない）。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler):
+        if db_handler.dialect != "mysql":
+            raise ValueError("ワーカー間で共有するレート制限はMySQLでのみ利用できます（DB_BACKEND=mysql）")
+        self.db_handler = db_handler
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def register(self, host: str, rate: float, stale_seconds: float) -> float:
+        """ホストの行を用意し、共有しているレートを返す
+
+        stale_seconds以上レートが変更されていなければ（前回の実行で減速したままなら）初期レートに戻す。
+        """
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"INSERT IGNORE INTO host_rate_limits (host, rate, rate_updated_at) VALUES (%s, %s, {NOW})",
+                (host, rate),
+            )
+            cursor.execute(
+                f"UPDATE host_rate_limits SET rate = %s, rate_updated_at = {NOW} "
+                f"WHERE host = %s AND rate_updated_at < {NOW} - %s",
+                (rate, host, stale_seconds),
+            )
+            cursor.execute("SELECT rate FROM host_rate_limits WHERE host = %s", (host,))
+            shared_rate = float(cursor.fetchone()[0])
+            self.connection.commit()
+            return shared_rate
+        except Error as e:
+            print(f"レート制限の登録エラー: {e}")
+            self.db_handler.reconnect()
+            return self.register(host, rate, stale_seconds)
+
+    def reserve(self, host: str) -> Tuple[float, float]:
+        """次のリクエストの枠を確保し、(枠までの待機秒数, 共有しているレート)を返す"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"UPDATE host_rate_limits SET next_slot_at = GREATEST(next_slot_at, {NOW}) + 1 / rate WHERE host = %s",
+                (host,),
+            )
+            cursor.execute(
+                f"SELECT next_slot_at - 1 / rate - {NOW}, rate FROM host_rate_limits WHERE host = %s",
+                (host,),
+            )
+            delay, rate = cursor.fetchone()
+            self.connection.commit()
+            return max(0.0, float(delay)), float(rate)
+        except Error as e:
+            print(f"レート制限の取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.reserve(host)
+
+    def set_rate(self, host: str, rate: float) -> None:
+        """減速・加速したレートを全ワーカーに反映"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"UPDATE host_rate_limits SET rate = %s, rate_updated_at = {NOW} WHERE host = %s",
+                (rate, host),
+            )
+            self.connection.commit()
+        except Error as e:
+            print(f"レート制限の更新エラー: {e}")
+            self.db_handler.reconnect()
+            self.set_rate(host, rate)
@@ -0,0 +1,136 @@
+import os
+import re
+import hashlib
+from typing import List, Dict, Any, NamedTuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+# 途中まで適用済みのマイグレーションや、新しいschema.sqlで作成したDBに再適用しても
+# 失敗しないよう、既に反映済みであることを示すエラーは無視する
+# （移行元の列を読むデータ移行は、列の有無を確認してから実行するようマイグレーション側で書く）
+IGNORABLE_ERRORS = {
+    1050,  # テーブルが既に存在する
+    1060,  # 列が既に存在する
+    1061,  # インデックス名が既に存在する
+    1826,  # 外部キー名が既に存在する
+    1091,  # 削除対象の列・インデックスが存在しない
+}
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+    checksum: str
+
+
+def schema_path() -> str:
+    """schema.sqlのパス（コンテナ内では/schema.sql、ローカルではリポジトリ直下）"""
+    default = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "schema.sql")
+    return os.getenv("SCHEMA_PATH", default)
+
+
+def split_sql_statements(sql: str) -> List[str]:
+    """行末の ; で区切られたSQLファイルを文ごとに分割（-- コメント行は除く）"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = re.split(r";\s*$", "\n".join(lines), flags=re.MULTILINE)
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def execute_sql_file(db_handler: DatabaseHandler, path: str) -> int:
+    """SQLファイルの各文を順に実行し、実行した文の数を返す"""
+    with open(path, encoding="utf-8") as f:
+        statements = split_sql_statements(f.read())
+    cursor = db_handler.connection.cursor()
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+        except Error as e:
+            if e.errno not in IGNORABLE_ERRORS:
+                raise
+            print(f"適用済みのためスキップ: {e.msg}")
+    db_handler.connection.commit()
+    return len(statements)
+
+
+class MigrationRunner:
+    """バージョン付きマイグレーション（migrations/NNNN_name.sql）を順に適用する
+
+    適用済みのバージョンはschema_migrationsテーブルに記録する。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, directory: str = MIGRATIONS_DIR):
+        self.db_handler = db_handler
+        self.directory = directory
+
+    def available(self) -> List[Migration]:
+        migrations = []
+        for filename in sorted(os.listdir(self.directory)):
+            match = re.match(r"^(\d+)_(\w+)\.sql$", filename)
+            if not match:
+                continue
+            path = os.path.join(self.directory, filename)
+            with open(path, "rb") as f:
+                checksum = hashlib.sha1(f.read()).hexdigest()
+            migrations.append(Migration(int(match.group(1)), match.group(2), path, checksum))
+        return migrations
+
+    def _ensure_table(self) -> None:
+        cursor = self.db_handler.connection.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                checksum CHAR(40) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        self.db_handler.connection.commit()
+
+    def applied(self) -> Dict[int, Dict[str, Any]]:
+        self.db_handler._ensure_connection()
+        self._ensure_table()
+        cursor = self.db_handler.connection.cursor(dictionary=True)
+        cursor.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+        rows = {row["version"]: row for row in cursor.fetchall()}
+        self.db_handler.connection.commit()
+        return rows
+
+    def status(self) -> List[Dict[str, Any]]:
+        """各マイグレーションの適用状況"""
+        applied = self.applied()
+        result = []
+        for migration in self.available():
+            row = applied.get(migration.version)
+            result.append({
+                "version": migration.version,
+                "name": migration.name,
+                "applied_at": row["applied_at"] if row else None,
+                "modified": bool(row) and row["checksum"] != migration.checksum,
+            })
+        return result
+
+    def pending(self) -> List[Migration]:
+        applied = self.applied()
+        return [migration for migration in self.available() if migration.version not in applied]
+
+    def migrate(self, dry_run: bool = False) -> List[Migration]:
+        """未適用のマイグレーションを適用し、適用したものを返す"""
+        pending = self.pending()
+        for migration in pending:
+            print(f"マイグレーション{'（dry-run）' if dry_run else ''}: {migration.version:04d}_{migration.name}")
+            if dry_run:
+                continue
+            execute_sql_file(self.db_handler, migration.path)
+            cursor = self.db_handler.connection.cursor()
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (migration.version, migration.name, migration.checksum),
+            )
+            self.db_handler.connection.commit()
+        return pending
@@ -0,0 +1,83 @@
+-- 初期のschema.sqlで作成されたデータベースに、その後追加したテーブル・列を反映する
+
+-- 価格.com由来フラグと、ポイント還元情報の一括upsert用のユニークキー
+ALTER TABLE point_rewards ADD COLUMN from_kakaku BOOLEAN DEFAULT FALSE NOT NULL COMMENT '価格.com由来フラグ' AFTER remarks;
+
+-- ユニークキー追加前に、同じカード・ショップの重複行は最新の1行だけ残す
+DELETE older FROM point_rewards older
+JOIN point_rewards newer
+  ON newer.card_id = older.card_id AND newer.shop_id = older.shop_id AND newer.id > older.id;
+
+ALTER TABLE point_rewards ADD UNIQUE KEY unique_point_reward (card_id, shop_id);
+
+CREATE TABLE IF NOT EXISTS crawl_queue (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL COMMENT 'クロール実行ID',
+    url VARCHAR(512) NOT NULL COMMENT 'カード詳細ページURL',
+    status VARCHAR(20) DEFAULT 'pending' NOT NULL COMMENT '状態（pending/leased/done/failed）',
+    lease_owner VARCHAR(255) COMMENT 'リース保持ノード',
+    lease_expires_at TIMESTAMP NULL COMMENT 'リース有効期限',
+    attempts INT DEFAULT 0 NOT NULL COMMENT '試行回数',
+    last_error TEXT COMMENT '最終エラー',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_crawl_queue (run_id, url),
+    KEY idx_crawl_queue_claim (run_id, status, lease_expires_at)
+);
+
+CREATE TABLE IF NOT EXISTS card_refresh_stats (
+    kakaku_card_id VARCHAR(50) PRIMARY KEY COMMENT '価格.comのカードID',
+    ranking_position INT COMMENT '直近のランキング順位',
+    last_scraped_at TIMESTAMP NULL COMMENT '最終取得日時',
+    last_changed_at TIMESTAMP NULL COMMENT '内容が最後に変化した日時',
+    content_hash CHAR(40) COMMENT '取得内容のハッシュ',
+    scrape_count INT DEFAULT 0 NOT NULL COMMENT '取得回数',
+    change_count INT DEFAULT 0 NOT NULL COMMENT '内容の変化回数',
+    avg_scrape_seconds FLOAT COMMENT '1枚あたりの平均取得秒数',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS card_field_changes (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    card_id INT NOT NULL,
+    entity VARCHAR(32) NOT NULL COMMENT '対象テーブル',
+    entity_key VARCHAR(512) NOT NULL DEFAULT '' COMMENT '子テーブルの行キー',
+    field_name VARCHAR(64) NOT NULL COMMENT '項目名（行の追加・削除は__row__）',
+    old_value TEXT COMMENT '変更前の値',
+    new_value TEXT COMMENT '変更後の値',
+    run_id VARCHAR(64) COMMENT '実行ID',
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    KEY idx_card_field_changes (card_id, changed_at)
+);
+
+CREATE TABLE IF NOT EXISTS card_images (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    card_id INT NOT NULL,
+    source_url VARCHAR(512) NOT NULL COMMENT '取得元URL',
+    etag VARCHAR(255) COMMENT '取得元のETag',
+    last_modified VARCHAR(255) COMMENT '取得元のLast-Modified',
+    content_hash CHAR(64) COMMENT '画像のSHA-256',
+    object_key VARCHAR(255) COMMENT '画像のオブジェクトキー',
+    thumbnail_key VARCHAR(255) COMMENT 'サムネイルのオブジェクトキー',
+    content_type VARCHAR(100) COMMENT 'Content-Type',
+    size_bytes INT COMMENT 'サイズ（バイト）',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    deleted_at TIMESTAMP NULL,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    UNIQUE KEY unique_card_image (card_id, source_url),
+    KEY idx_card_images_hash (content_hash)
+);
+
+CREATE TABLE IF NOT EXISTS card_search_documents (
+    card_id INT PRIMARY KEY,
+    card_name VARCHAR(255) NOT NULL COMMENT 'カード名（NFKC正規化済み）',
+    body MEDIUMTEXT NOT NULL COMMENT '検索対象本文（NFKC正規化済み）',
+    content_hash CHAR(40) NOT NULL COMMENT '文書のハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    FULLTEXT KEY ft_card_search (card_name, body) WITH PARSER ngram
+);
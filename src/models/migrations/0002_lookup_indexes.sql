@@ -0,0 +1,13 @@
+-- DatabaseHandlerの検索条件に合わせたインデックス
+
+-- get_shop_id: shop_name, is_online, category で検索してidを返す（カバリングインデックス）
+CREATE INDEX idx_shops_lookup ON shops (shop_name, is_online, category);
+
+-- get_reward_id: category, reward_name, unit で検索してidを返す
+CREATE INDEX idx_exchangeable_rewards_lookup ON m_exchangeable_rewards (category, reward_name, unit);
+
+-- CardHistory.as_of: カードごとの行の追加・削除（field_name = '__row__'）を日時順に読む
+CREATE INDEX idx_card_field_changes_field ON card_field_changes (card_id, field_name, changed_at);
+
+-- 子テーブルの読み込みは card_id + deleted_at IS NULL で行う
+CREATE INDEX idx_point_rewards_card ON point_rewards (card_id, deleted_at);
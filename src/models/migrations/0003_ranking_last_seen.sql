@@ -0,0 +1,2 @@
+-- ランキングで最後に見つけた日時（URL取得時に新規・掲載終了のカードを判定する）
+ALTER TABLE card_refresh_stats ADD COLUMN last_seen_at TIMESTAMP NULL COMMENT 'ランキングで最後に見つけた日時' AFTER ranking_position;
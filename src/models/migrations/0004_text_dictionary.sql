@@ -0,0 +1,73 @@
+-- 付帯保険のカテゴリ・保険金額と付帯サービスの内容を text_dictionary にまとめ、子テーブルにはIDだけを保存する
+
+CREATE TABLE IF NOT EXISTS text_dictionary (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    content_hash CHAR(40) NOT NULL UNIQUE COMMENT '本文のSHA-1',
+    content TEXT NOT NULL COMMENT '本文',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE card_include_insurances ADD COLUMN category_id BIGINT NULL COMMENT 'カテゴリ（text_dictionary.id）' AFTER card_id;
+ALTER TABLE card_include_insurances ADD COLUMN coverage_amount_id BIGINT NULL COMMENT '保険金額（text_dictionary.id）' AFTER coverage_type;
+ALTER TABLE card_include_services ADD COLUMN service_content_id BIGINT NULL COMMENT 'サービス内容（text_dictionary.id）' AFTER service_name;
+
+-- 既存の本文を辞書に登録し、IDを埋める
+-- （移行元の列がないDB＝移行済み・新しいschema.sqlで作成したDBでは何もしない）
+SET @insurance_columns = (
+    SELECT COUNT(*) FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'card_include_insurances'
+      AND COLUMN_NAME IN ('category', 'coverage_amount')
+);
+SET @service_columns = (
+    SELECT COUNT(*) FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'card_include_services'
+      AND COLUMN_NAME = 'service_content'
+);
+
+SET @backfill = IF(@insurance_columns = 2, '
+    INSERT IGNORE INTO text_dictionary (content_hash, content)
+    SELECT SHA1(category), category FROM card_include_insurances
+    UNION SELECT SHA1(coverage_amount), coverage_amount FROM card_include_insurances
+', 'DO 0');
+PREPARE backfill FROM @backfill;
+EXECUTE backfill;
+DEALLOCATE PREPARE backfill;
+
+SET @backfill = IF(@service_columns = 1, '
+    INSERT IGNORE INTO text_dictionary (content_hash, content)
+    SELECT SHA1(service_content), service_content FROM card_include_services
+', 'DO 0');
+PREPARE backfill FROM @backfill;
+EXECUTE backfill;
+DEALLOCATE PREPARE backfill;
+
+SET @backfill = IF(@insurance_columns = 2, '
+    UPDATE card_include_insurances i
+    JOIN text_dictionary category ON category.content_hash = SHA1(i.category)
+    JOIN text_dictionary amount ON amount.content_hash = SHA1(i.coverage_amount)
+    SET i.category_id = category.id, i.coverage_amount_id = amount.id
+', 'DO 0');
+PREPARE backfill FROM @backfill;
+EXECUTE backfill;
+DEALLOCATE PREPARE backfill;
+
+SET @backfill = IF(@service_columns = 1, '
+    UPDATE card_include_services s
+    JOIN text_dictionary content ON content.content_hash = SHA1(s.service_content)
+    SET s.service_content_id = content.id
+', 'DO 0');
+PREPARE backfill FROM @backfill;
+EXECUTE backfill;
+DEALLOCATE PREPARE backfill;
+
+-- ユニークキーを入れ替えてから元の列を削除する
+ALTER TABLE card_include_insurances
+    MODIFY category_id BIGINT NOT NULL COMMENT 'カテゴリ（text_dictionary.id）',
+    MODIFY coverage_amount_id BIGINT NOT NULL COMMENT '保険金額（text_dictionary.id）',
+    DROP INDEX unique_include_insurance,
+    ADD UNIQUE KEY unique_include_insurance (card_id, category_id, coverage_type);
+ALTER TABLE card_include_insurances DROP COLUMN category;
+ALTER TABLE card_include_insurances DROP COLUMN coverage_amount;
+
+ALTER TABLE card_include_services MODIFY service_content_id BIGINT NOT NULL COMMENT 'サービス内容（text_dictionary.id）';
+ALTER TABLE card_include_services DROP COLUMN service_content;
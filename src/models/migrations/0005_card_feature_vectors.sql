@@ -0,0 +1,11 @@
+-- 類似カード検索用の特徴ベクトル（国際ブランド・年会費・利用枠・ポイント・交換先・保険・サービス）
+-- card_feature_vectors table
+CREATE TABLE IF NOT EXISTS card_feature_vectors (
+    card_id INT PRIMARY KEY,
+    annual_fee INT COMMENT '年会費（円、年会費の原文から抽出）',
+    vector BLOB NOT NULL COMMENT '特徴ベクトル（float32の配列）',
+    content_hash CHAR(40) NOT NULL COMMENT 'ベクトルのハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id)
+);
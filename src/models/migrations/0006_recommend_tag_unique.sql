@@ -0,0 +1,8 @@
+-- レコメンドタグのルールで(カード, タグ)ごとにupsert・論理削除するためのユニークキー
+
+-- ユニークキー追加前に、同じカード・タグの重複行は最新の1行だけ残す
+DELETE older FROM card_recommend_tags older
+JOIN card_recommend_tags newer
+  ON newer.card_id = older.card_id AND newer.recommend_tag_id = older.recommend_tag_id AND newer.id > older.id;
+
+ALTER TABLE card_recommend_tags ADD UNIQUE KEY unique_card_recommend_tag (card_id, recommend_tag_id);
@@ -0,0 +1,11 @@
+-- ショップの統合履歴（統合した旧ショップ→残したショップ。旧名は索引で統合先に解決する）
+-- shop_merges table
+CREATE TABLE IF NOT EXISTS shop_merges (
+    old_shop_id INT PRIMARY KEY,
+    new_shop_id INT NOT NULL,
+    old_shop_name VARCHAR(255) NOT NULL COMMENT '統合前のショップ名',
+    merged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (old_shop_id) REFERENCES shops(id),
+    FOREIGN KEY (new_shop_id) REFERENCES shops(id),
+    KEY idx_shop_merges_new (new_shop_id)
+);
@@ -0,0 +1,26 @@
+-- ポイント交換のグラフから求めた最良の円換算額（ポイント交換の行が変わったときだけ再計算）
+-- point_exchange_values table
+CREATE TABLE IF NOT EXISTS point_exchange_values (
+    point_id INT PRIMARY KEY,
+    yen_per_point DOUBLE NOT NULL COMMENT '1ポイントあたりの最良の円換算額',
+    best_reward_id INT NOT NULL COMMENT '経路の終点の交換先',
+    path TEXT NOT NULL COMMENT '交換経路',
+    graph_hash CHAR(40) NOT NULL COMMENT '計算に使った入力のハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (point_id) REFERENCES m_points(id),
+    FOREIGN KEY (best_reward_id) REFERENCES m_exchangeable_rewards(id)
+);
+
+-- card_exchange_values table
+CREATE TABLE IF NOT EXISTS card_exchange_values (
+    card_id INT PRIMARY KEY,
+    yen_per_point DOUBLE NOT NULL COMMENT '1ポイントあたりの最良の円換算額',
+    best_reward_id INT NOT NULL COMMENT '経路の終点の交換先',
+    path TEXT NOT NULL COMMENT '交換経路',
+    graph_hash CHAR(40) NOT NULL COMMENT '計算に使った入力のハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id),
+    FOREIGN KEY (best_reward_id) REFERENCES m_exchangeable_rewards(id)
+);
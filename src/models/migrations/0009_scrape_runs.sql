@@ -0,0 +1,38 @@
+-- 実行記録（1回の実行の件数・スループットと、カード1枚ごとの結果・処理段階ごとの所要時間）
+-- scrape_runs table
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL COMMENT '実行ID（変更履歴・クロールキューのrun_idと同じ）',
+    command VARCHAR(32) NOT NULL COMMENT 'サブコマンド',
+    owner VARCHAR(255) NOT NULL COMMENT '実行ノード（ホスト名:プロセスID）',
+    status VARCHAR(20) DEFAULT 'running' NOT NULL COMMENT '状態（running/completed/failed）',
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '開始日時',
+    finished_at TIMESTAMP NULL COMMENT '終了日時',
+    cards_ok INT DEFAULT 0 NOT NULL COMMENT '成功したカード数',
+    cards_failed INT DEFAULT 0 NOT NULL COMMENT '失敗したカード数',
+    retries INT DEFAULT 0 NOT NULL COMMENT '再試行回数の合計',
+    elapsed_seconds FLOAT COMMENT '所要時間（秒）',
+    cards_per_minute FLOAT COMMENT 'スループット（枚/分）',
+    KEY idx_scrape_runs_command (command, finished_at),
+    KEY idx_scrape_runs_run_id (run_id)
+);
+
+-- scrape_run_items table
+CREATE TABLE IF NOT EXISTS scrape_run_items (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    scrape_run_id INT NOT NULL,
+    kakaku_card_id VARCHAR(50) NOT NULL COMMENT '価格.comのカードID',
+    url VARCHAR(512) NOT NULL COMMENT 'カード詳細ページURL',
+    status VARCHAR(20) NOT NULL COMMENT '結果（ok/failed）',
+    fetch_seconds FLOAT NOT NULL COMMENT '詳細ページの読み込みとカード項目の取得（秒）',
+    parse_seconds FLOAT NOT NULL COMMENT '還元率・交換・保険・サービスの表の読み取り（秒）',
+    db_seconds FLOAT NOT NULL COMMENT '保存と変更履歴の記録（秒）',
+    total_seconds FLOAT NOT NULL COMMENT '1枚の合計（秒）',
+    retries INT DEFAULT 0 NOT NULL COMMENT '再試行回数',
+    error_class VARCHAR(255) COMMENT '例外のクラス名',
+    error_message TEXT COMMENT 'エラーメッセージ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (scrape_run_id) REFERENCES scrape_runs(id),
+    KEY idx_scrape_run_items_run (scrape_run_id, total_seconds),
+    KEY idx_scrape_run_items_card (kakaku_card_id, status)
+);
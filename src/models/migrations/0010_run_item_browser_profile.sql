@@ -0,0 +1,2 @@
+-- 実行記録に、カードを取得したセッションのブラウザプロファイルの状態（空のプロファイル / 前回からの再利用）を追加
+ALTER TABLE scrape_run_items ADD COLUMN browser_profile VARCHAR(10) DEFAULT 'none' NOT NULL COMMENT 'ブラウザプロファイルの状態（none/cold/warm）' AFTER error_message;
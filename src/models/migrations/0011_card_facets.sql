@@ -0,0 +1,22 @@
+-- 絞り込み検索用に、カードごとに求めた(属性, 値)（内容が変わったカードだけ求め直す）
+-- card_facets table
+CREATE TABLE IF NOT EXISTS card_facets (
+    card_id INT PRIMARY KEY,
+    facet_keys TEXT NOT NULL COMMENT '属性=値 の改行区切り（掲載終了したカードは空）',
+    content_hash CHAR(40) NOT NULL COMMENT 'facet_keysのハッシュ',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (card_id) REFERENCES cards(id)
+);
+
+-- (属性, 値)ごとのカードIDのビットマップ（国際ブランド・発行会社・ポイント・タグ・追加機能）
+-- card_facet_bitmaps table
+CREATE TABLE IF NOT EXISTS card_facet_bitmaps (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    facet VARCHAR(50) NOT NULL COMMENT '属性（brand/issuer/point/tag/feature/all）',
+    facet_value VARCHAR(255) NOT NULL COMMENT '値',
+    bitmap BLOB NOT NULL COMMENT 'カードID番目のビットを立てたビット列（zlib圧縮）',
+    cardinality INT NOT NULL COMMENT 'カード数',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_card_facet_bitmap (facet, facet_value)
+);
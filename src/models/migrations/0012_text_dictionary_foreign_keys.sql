@@ -0,0 +1,8 @@
+-- 辞書化した列からtext_dictionaryへの外部キー（存在しないIDを保存すると、結合で行が消えずにエラーになる）
+
+ALTER TABLE card_include_insurances
+    ADD CONSTRAINT fk_include_insurance_category FOREIGN KEY (category_id) REFERENCES text_dictionary(id),
+    ADD CONSTRAINT fk_include_insurance_coverage_amount FOREIGN KEY (coverage_amount_id) REFERENCES text_dictionary(id);
+
+ALTER TABLE card_include_services
+    ADD CONSTRAINT fk_include_service_content FOREIGN KEY (service_content_id) REFERENCES text_dictionary(id);
@@ -0,0 +1,8 @@
+-- ホストごとのリクエストレート（分散クロールの全ワーカーで共有するトークンバケット）
+-- host_rate_limits table
+CREATE TABLE IF NOT EXISTS host_rate_limits (
+    host VARCHAR(255) PRIMARY KEY,
+    rate DOUBLE NOT NULL COMMENT '全ワーカー合計のリクエストレート（件/秒）',
+    next_slot_at DOUBLE NOT NULL DEFAULT 0 COMMENT '次のリクエストを送れる時刻（UNIX時刻・秒）',
+    rate_updated_at DOUBLE NOT NULL DEFAULT 0 COMMENT 'レートを最後に変更した時刻（UNIX時刻・秒）'
+);
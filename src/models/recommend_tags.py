@@ -0,0 +1,239 @@
+from datetime import datetime
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Set, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.records import BRAND_FIELDS
+from models.card_vectors import parse_annual_fee, parse_yen_amounts
+from models.text_dictionary import resolved_table
+
+# 1文あたりのカード数（SQLiteのバインド変数の上限より小さくする）
+TAG_BATCH_SIZE = 500
+
+# 付帯保険のカテゴリ名に含まれる語と、保険金額の最大値を入れる入力列
+INSURANCE_COLUMNS = {
+    "海外旅行": "overseas_travel_insurance",
+    "国内旅行": "domestic_travel_insurance",
+    "ショッピング": "shopping_insurance",
+}
+
+# タグ付けのルールから参照できる入力列と、該当する行がない場合の値
+DEFAULT_INPUTS: Dict[str, Any] = {
+    "annual_fee": None,
+    **{field: False for field in BRAND_FIELDS},
+    **{column: 0 for column in INSURANCE_COLUMNS.values()},
+    "airport_lounge": False,
+    "mile_exchange": False,
+    "max_exchange_rate": 0.0,
+    "etc_card_free": False,
+}
+INPUT_COLUMNS = tuple(DEFAULT_INPUTS)
+
+
+class RecommendTagStore:
+    """ルールの判定に使う入力列の読み込みと、card_recommend_tagsへの反映
+
+    反映は(カード, タグ)の集合の差分で行い、追加は一括のupsert、
+    外れたタグは1文でdeleted_atを設定する（論理削除した行は再び当てはまれば復活させる）。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.db_handler = db_handler
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def all_card_ids(self) -> List[int]:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT id FROM cards WHERE deleted_at IS NULL ORDER BY id")
+            card_ids = [row[0] for row in cursor.fetchall()]
+            self.connection.commit()
+            return card_ids
+        except Error as e:
+            print(f"タグ付け対象カード取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.all_card_ids()
+
+    def load_inputs(self, card_ids: List[int]) -> Dict[str, List[Any]]:
+        """カードごとの入力列（card_idsの順。年会費が読み取れない場合はNone）"""
+        self.db_handler._ensure_connection()
+        try:
+            rows = {card_id: dict(DEFAULT_INPUTS) for card_id in card_ids}
+            for start in range(0, len(card_ids), TAG_BATCH_SIZE):
+                self._load_batch(card_ids[start:start + TAG_BATCH_SIZE], rows)
+            self.connection.commit()
+        except Error as e:
+            print(f"タグ付け入力取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.load_inputs(card_ids)
+
+        columns = {column: [rows[card_id][column] for card_id in card_ids] for column in INPUT_COLUMNS}
+        columns["card_id"] = list(card_ids)
+        return columns
+
+    def _load_batch(self, card_ids: List[int], rows: Dict[int, Dict[str, Any]]) -> None:
+        placeholders = ", ".join(["%s"] * len(card_ids))
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(
+            f"SELECT id, annual_fee_raw, etc_card, {', '.join(BRAND_FIELDS)} FROM cards WHERE id IN ({placeholders})",
+            card_ids,
+        )
+        for card in cursor.fetchall():
+            inputs = rows[card["id"]]
+            inputs["annual_fee"] = parse_annual_fee(card["annual_fee_raw"])
+            inputs["etc_card_free"] = "無料" in (card["etc_card"] or "")
+            for field in BRAND_FIELDS:
+                inputs[field] = bool(card[field])
+
+        cursor = self.connection.cursor()
+        cursor.execute(
+            f"""
+            SELECT card_id, category, coverage_amount FROM {resolved_table("card_include_insurances")}
+            WHERE card_id IN ({placeholders}) AND deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        for card_id, category, coverage_amount in cursor.fetchall():
+            for keyword, column in INSURANCE_COLUMNS.items():
+                if keyword in category:
+                    rows[card_id][column] = max([rows[card_id][column]] + parse_yen_amounts(coverage_amount))
+        cursor.execute(
+            f"""
+            SELECT card_id, service_name, service_content FROM {resolved_table("card_include_services")}
+            WHERE card_id IN ({placeholders}) AND deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        for card_id, service_name, service_content in cursor.fetchall():
+            if "ラウンジ" in f"{service_name} {service_content}":
+                rows[card_id]["airport_lounge"] = True
+        cursor.execute(
+            f"""
+            SELECT e.card_id, r.category, r.reward_name, e.before_value, e.after_value
+            FROM point_exchanges e
+            JOIN m_exchangeable_rewards r ON r.id = e.exchangeable_reward_id
+            WHERE e.card_id IN ({placeholders}) AND e.deleted_at IS NULL
+            """,
+            card_ids,
+        )
+        for card_id, category, reward_name, before_value, after_value in cursor.fetchall():
+            inputs = rows[card_id]
+            if "マイル" in f"{category} {reward_name}":
+                inputs["mile_exchange"] = True
+            if before_value:
+                inputs["max_exchange_rate"] = max(inputs["max_exchange_rate"], after_value / before_value)
+
+    def sync_tags(self, tags: List[Tuple[str, str]]) -> Dict[str, int]:
+        """ルールのタグ（タグ名, カテゴリ）をm_recommend_tagsに登録し、タグ名ごとのIDを返す"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                f"""
+                INSERT INTO m_recommend_tags (tag_name, tag_category, deleted_at) VALUES (%s, %s, NULL)
+                {self.db_handler.upsert_clause(["tag_name"], ["tag_category", "deleted_at"])}
+                """,
+                tags,
+            )
+            placeholders = ", ".join(["%s"] * len(tags))
+            cursor.execute(
+                f"SELECT tag_name, id FROM m_recommend_tags WHERE tag_name IN ({placeholders})",
+                [tag_name for tag_name, _ in tags],
+            )
+            tag_ids = dict(cursor.fetchall())
+            self.connection.commit()
+            return tag_ids
+        except Error as e:
+            print(f"レコメンドタグ登録エラー: {e}")
+            self.db_handler.reconnect()
+            return self.sync_tags(tags)
+
+    def current_pairs(self, card_ids: List[int], tag_ids: Iterable[int]) -> Set[Tuple[int, int]]:
+        """指定したカード・タグのうち、現在付いている(カードID, タグID)"""
+        tag_ids = list(tag_ids)
+        self.db_handler._ensure_connection()
+        try:
+            pairs = set()
+            cursor = self.connection.cursor()
+            tag_placeholders = ", ".join(["%s"] * len(tag_ids))
+            for start in range(0, len(card_ids), TAG_BATCH_SIZE):
+                chunk = card_ids[start:start + TAG_BATCH_SIZE]
+                cursor.execute(
+                    f"""
+                    SELECT card_id, recommend_tag_id FROM card_recommend_tags
+                    WHERE card_id IN ({", ".join(["%s"] * len(chunk))})
+                      AND recommend_tag_id IN ({tag_placeholders})
+                      AND deleted_at IS NULL
+                    """,
+                    chunk + tag_ids,
+                )
+                pairs.update(cursor.fetchall())
+            self.connection.commit()
+            return pairs
+        except Error as e:
+            print(f"レコメンドタグ取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.current_pairs(card_ids, tag_ids)
+
+    def apply(self, added: Set[Tuple[int, int]], removed: Set[Tuple[int, int]]) -> None:
+        """タグの追加（論理削除済みの行は復活）と論理削除を1つのトランザクションで反映"""
+        if not added and not removed:
+            return
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            if added:
+                cursor.executemany(
+                    f"""
+                    INSERT INTO card_recommend_tags (card_id, recommend_tag_id, deleted_at) VALUES (%s, %s, NULL)
+                    {self.db_handler.upsert_clause(["card_id", "recommend_tag_id"], ["deleted_at"])}
+                    """,
+                    sorted(added),
+                )
+            # 外れたタグはタグごとに、該当カードをまとめて論理削除する
+            removed_by_tag: Dict[int, List[int]] = defaultdict(list)
+            for card_id, tag_id in sorted(removed):
+                removed_by_tag[tag_id].append(card_id)
+            deleted_at = datetime.now()
+            for tag_id, card_ids in removed_by_tag.items():
+                for start in range(0, len(card_ids), TAG_BATCH_SIZE):
+                    chunk = card_ids[start:start + TAG_BATCH_SIZE]
+                    cursor.execute(
+                        f"""
+                        UPDATE card_recommend_tags SET deleted_at = %s
+                        WHERE recommend_tag_id = %s AND deleted_at IS NULL
+                          AND card_id IN ({", ".join(["%s"] * len(chunk))})
+                        """,
+                        [deleted_at, tag_id] + chunk,
+                    )
+            self.connection.commit()
+        except Error as e:
+            print(f"レコメンドタグ反映エラー: {e}")
+            self.db_handler.reconnect()
+            self.apply(added, removed)
+
+    def get_card_tags(self, card_id: int) -> List[Dict[str, Any]]:
+        """カードに付いているタグ"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT t.tag_category, t.tag_name, ct.created_at, ct.updated_at
+                FROM card_recommend_tags ct
+                JOIN m_recommend_tags t ON t.id = ct.recommend_tag_id
+                WHERE ct.card_id = %s AND ct.deleted_at IS NULL AND t.deleted_at IS NULL
+                ORDER BY t.tag_category, t.tag_name
+                """,
+                (card_id,),
+            )
+            tags = cursor.fetchall()
+            self.connection.commit()
+            return tags
+        except Error as e:
+            print(f"カードのレコメンドタグ取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.get_card_tags(card_id)
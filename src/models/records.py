@@ -0,0 +1,180 @@
+import operator
+from typing import List, Dict, Any, Tuple, Sequence, Iterator, Type, TypeVar, Optional
+
+R = TypeVar("R", bound="Record")
+
+
+class Record:
+    """__slots__で項目を固定した行レコードの基底クラス
+
+    FIELDSはDBの列順と同じにし、to_params()でそのままSQLのパラメータとして渡せるようにする。
+    生成時にvalidate()で型と必須項目を確認する。
+    大量に生成する処理では、キーワード引数の辞書を作らないfrom_values()・blank()を使う。
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    # 空（Noneまたは空文字）を許さない項目
+    REQUIRED: Tuple[str, ...] = ()
+    # 項目ごとの型（Noneは許容する）
+    TYPES: Dict[str, Any] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._params = operator.attrgetter(*cls.FIELDS)
+
+    def __init__(self, **values: Any):
+        for field in self.__slots__:
+            setattr(self, field, values.pop(field, None))
+        if values:
+            raise TypeError(f"{type(self).__name__}に存在しない項目: {', '.join(values)}")
+        self.validate()
+
+    @classmethod
+    def from_values(cls: Type[R], values: Sequence[Any]) -> R:
+        """__slots__の順に並べた値から生成（足りない後ろの項目はNone）"""
+        record = cls.__new__(cls)
+        for field, value in zip(cls.__slots__, values):
+            setattr(record, field, value)
+        for field in cls.__slots__[len(values):]:
+            setattr(record, field, None)
+        record.validate()
+        return record
+
+    @classmethod
+    def blank(cls: Type[R]) -> R:
+        """全項目がNoneのレコード（項目を直接代入して組み立て、最後にvalidate()を呼ぶ）"""
+        record = cls.__new__(cls)
+        for field in cls.__slots__:
+            setattr(record, field, None)
+        return record
+
+    def validate(self) -> None:
+        name = type(self).__name__
+        for field in self.REQUIRED:
+            if getattr(self, field) in (None, ""):
+                raise ValueError(f"{name}.{field}が空です")
+        for field, expected in self.TYPES.items():
+            value = getattr(self, field)
+            if value is not None and not isinstance(value, expected):
+                raise ValueError(f"{name}.{field}の型が不正です: {value!r}")
+
+    def to_params(self) -> Tuple[Any, ...]:
+        """FIELDSの順に並べたSQLパラメータ"""
+        return self._params(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    # 辞書として扱っていた既存の処理（変更履歴・ハッシュ計算など）向け
+    def __getitem__(self, field: str) -> Any:
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return getattr(self, field, default)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+CARD_FIELDS = (
+    "kakaku_card_id", "card_name", "official_url", "grade", "issuer_id", "point_id",
+    "visa", "mastercard", "jcb", "amex", "diners", "unionpay",
+    "eligibility", "application_method", "screening_period",
+    "annual_fee_raw", "shopping_limit", "cashing_limit",
+    "revolving_interest_rate", "cashing_interest_rate",
+    "payment_methods", "closing_date", "remarks", "annual_bonus_raw",
+    "etc_card", "family_card", "electronic_money", "electronic_money_charge",
+    "electronic_money_point", "digital_wallet", "code_payment",
+)
+BRAND_FIELDS = ("visa", "mastercard", "jcb", "amex", "diners", "unionpay")
+
+
+class CardRecord(Record):
+    """カード詳細ページ1枚分（cardsテーブルの1行とカード画像のURL）"""
+
+    __slots__ = CARD_FIELDS + ("image_urls",)
+    FIELDS = CARD_FIELDS
+    REQUIRED = ("kakaku_card_id", "card_name", "issuer_id", "point_id")
+    TYPES = {
+        **{field: str for field in CARD_FIELDS},
+        **{field: bool for field in BRAND_FIELDS},
+        "issuer_id": int,
+        "point_id": int,
+        "image_urls": list,
+    }
+
+
+class ExchangeRecord(Record):
+    """ポイント交換（point_exchangesテーブルの1行）"""
+
+    __slots__ = FIELDS = ("card_id", "exchangeable_reward_id", "before_value", "after_value", "remarks")
+    REQUIRED = ("card_id", "exchangeable_reward_id", "before_value", "after_value")
+    TYPES = {"card_id": int, "exchangeable_reward_id": int, "before_value": int, "after_value": int, "remarks": str}
+
+    def validate(self) -> None:
+        super().validate()
+        if self.before_value <= 0 or self.after_value <= 0:
+            raise ValueError(f"交換レートが不正です: {self.before_value}→{self.after_value}")
+
+
+class InsuranceRecord(Record):
+    """付帯保険（card_include_insurancesテーブルの1行）"""
+
+    __slots__ = FIELDS = ("card_id", "category", "coverage_type", "coverage_amount", "remarks")
+    REQUIRED = ("card_id", "coverage_type", "coverage_amount")
+    TYPES = {"card_id": int, "category": str, "coverage_type": str, "coverage_amount": str, "remarks": str}
+
+
+class ServiceRecord(Record):
+    """付帯サービス（card_include_servicesテーブルの1行）"""
+
+    __slots__ = FIELDS = ("card_id", "service_name", "service_content", "remarks")
+    REQUIRED = ("card_id", "service_name")
+    TYPES = {"card_id": int, "service_name": str, "service_content": str, "remarks": str}
+
+
+class RecordBatch:
+    """同じ項目を持つ行を、項目ごとの配列（列）で保持する
+
+    一括書き込み（to_params()をexecutemanyに渡す）や書き出し（必要な列だけ取り出す）に使う。
+    """
+
+    __slots__ = ("fields", "columns")
+
+    def __init__(self, fields: Sequence[str], columns: Sequence[List[Any]]):
+        self.fields = tuple(fields)
+        self.columns = dict(zip(self.fields, columns))
+
+    @classmethod
+    def from_records(cls, record_type: Type[R], records: Sequence[R]) -> "RecordBatch":
+        columns = [list(column) for column in zip(*map(record_type._params, records))]
+        return cls(record_type.FIELDS, columns or [[] for _ in record_type.FIELDS])
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]], fields: Sequence[str]) -> "RecordBatch":
+        """DBから読み込んだ辞書の行から、指定した項目だけを列として取り出す"""
+        return cls(fields, [[row.get(field) for row in rows] for field in fields])
+
+    def __len__(self) -> int:
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+
+    def column(self, field: str) -> List[Any]:
+        return self.columns[field]
+
+    def to_params(self, fields: Optional[Sequence[str]] = None) -> List[Tuple[Any, ...]]:
+        """指定した項目（省略時は全項目）の順に並べた行ごとのパラメータ"""
+        return list(zip(*(self.columns[field] for field in (fields or self.fields))))
+
+    def records(self, record_type: Type[R]) -> Iterator[R]:
+        for values in self.to_params(record_type.FIELDS):
+            yield record_type.from_values(values)
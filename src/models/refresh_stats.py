@@ -0,0 +1,176 @@
+from datetime import datetime
+from typing import List, Dict, Any, Set
+from mysql.connector import Error
+from models.database import DatabaseHandler
+
+# 取得結果の記録（ハッシュが前回と異なれば変化として数える）
+RECORD_SCRAPE_SQL = {
+    # MySQLは左から順に代入するため、content_hashの更新より前に変化を判定する
+    "mysql": """
+        INSERT INTO card_refresh_stats (
+            kakaku_card_id, last_scraped_at, last_changed_at, content_hash,
+            scrape_count, change_count, avg_scrape_seconds
+        ) VALUES (%s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, %s, 1, 0, %s)
+        ON DUPLICATE KEY UPDATE
+            change_count = change_count + (
+                content_hash IS NOT NULL AND NOT (content_hash <=> VALUES(content_hash))
+            ),
+            last_changed_at = IF(
+                content_hash <=> VALUES(content_hash), last_changed_at, VALUES(last_changed_at)
+            ),
+            content_hash = VALUES(content_hash),
+            scrape_count = scrape_count + 1,
+            avg_scrape_seconds = IFNULL(
+                avg_scrape_seconds * 0.8 + VALUES(avg_scrape_seconds) * 0.2,
+                VALUES(avg_scrape_seconds)
+            ),
+            last_scraped_at = VALUES(last_scraped_at)
+    """,
+    # SQLiteのDO UPDATE SETは右辺が全て更新前の値を参照する
+    "sqlite": """
+        INSERT INTO card_refresh_stats (
+            kakaku_card_id, last_scraped_at, last_changed_at, content_hash,
+            scrape_count, change_count, avg_scrape_seconds
+        ) VALUES (%s, datetime('now', 'localtime'), datetime('now', 'localtime'), %s, 1, 0, %s)
+        ON CONFLICT (kakaku_card_id) DO UPDATE SET
+            change_count = change_count + (
+                content_hash IS NOT NULL AND content_hash IS NOT excluded.content_hash
+            ),
+            last_changed_at = CASE
+                WHEN content_hash IS excluded.content_hash THEN last_changed_at
+                ELSE excluded.last_changed_at
+            END,
+            content_hash = excluded.content_hash,
+            scrape_count = scrape_count + 1,
+            avg_scrape_seconds = IFNULL(
+                avg_scrape_seconds * 0.8 + excluded.avg_scrape_seconds * 0.2,
+                excluded.avg_scrape_seconds
+            ),
+            last_scraped_at = excluded.last_scraped_at
+    """,
+}
+
+
+class RefreshStatsStore:
+    """カードごとの取得履歴（順位・取得日時・変化回数）を保持する"""
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.db_handler = db_handler
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def record_rankings(self, card_urls: List[str], start: int = 1) -> None:
+        """ランキングページでの表示順を順位として記録（startは先頭のURLの順位）
+
+        あわせて見つけた日時を記録し、次回以降の新規・掲載終了カードの判定に使う。
+        """
+        if not card_urls:
+            return
+        self.db_handler._ensure_connection()
+        seen_at = datetime.now()
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                f"""
+                INSERT INTO card_refresh_stats (kakaku_card_id, ranking_position, last_seen_at)
+                VALUES (%s, %s, %s)
+                {self.db_handler.upsert_clause(["kakaku_card_id"], ["ranking_position", "last_seen_at"])}
+                """,
+                [
+                    (url.split("id=")[-1], position, seen_at)
+                    for position, url in enumerate(card_urls, start=start)
+                ],
+            )
+            self.connection.commit()
+        except Error as e:
+            print(f"ランキング順位記録エラー: {e}")
+            self.db_handler.reconnect()
+            self.record_rankings(card_urls, start)
+
+    def get_seen_card_ids(self) -> Set[str]:
+        """ランキングに掲載中として記録しているカードID"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT kakaku_card_id FROM card_refresh_stats WHERE last_seen_at IS NOT NULL"
+            )
+            card_ids = {row[0] for row in cursor.fetchall()}
+            self.connection.commit()
+            return card_ids
+        except Error as e:
+            print(f"ランキング掲載カード取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.get_seen_card_ids()
+
+    def clear_seen(self, kakaku_card_ids: List[str]) -> None:
+        """ランキングから消えたカードの掲載記録を消す（順位も空にする）"""
+        if not kakaku_card_ids:
+            return
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                """
+                UPDATE card_refresh_stats SET last_seen_at = NULL, ranking_position = NULL
+                WHERE kakaku_card_id = %s
+                """,
+                [(kakaku_card_id,) for kakaku_card_id in kakaku_card_ids],
+            )
+            self.connection.commit()
+        except Error as e:
+            print(f"ランキング掲載記録の削除エラー: {e}")
+            self.db_handler.reconnect()
+            self.clear_seen(kakaku_card_ids)
+
+    def record_scrape(self, kakaku_card_id: str, content_hash: str, seconds: float) -> None:
+        """取得結果を記録（ハッシュが前回と異なれば変化として数える）"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                RECORD_SCRAPE_SQL[self.db_handler.dialect],
+                (kakaku_card_id, content_hash, seconds),
+            )
+            self.connection.commit()
+        except Error as e:
+            print(f"取得履歴記録エラー: {e}")
+            self.db_handler.reconnect()
+            self.record_scrape(kakaku_card_id, content_hash, seconds)
+
+    def get_candidates(self) -> List[Dict[str, Any]]:
+        """再取得候補となる全カードの統計を取得
+
+        一度も取得していないランキング上のカードと、統計のない既存カードも含める（掲載終了のカードは除く）。
+        """
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT
+                    s.kakaku_card_id, s.ranking_position, s.last_scraped_at, s.last_changed_at,
+                    s.scrape_count, s.change_count, s.avg_scrape_seconds,
+                    s.created_at AS tracked_since, c.updated_at AS card_updated_at
+                FROM card_refresh_stats s
+                LEFT JOIN cards c ON c.kakaku_card_id = s.kakaku_card_id
+                WHERE c.id IS NULL OR c.deleted_at IS NULL
+                UNION ALL
+                SELECT
+                    c.kakaku_card_id, NULL, NULL, NULL,
+                    0, 0, NULL,
+                    c.created_at, c.updated_at
+                FROM cards c
+                LEFT JOIN card_refresh_stats s ON s.kakaku_card_id = c.kakaku_card_id
+                WHERE s.kakaku_card_id IS NULL AND c.deleted_at IS NULL
+                """
+            )
+            rows = cursor.fetchall()
+            self.connection.commit()
+            return rows
+        except Error as e:
+            print(f"取得履歴取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.get_candidates()
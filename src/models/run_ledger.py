@@ -0,0 +1,258 @@
+import os
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+
+# カード1枚の処理段階（fetch: 詳細ページの読み込みとカード項目の取得 /
+# parse: 同じページの還元率・交換・保険・サービスの表の読み取り / db: 保存と変更履歴の記録）
+# 付帯保険・付帯サービスは読み取りながら保存するため、保存の時間もparseに含まれる
+STAGES = ("fetch", "parse", "db")
+
+# scrape_run_itemsに保存するエラーメッセージの最大文字数
+ERROR_MESSAGE_LENGTH = 1000
+
+RunItem = Tuple[Any, ...]
+
+
+class StageTimer:
+    """カード1枚の処理段階ごとの所要時間（同じ段階を複数回通った場合は合算）"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.durations: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - started_at
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started_at
+
+
+def kakaku_card_id_from_url(url: str) -> str:
+    return url.split("id=")[-1]
+
+
+class RunLedger:
+    """1回の実行（scrape_runs）と、カード1枚ごとの結果・段階ごとの所要時間・再試行回数（scrape_run_items）を記録する
+
+    カードの結果はバッファにため、一定件数ごとにまとめてINSERTする（複数スレッドから呼ばれる）。
+    複数スレッドから使う場合は、他の書き込みと共有しない専用のdb_handlerを渡す。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, command: str, run_id: str, flush_size: int = 100):
+        self.db_handler = db_handler
+        self.command = command
+        self.run_id = run_id
+        self.flush_size = flush_size
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.counts = {"ok": 0, "failed": 0, "retries": 0}
+        self._buffer: List[RunItem] = []
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+        self.id = self._start()
+
+    def _start(self) -> int:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.db_handler.connection.cursor()
+            cursor.execute(
+                "INSERT INTO scrape_runs (run_id, command, owner, status, started_at) VALUES (%s, %s, %s, %s, %s)",
+                (self.run_id, self.command, self.owner, "running", datetime.now()),
+            )
+            self.db_handler.connection.commit()
+            return cursor.lastrowid
+        except Error as e:
+            print(f"実行記録の開始エラー: {e}")
+            self.db_handler.reconnect()
+            return self._start()
+
+    def record_item(
+        self,
+        url: str,
+        timer: StageTimer,
+        retries: int = 0,
+        error: Optional[BaseException] = None,
+        browser_profile: str = "none",
+    ) -> None:
+        """カード1枚の結果をバッファに追加（errorがあれば失敗として記録）"""
+        status = "ok" if error is None else "failed"
+        item = (
+            self.id,
+            kakaku_card_id_from_url(url),
+            url,
+            status,
+            *(timer.durations[stage] for stage in STAGES),
+            timer.total,
+            retries,
+            type(error).__name__ if error is not None else None,
+            str(error)[:ERROR_MESSAGE_LENGTH] if error is not None else None,
+            browser_profile,
+        )
+        with self._lock:
+            self.counts[status] += 1
+            self.counts["retries"] += retries
+            self._buffer.append(item)
+            if len(self._buffer) >= self.flush_size:
+                self._flush_locked()
+
+    def flush(self) -> int:
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        if not self._buffer:
+            return 0
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.db_handler.connection.cursor()
+            cursor.executemany(
+                f"""
+                INSERT INTO scrape_run_items (
+                    scrape_run_id, kakaku_card_id, url, status,
+                    {", ".join(f"{stage}_seconds" for stage in STAGES)}, total_seconds,
+                    retries, error_class, error_message, browser_profile
+                ) VALUES ({", ".join(["%s"] * (len(STAGES) + 9))})
+                """,
+                self._buffer,
+            )
+            self.db_handler.connection.commit()
+            count = len(self._buffer)
+            self._buffer = []
+            return count
+        except Error as e:
+            print(f"実行記録の書き込みエラー: {e}")
+            self.db_handler.reconnect()
+            return self._flush_locked()
+
+    def finish(self, status: str = "completed") -> Dict[str, Any]:
+        """残りの結果を書き込み、実行全体の件数とスループットを記録"""
+        self.flush()
+        elapsed = time.time() - self._started_at
+        cards = self.counts["ok"] + self.counts["failed"]
+        summary = {
+            **self.counts,
+            "elapsed_seconds": elapsed,
+            "cards_per_minute": cards / elapsed * 60 if elapsed > 0 else 0.0,
+        }
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.db_handler.connection.cursor()
+            cursor.execute(
+                """
+                UPDATE scrape_runs
+                SET status = %s, finished_at = %s, cards_ok = %s, cards_failed = %s, retries = %s,
+                    elapsed_seconds = %s, cards_per_minute = %s
+                WHERE id = %s
+                """,
+                (
+                    status, datetime.now(), summary["ok"], summary["failed"], summary["retries"],
+                    summary["elapsed_seconds"], summary["cards_per_minute"], self.id,
+                ),
+            )
+            self.db_handler.connection.commit()
+            return summary
+        except Error as e:
+            print(f"実行記録の終了エラー: {e}")
+            self.db_handler.reconnect()
+            return self.finish(status)
+
+
+class RunLedgerReader:
+    """scrape_runs・scrape_run_itemsからレポート用の集計を読み出す"""
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.db_handler = db_handler
+
+    def _fetch(self, query: str, params: tuple, label: str) -> List[Dict[str, Any]]:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.db_handler.connection.cursor(dictionary=True)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            self.db_handler.connection.commit()
+            return rows
+        except Error as e:
+            print(f"{label}エラー: {e}")
+            self.db_handler.reconnect()
+            return self._fetch(query, params, label)
+
+    def recent_runs(self, command: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """終了した実行（新しい順）と、段階ごとの1枚あたりの平均所要時間"""
+        condition = "AND r.command = %s" if command else ""
+        return self._fetch(
+            f"""
+            SELECT
+                r.id, r.run_id, r.command, r.owner, r.started_at, r.elapsed_seconds, r.cards_per_minute,
+                r.cards_ok, r.cards_failed, r.retries,
+                {", ".join(f"AVG(i.{stage}_seconds) AS {stage}_seconds" for stage in STAGES)}
+            FROM scrape_runs r
+            LEFT JOIN scrape_run_items i ON i.scrape_run_id = r.id AND i.status = 'ok'
+            WHERE r.finished_at IS NOT NULL {condition}
+            GROUP BY r.id, r.run_id, r.command, r.owner, r.started_at, r.elapsed_seconds, r.cards_per_minute,
+                r.cards_ok, r.cards_failed, r.retries
+            ORDER BY r.id DESC
+            LIMIT %s
+            """,
+            ((command,) if command else ()) + (limit,),
+            "実行記録取得",
+        )
+
+    def slowest_items(self, scrape_run_id: int, limit: int) -> List[Dict[str, Any]]:
+        return self._fetch(
+            f"""
+            SELECT kakaku_card_id, status, total_seconds, retries, {", ".join(f"{stage}_seconds" for stage in STAGES)}
+            FROM scrape_run_items
+            WHERE scrape_run_id = %s
+            ORDER BY total_seconds DESC
+            LIMIT %s
+            """,
+            (scrape_run_id, limit),
+            "低速カード取得",
+        )
+
+    def profile_latency(self, scrape_run_ids: List[int]) -> List[Dict[str, Any]]:
+        """ブラウザプロファイルの状態（none / cold / warm）ごとの詳細ページ取得時間"""
+        if not scrape_run_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(scrape_run_ids))
+        return self._fetch(
+            f"""
+            SELECT browser_profile, COUNT(*) AS cards, AVG(fetch_seconds) AS fetch_seconds, MAX(fetch_seconds) AS max_fetch_seconds
+            FROM scrape_run_items
+            WHERE status = 'ok' AND scrape_run_id IN ({placeholders})
+            GROUP BY browser_profile
+            ORDER BY browser_profile
+            """,
+            tuple(scrape_run_ids),
+            "プロファイル別取得時間",
+        )
+
+    def failure_hotspots(self, scrape_run_ids: List[int], limit: int) -> List[Dict[str, Any]]:
+        """指定した実行で失敗が多いカードとエラーの種類"""
+        if not scrape_run_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(scrape_run_ids))
+        return self._fetch(
+            f"""
+            SELECT kakaku_card_id, error_class, COUNT(*) AS failures,
+                COUNT(DISTINCT scrape_run_id) AS runs, MAX(error_message) AS error_message
+            FROM scrape_run_items
+            WHERE status = 'failed' AND scrape_run_id IN ({placeholders})
+            GROUP BY kakaku_card_id, error_class
+            ORDER BY failures DESC, kakaku_card_id
+            LIMIT %s
+            """,
+            tuple(scrape_run_ids) + (limit,),
+            "失敗カード取得",
+        )
@@ -0,0 +1,228 @@
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.records import ExchangeRecord, InsuranceRecord, ServiceRecord
+
+# apply: 論理削除する / dry-run: 件数を表示するだけ / off: 何もしない
+SWEEP_MODES = ("apply", "dry-run", "off")
+
+# 掲載中のカードのうち、ランキングで見つかった割合がこれを下回ったらカードを論理削除しない
+# （ページの構造が変わって一部しか読めていないときに、まとめて掲載終了にしない）
+MIN_RANKING_COVERAGE = 0.8
+
+# 実行中に見つけたキーを入れる一時テーブル（接続ごとに作られ、他の接続からは見えない）
+TEMPORARY_TABLES = {
+    "tmp_sweep_cards": "kakaku_card_id VARCHAR(50) PRIMARY KEY",
+    "tmp_sweep_scraped": "card_id INT PRIMARY KEY",
+    "tmp_sweep_exchanges": (
+        "card_id INT NOT NULL, exchangeable_reward_id INT NOT NULL, PRIMARY KEY (card_id, exchangeable_reward_id)"
+    ),
+    "tmp_sweep_insurances": (
+        "card_id INT NOT NULL, category_id BIGINT NOT NULL, coverage_type VARCHAR(255) NOT NULL, "
+        "PRIMARY KEY (card_id, category_id, coverage_type)"
+    ),
+    "tmp_sweep_services": (
+        "card_id INT NOT NULL, service_name VARCHAR(255) NOT NULL, PRIMARY KEY (card_id, service_name)"
+    ),
+}
+
+# 一時テーブルの削除（MySQLはTEMPORARYを付けると暗黙のコミットが起きず、同名の通常のテーブルも消さない）
+DROP_TEMPORARY_TABLE = {
+    "mysql": "DROP TEMPORARY TABLE IF EXISTS {}",
+    "sqlite": "DROP TABLE IF EXISTS temp.{}",
+}
+
+# 論理削除の対象（集計名, テーブル, 見つからなかった行の条件）
+# 子テーブルは今回取得し終えたカードの行だけを対象にする
+SWEEPS = (
+    (
+        "cards", "cards",
+        "kakaku_card_id NOT IN (SELECT kakaku_card_id FROM tmp_sweep_cards)",
+    ),
+    (
+        "point_exchanges", "point_exchanges",
+        """card_id IN (SELECT card_id FROM tmp_sweep_scraped)
+        AND NOT EXISTS (
+            SELECT 1 FROM tmp_sweep_exchanges seen
+            WHERE seen.card_id = point_exchanges.card_id
+              AND seen.exchangeable_reward_id = point_exchanges.exchangeable_reward_id
+        )""",
+    ),
+    (
+        "insurances", "card_include_insurances",
+        """card_id IN (SELECT card_id FROM tmp_sweep_scraped)
+        AND NOT EXISTS (
+            SELECT 1 FROM tmp_sweep_insurances seen
+            WHERE seen.card_id = card_include_insurances.card_id
+              AND seen.category_id = card_include_insurances.category_id
+              AND seen.coverage_type = card_include_insurances.coverage_type
+        )""",
+    ),
+    (
+        "services", "card_include_services",
+        """card_id IN (SELECT card_id FROM tmp_sweep_scraped)
+        AND NOT EXISTS (
+            SELECT 1 FROM tmp_sweep_services seen
+            WHERE seen.card_id = card_include_services.card_id
+              AND seen.service_name = card_include_services.service_name
+        )""",
+    ),
+)
+
+
+class RunSweep:
+    """1回の実行で見つけたキーを集め、実行の最後に見つからなかった行をまとめて論理削除する
+
+    ランキングのカードは最後のページまで読めたときだけ記録し、記録した場合のみカードを対象にする。
+    掲載中のカードのうちランキングで見つかったものがMIN_RANKING_COVERAGE未満なら、カードは対象にしない。
+    付帯保険・付帯サービス・ポイント交換は、詳細ページを最後まで取得できたカードの行だけを対象にする。
+    削除はキーを一時テーブルに入れてから、テーブルごとに1文のUPDATEで行う。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, dry_run: bool = False):
+        self.db_handler = db_handler
+        self.dry_run = dry_run
+        self.ranking: Optional[List[str]] = None
+        self.scraped: Dict[int, Tuple[List[Tuple[int, int]], List[Tuple[str, str]], List[str]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def record_ranking(self, kakaku_card_ids: Iterable[str]) -> None:
+        """最後のページまで読んだランキングのカードID（載っていないカードが論理削除の対象になる）"""
+        with self._lock:
+            self.ranking = list(kakaku_card_ids)
+
+    def record_card(
+        self,
+        card_id: int,
+        exchanges: List[ExchangeRecord],
+        insurances: List[InsuranceRecord],
+        services: List[ServiceRecord],
+    ) -> None:
+        """詳細ページを最後まで取得したカードの子テーブルのキー（複数スレッドから呼ばれる）"""
+        keys = (
+            [(exchange.card_id, exchange.exchangeable_reward_id) for exchange in exchanges],
+            [(insurance.category or "", insurance.coverage_type) for insurance in insurances],
+            [service.service_name for service in services],
+        )
+        with self._lock:
+            self.scraped[card_id] = keys
+
+    def sweep(self) -> Dict[str, Any]:
+        """見つからなかった行を論理削除し（dry_runなら数えるだけ）、テーブルごとの件数を返す"""
+        with self._lock:
+            ranking = self.ranking
+            scraped = dict(self.scraped)
+        result: Dict[str, Any] = {"dry_run": self.dry_run, "cards_checked": bool(ranking)}
+        if ranking is None and not scraped:
+            return result
+
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            self._load_keys(cursor, ranking, scraped)
+            if result["cards_checked"]:
+                cursor.execute(
+                    """
+                    SELECT COUNT(*), SUM(CASE WHEN kakaku_card_id IN (SELECT kakaku_card_id FROM tmp_sweep_cards) THEN 1 ELSE 0 END)
+                    FROM cards WHERE deleted_at IS NULL
+                    """
+                )
+                listed, seen = cursor.fetchone()
+                if listed and (seen or 0) < listed * MIN_RANKING_COVERAGE:
+                    result["cards_checked"] = False
+                    result["cards_coverage"] = (int(seen or 0), int(listed))
+            deleted_at = datetime.now()
+            for name, table, condition in SWEEPS:
+                if name == "cards" and not result["cards_checked"]:
+                    # ランキングを最後まで読めていない（または掲載中のカードの多くが見つからない）場合はカードを消さない
+                    continue
+                if self.dry_run:
+                    cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE deleted_at IS NULL AND {condition}")
+                    result[name] = cursor.fetchone()[0]
+                else:
+                    cursor.execute(
+                        f"UPDATE {table} SET deleted_at = %s WHERE deleted_at IS NULL AND {condition}",
+                        (deleted_at,),
+                    )
+                    result[name] = cursor.rowcount
+            self._drop_tables(cursor)
+            self.connection.commit()
+            return result
+        except Error as e:
+            print(f"掲載終了データの論理削除エラー: {e}")
+            self.db_handler.reconnect()
+            return self.sweep()
+
+    def _drop_tables(self, cursor) -> None:
+        for table in TEMPORARY_TABLES:
+            cursor.execute(DROP_TEMPORARY_TABLE[self.db_handler.dialect].format(table))
+
+    def _load_keys(self, cursor, ranking: Optional[List[str]], scraped: Dict[int, Tuple]) -> None:
+        self._drop_tables(cursor)
+        for table, columns in TEMPORARY_TABLES.items():
+            cursor.execute(f"CREATE TEMPORARY TABLE {table} ({columns})")
+
+        insert_ignore = self.db_handler.insert_ignore
+        if ranking:
+            cursor.executemany(
+                f"{insert_ignore} INTO tmp_sweep_cards (kakaku_card_id) VALUES (%s)",
+                [(kakaku_card_id,) for kakaku_card_id in ranking],
+            )
+        if not scraped:
+            return
+        category_ids = self.db_handler.texts.intern(
+            {category for _, insurances, _ in scraped.values() for category, _ in insurances}
+        )
+        cursor.executemany(
+            "INSERT INTO tmp_sweep_scraped (card_id) VALUES (%s)",
+            [(card_id,) for card_id in scraped],
+        )
+        exchanges = [key for keys, _, _ in scraped.values() for key in keys]
+        if exchanges:
+            cursor.executemany(
+                f"{insert_ignore} INTO tmp_sweep_exchanges (card_id, exchangeable_reward_id) VALUES (%s, %s)",
+                exchanges,
+            )
+        insurances = [
+            (card_id, category_ids[category], coverage_type)
+            for card_id, (_, keys, _) in scraped.items()
+            for category, coverage_type in keys
+        ]
+        if insurances:
+            cursor.executemany(
+                f"{insert_ignore} INTO tmp_sweep_insurances (card_id, category_id, coverage_type) VALUES (%s, %s, %s)",
+                insurances,
+            )
+        services = [(card_id, service_name) for card_id, (_, _, keys) in scraped.items() for service_name in keys]
+        if services:
+            cursor.executemany(
+                f"{insert_ignore} INTO tmp_sweep_services (card_id, service_name) VALUES (%s, %s)",
+                services,
+            )
+
+
+def create_sweep(db_handler: DatabaseHandler, mode: str = "apply") -> Optional[RunSweep]:
+    """--sweepの指定に応じたRunSweep（offならNone）"""
+    if mode == "off":
+        return None
+    return RunSweep(db_handler, dry_run=mode == "dry-run")
+
+
+def describe_sweep(result: Dict[str, Any]) -> str:
+    action = "論理削除対象（dry-run）" if result["dry_run"] else "論理削除"
+    counts = [f"{name}: {result[name]}件" for name, _, _ in SWEEPS if name in result]
+    if "cards_coverage" in result:
+        seen, listed = result["cards_coverage"]
+        counts.insert(0, (
+            f"cards: 未判定（警告: 掲載中の{listed}件のうちランキングで見つかったのは{seen}件で、"
+            f"{MIN_RANKING_COVERAGE:.0%}未満のためカードの論理削除を見送りました）"
+        ))
+    elif not result["cards_checked"]:
+        counts.insert(0, "cards: 未判定（ランキングを最後まで取得していません）")
+    return f"{action}: {' / '.join(counts)}"
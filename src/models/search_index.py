@@ -0,0 +1,251 @@
+import hashlib
+import unicodedata
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.text_dictionary import resolved_table
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """全角・半角の揺れをなくすためNFKC正規化し、空白をまとめる"""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def bigrams(word: str) -> List[str]:
+    return [word[i:i + 2] for i in range(len(word) - 1)]
+
+
+def encode_gram(gram: str) -> str:
+    # 記号を含むngramもFTS5の既定のトークナイザーで分割されないよう、UTF-8の16進表記にする
+    return gram.encode("utf-8").hex()
+
+
+def to_ngram_tokens(text: str) -> str:
+    """SQLiteのFTS5用に、語ごとの2文字のngramと語末の1文字を空白区切りの語にする
+
+    MySQLのngramパーサー（ngram_token_size=2）と同じ単位で索引を作る。
+    """
+    tokens = []
+    for word in text.casefold().split():
+        tokens.extend(encode_gram(gram) for gram in bigrams(word) + [word[-1]])
+    return " ".join(tokens)
+
+
+def to_fts_query(query: str) -> str:
+    """空白区切りの各語をすべて含む文書に絞るFTS5の検索式に変換
+
+    2文字以上の語は連続するngramのフレーズ、1文字の語はその文字で始まるngramの前方一致にする。
+    """
+    phrases = []
+    for term in normalize_text(query).casefold().split(" "):
+        if len(term) == 1:
+            phrases.append(f"{encode_gram(term)}*")
+        elif term:
+            phrases.append('"' + " ".join(encode_gram(gram) for gram in bigrams(term)) + '"')
+    return " AND ".join(phrases)
+
+
+def to_boolean_query(query: str) -> str:
+    """空白区切りの各語をすべて含む文書に絞るBOOLEAN MODE用の検索式に変換"""
+    terms = [term.replace('"', "") for term in normalize_text(query).split(" ") if term]
+    return " ".join(f'+"{term}"' for term in terms if term)
+
+
+class CardSearchIndex:
+    """MySQLのngramパーサー（SQLiteはFTS5）による全文検索インデックス
+
+    カードごとにカード名・備考・付帯サービス・付帯保険を1つの文書にまとめて
+    card_search_documentsに保存する。内容が変わったカードの文書だけを更新する。
+    SQLiteでは同じ文書をngramに分けてFTS5の仮想テーブル（card_search_documents_fts）にも書き込む。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, batch_size: int = 500):
+        self.db_handler = db_handler
+        self.batch_size = batch_size
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def refresh(self, card_ids: Optional[Iterable[int]] = None) -> int:
+        """指定したカード（省略時は全カード）の文書を再作成し、更新した件数を返す"""
+        if card_ids is None:
+            card_ids = self._all_card_ids()
+        card_ids = sorted(set(card_ids))
+        if self.db_handler.dialect == "sqlite":
+            self._backfill_fts()
+        updated = 0
+        for start in range(0, len(card_ids), self.batch_size):
+            updated += self._refresh_batch(card_ids[start:start + self.batch_size])
+        return updated
+
+    def _all_card_ids(self) -> List[int]:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT id FROM cards WHERE deleted_at IS NULL")
+            card_ids = [row[0] for row in cursor.fetchall()]
+            self.connection.commit()
+            return card_ids
+        except Error as e:
+            print(f"検索対象カード取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self._all_card_ids()
+
+    def build_documents(self, card_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """カードと子テーブルをまとめて読み込み、検索用文書を組み立てる"""
+        placeholders = ", ".join(["%s"] * len(card_ids))
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT id, card_name, remarks FROM cards WHERE id IN ({placeholders})", card_ids)
+        documents = {
+            card_id: {"card_name": normalize_text(card_name), "parts": [remarks or ""]}
+            for card_id, card_name, remarks in cursor.fetchall()
+        }
+        cursor.execute(
+            f"""
+            SELECT card_id, service_name, service_content FROM {resolved_table("card_include_services")}
+            WHERE card_id IN ({placeholders}) AND deleted_at IS NULL
+            ORDER BY card_id, service_name
+            """,
+            card_ids,
+        )
+        for card_id, service_name, service_content in cursor.fetchall():
+            if card_id in documents:
+                documents[card_id]["parts"].append(f"{service_name} {service_content}")
+        cursor.execute(
+            f"""
+            SELECT card_id, category, coverage_type, coverage_amount FROM {resolved_table("card_include_insurances")}
+            WHERE card_id IN ({placeholders}) AND deleted_at IS NULL
+            ORDER BY card_id, category, coverage_type
+            """,
+            card_ids,
+        )
+        for card_id, category, coverage_type, coverage_amount in cursor.fetchall():
+            if card_id in documents:
+                documents[card_id]["parts"].append(f"{category} {coverage_type} {coverage_amount}")
+
+        result = {}
+        for card_id, document in documents.items():
+            body = "\n".join(normalize_text(part) for part in document["parts"] if part)
+            content_hash = hashlib.sha1(f"{document['card_name']}\n{body}".encode("utf-8")).hexdigest()
+            result[card_id] = {"card_name": document["card_name"], "body": body, "content_hash": content_hash}
+        return result
+
+    def _refresh_batch(self, card_ids: List[int]) -> int:
+        self.db_handler._ensure_connection()
+        try:
+            documents = self.build_documents(card_ids)
+            placeholders = ", ".join(["%s"] * len(card_ids))
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"SELECT card_id, content_hash FROM card_search_documents WHERE card_id IN ({placeholders})",
+                card_ids,
+            )
+            indexed = dict(cursor.fetchall())
+            changed = [
+                (card_id, document["card_name"], document["body"], document["content_hash"])
+                for card_id, document in documents.items()
+                if indexed.get(card_id) != document["content_hash"]
+            ]
+            if changed:
+                cursor.executemany(
+                    f"""
+                    INSERT INTO card_search_documents (card_id, card_name, body, content_hash)
+                    VALUES (%s, %s, %s, %s)
+                    {self.db_handler.upsert_clause(["card_id"], ["card_name", "body", "content_hash"])}
+                    """,
+                    changed,
+                )
+                if self.db_handler.dialect == "sqlite":
+                    self._write_fts(cursor, [(card_id, card_name, body) for card_id, card_name, body, _ in changed])
+            self.connection.commit()
+            return len(changed)
+        except Error as e:
+            print(f"検索インデックス更新エラー: {e}")
+            self.db_handler.reconnect()
+            return self._refresh_batch(card_ids)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """全ての語を含むカードを関連度順に検索"""
+        boolean_query = to_boolean_query(query)
+        if not boolean_query:
+            return []
+        self.db_handler._ensure_connection()
+        if self.db_handler.dialect == "sqlite":
+            return self._search_fts(query, limit)
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT
+                    d.card_id, c.kakaku_card_id, d.card_name,
+                    MATCH (d.card_name, d.body) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+                FROM card_search_documents d
+                JOIN cards c ON c.id = d.card_id
+                WHERE MATCH (d.card_name, d.body) AGAINST (%s IN BOOLEAN MODE)
+                  AND c.deleted_at IS NULL
+                ORDER BY score DESC
+                LIMIT %s
+                """,
+                (normalize_text(query), boolean_query, limit),
+            )
+            rows = cursor.fetchall()
+            self.connection.commit()
+            return rows
+        except Error as e:
+            print(f"全文検索エラー: {e}")
+            self.db_handler.reconnect()
+            return self.search(query, limit)
+
+    def _write_fts(self, cursor, documents: List[Tuple[int, str, str]]) -> None:
+        """SQLite：文書をngramに分けてFTS5の仮想テーブルに書き込む（同じカードの行は置き換える）"""
+        cursor.executemany("DELETE FROM card_search_documents_fts WHERE rowid = %s", [(card_id,) for card_id, _, _ in documents])
+        cursor.executemany(
+            "INSERT INTO card_search_documents_fts (rowid, card_name, body) VALUES (%s, %s, %s)",
+            [(card_id, to_ngram_tokens(card_name), to_ngram_tokens(body)) for card_id, card_name, body in documents],
+        )
+
+    def _backfill_fts(self) -> None:
+        """SQLite：FTS5の仮想テーブルを追加する前に作った文書を書き込む"""
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT 1 FROM card_search_documents_fts LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute("SELECT card_id, card_name, body FROM card_search_documents")
+                documents = cursor.fetchall()
+                if documents:
+                    self._write_fts(cursor, documents)
+                    print(f"全文検索インデックス作成: {len(documents)}件")
+            self.connection.commit()
+        except Error as e:
+            print(f"全文検索インデックス作成エラー: {e}")
+            self.db_handler.reconnect()
+            self._backfill_fts()
+
+    def _search_fts(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """SQLite：FTS5の索引で全ての語を含むカードを検索し、BM25の関連度順に並べる"""
+        self._backfill_fts()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT d.card_id, c.kakaku_card_id, d.card_name, -bm25(card_search_documents_fts) AS score
+                FROM card_search_documents_fts
+                JOIN card_search_documents d ON d.card_id = card_search_documents_fts.rowid
+                JOIN cards c ON c.id = d.card_id
+                WHERE card_search_documents_fts MATCH %s AND c.deleted_at IS NULL
+                ORDER BY bm25(card_search_documents_fts)
+                LIMIT %s
+                """,
+                (to_fts_query(query), limit),
+            )
+            rows = cursor.fetchall()
+            self.connection.commit()
+            return rows
+        except Error as e:
+            print(f"全文検索エラー: {e}")
+            self.db_handler.reconnect()
+            return self._search_fts(query, limit)
@@ -0,0 +1,184 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from models.database import DatabaseHandler
+
+# 末尾の注記記号（「※1」「*2」「注」など。還元率テーブルの※以降は取得時に除いている）
+FOOTNOTE_PATTERN = re.compile(r"(?:[※*†‡]|注)\s*\d*$")
+
+# 表記揺れとして無視する文字（空白・中黒・ハイフン類・記号）
+IGNORED_CHARACTERS = re.compile(r"[\s・\-‐‑‒–—―−'\"`.,。、!?]")
+
+# あいまい一致を試す正規化後の最小文字数（短い名前は1文字違いでも別のショップが多い）
+FUZZY_MIN_LENGTH = 5
+
+# 候補にするbigramの一致率（問い合わせ側のbigramのうち、共通する割合）
+FUZZY_MIN_OVERLAP = 0.5
+
+# 同じショップとみなす編集距離（正規化後の文字数がFUZZY_LONG_NAME以上なら2まで）
+FUZZY_LONG_NAME = 12
+
+
+def canonical_shop_name(name: str) -> str:
+    """照合用の正規化したショップ名（NFKC・小文字化・注記と記号の除去）"""
+    key = unicodedata.normalize("NFKC", name or "").casefold().strip()
+    while True:
+        stripped = FOOTNOTE_PATTERN.sub("", key).strip()
+        if stripped == key:
+            break
+        key = stripped
+    return IGNORED_CHARACTERS.sub("", key)
+
+
+def bigrams(key: str) -> Set[str]:
+    if len(key) < 2:
+        return {key}
+    return {key[i:i + 2] for i in range(len(key) - 1)}
+
+
+def edit_distance(left: str, right: str, limit: int) -> int:
+    """レーベンシュタイン距離（limitを超えることが分かった時点でlimit + 1を返す）"""
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+    previous = list(range(len(right) + 1))
+    for i, left_char in enumerate(left, 1):
+        current = [i]
+        for j, right_char in enumerate(right, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (left_char != right_char),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def digits(key: str) -> str:
+    return "".join(char for char in key if char.isdigit())
+
+
+class ShopKeyIndex:
+    """正規化したショップ名→ショップIDの索引と、あいまい一致用の文字bigramの転置インデックス
+
+    あいまい一致は、bigramが一定以上共通する候補のうち、同じカテゴリ・同じ数字で、
+    編集距離が1（長い名前は2）以内のものだけを同じショップとみなす。
+    1文字の編集で失われるbigramは2個までなので、候補は出現するショップが少ないbigramの
+    先頭（2 × 編集距離 + 1）個から集めれば取りこぼさない（「ショップ」のような共通部分を読まずに済む）。
+    """
+
+    def __init__(self):
+        self.keys: Dict[str, int] = {}
+        self.shops: Dict[int, Tuple[str, str]] = {}
+        self.grams: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.shops)
+
+    def add(self, shop_id: int, name: str, category: str, alias: bool = False) -> None:
+        """ショップを登録（aliasは統合済みの旧名で、あいまい一致の候補にはしない）"""
+        key = canonical_shop_name(name)
+        with self._lock:
+            self.keys.setdefault(key, shop_id)
+            if alias or shop_id in self.shops:
+                return
+            self.shops[shop_id] = (key, category)
+            for gram in bigrams(key):
+                self.grams[gram].add(shop_id)
+
+    def exact(self, name: str) -> Optional[int]:
+        return self.keys.get(canonical_shop_name(name))
+
+    def candidates(self, key: str, category: str) -> List[Tuple[int, int]]:
+        """あいまい一致で同じショップとみなせる(編集距離, ショップID)の一覧（近い順）"""
+        if len(key) < FUZZY_MIN_LENGTH:
+            return []
+        query = bigrams(key)
+        limit = 2 if len(key) >= FUZZY_LONG_NAME else 1
+        with self._lock:
+            rarest = sorted(query, key=lambda gram: len(self.grams.get(gram, ())))[:2 * limit + 1]
+            found = {shop_id: self.shops[shop_id] for gram in rarest for shop_id in self.grams.get(gram, ())}
+        matches = []
+        for shop_id, (candidate, candidate_category) in found.items():
+            if candidate == key or candidate_category != category or digits(candidate) != digits(key):
+                continue
+            if len(query & bigrams(candidate)) < len(query) * FUZZY_MIN_OVERLAP:
+                continue
+            distance = edit_distance(key, candidate, limit)
+            if distance <= limit:
+                matches.append((distance, shop_id))
+        return sorted(matches)
+
+    def resolve(self, name: str, category: str) -> Optional[int]:
+        """正規化した名前の完全一致、なければあいまい一致でショップIDを求める"""
+        key = canonical_shop_name(name)
+        shop_id = self.keys.get(key)
+        if shop_id is not None:
+            return shop_id
+        matches = self.candidates(key, category)
+        if not matches:
+            return None
+        shop_id = matches[0][1]
+        # 次回からは完全一致で引けるようにする
+        with self._lock:
+            self.keys.setdefault(key, shop_id)
+        return shop_id
+
+
+class ShopIdentityIndex:
+    """DatabaseHandler用のショップの索引（初回の照合時にshopsとshop_mergesから作成）
+
+    索引はプロセス内でDBごとに共有し、新しく登録したショップは都度追加する。
+    """
+
+    _cache: Dict[str, ShopKeyIndex] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, db_handler: "DatabaseHandler"):
+        self.db_handler = db_handler
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """DBを作り直したときや、ショップを統合したときに索引を捨てる"""
+        with cls._lock:
+            cls._cache.clear()
+
+    @property
+    def index(self) -> ShopKeyIndex:
+        """接続は呼び出し元（DatabaseHandlerのメソッド）が確認し、エラー時の再接続も呼び出し元が行う"""
+        cache_key = f"{self.db_handler.dialect}:{self.db_handler.database}"
+        with self._lock:
+            index = self._cache.get(cache_key)
+            if index is None:
+                index = self._cache[cache_key] = self._load()
+            return index
+
+    def _load(self) -> ShopKeyIndex:
+        index = ShopKeyIndex()
+        cursor = self.db_handler.connection.cursor()
+        cursor.execute("SELECT id, shop_name, category FROM shops WHERE deleted_at IS NULL ORDER BY id")
+        for shop_id, shop_name, category in cursor.fetchall():
+            index.add(shop_id, shop_name, category)
+        cursor.execute(
+            """
+            SELECT m.old_shop_name, m.new_shop_id, s.category
+            FROM shop_merges m
+            JOIN shops s ON s.id = m.new_shop_id
+            """
+        )
+        for old_shop_name, new_shop_id, category in cursor.fetchall():
+            index.add(new_shop_id, old_shop_name, category, alias=True)
+        self.db_handler.connection.commit()
+        return index
+
+    def resolve(self, name: str, category: str) -> Optional[int]:
+        return self.index.resolve(name, category)
+
+    def add(self, shop_id: int, name: str, category: str) -> None:
+        self.index.add(shop_id, name, category)
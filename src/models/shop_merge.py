@@ -0,0 +1,236 @@
+from datetime import datetime
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Iterable, Tuple
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.shop_identity import ShopIdentityIndex, ShopKeyIndex, canonical_shop_name
+
+# 1文あたりのID数（SQLiteのバインド変数の上限より小さくする）
+MERGE_BATCH_SIZE = 500
+
+# ショップIDを参照するテーブル（(card_id, shop_id)がユニークなテーブルは統合前に重複行を除く）
+REFERENCING_TABLES = ("point_rewards", "discount_rewards", "shop_domains")
+UNIQUE_PER_CARD_TABLES = ("point_rewards", "discount_rewards")
+
+
+def chunks(values: List[Any]) -> Iterable[List[Any]]:
+    for start in range(0, len(values), MERGE_BATCH_SIZE):
+        yield values[start:start + MERGE_BATCH_SIZE]
+
+
+class ShopMerger:
+    """表記揺れで重複したショップを1件にまとめ、参照しているテーブルのshop_idを一括で付け替える
+
+    正規化した名前（models/shop_identity.py）が同じショップをまとめ、fuzzyを指定すると
+    索引のあいまい一致で同じとみなせるショップもまとめる。残すショップは確認済み（checked_by）、
+    グループ内で正規化した名前が完全一致するショップが多い（あいまい一致でしかつながらない表記より多数派の表記）、
+    IDが小さいの順で選ぶ。統合した旧ショップはshop_mergesに記録して論理削除する。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.db_handler = db_handler
+
+    @property
+    def connection(self):
+        return self.db_handler.connection
+
+    def load_shops(self) -> List[Dict[str, Any]]:
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT id, shop_name, category, checked_by
+                FROM shops
+                WHERE deleted_at IS NULL
+                ORDER BY id
+                """
+            )
+            shops = cursor.fetchall()
+            self.connection.commit()
+            return shops
+        except Error as e:
+            print(f"ショップ一覧取得エラー: {e}")
+            self.db_handler.reconnect()
+            return self.load_shops()
+
+    def plan(self, fuzzy: bool = False) -> List[Dict[str, Any]]:
+        """統合するショップのグループ（残すショップとそれを選んだ理由、統合する旧ショップの一覧）"""
+        shops = {shop["id"]: shop for shop in self.load_shops()}
+        parent = {shop_id: shop_id for shop_id in shops}
+
+        def find(shop_id: int) -> int:
+            while parent[shop_id] != shop_id:
+                parent[shop_id] = parent[parent[shop_id]]
+                shop_id = parent[shop_id]
+            return shop_id
+
+        def union(left: int, right: int) -> None:
+            left, right = find(left), find(right)
+            if left != right:
+                parent[max(left, right)] = min(left, right)
+
+        index = ShopKeyIndex()
+        for shop in shops.values():
+            index.add(shop["id"], shop["shop_name"], shop["category"])
+        keys = {shop_id: canonical_shop_name(shop["shop_name"]) for shop_id, shop in shops.items()}
+        for shop_id, key in keys.items():
+            union(shop_id, index.keys[key])
+            if fuzzy:
+                for _, candidate_id in index.candidates(key, shops[shop_id]["category"]):
+                    union(shop_id, candidate_id)
+
+        groups: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for shop_id, shop in shops.items():
+            groups[find(shop_id)].append(shop)
+
+        merges = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            # 正規化した名前ごとの件数（完全一致でまとまった表記ほど多い）
+            exact = Counter(keys[shop["id"]] for shop in members)
+            members.sort(key=lambda shop: (shop["checked_by"] is None, -exact[keys[shop["id"]]], shop["id"]))
+            survivor = members[0]
+            merges.append({
+                "new_shop_id": survivor["id"],
+                "new_shop_name": survivor["shop_name"],
+                "reason": survivor_reason(survivor, members, exact, keys),
+                "old": [(shop["id"], shop["shop_name"]) for shop in members[1:]],
+            })
+        return sorted(merges, key=lambda merge: merge["new_shop_id"])
+
+    def apply(self, merges: List[Dict[str, Any]], dry_run: bool = False) -> Dict[str, int]:
+        """グループごとに統合し（dry_runなら数えるだけ）、テーブルごとの付け替え・削除件数を返す"""
+        mapping = {old_id: merge["new_shop_id"] for merge in merges for old_id, _ in merge["old"]}
+        result = {"groups": len(merges), "shops": len(mapping)}
+        if not mapping:
+            return result
+
+        self.db_handler._ensure_connection()
+        try:
+            cursor = self.connection.cursor()
+            duplicates = {}
+            for table in REFERENCING_TABLES:
+                rows = self._referencing_rows(cursor, table, mapping)
+                moved = [row_id for row_id, _, shop_id in rows if shop_id in mapping]
+                duplicates[table] = self._duplicates(rows, mapping) if table in UNIQUE_PER_CARD_TABLES else {}
+                result[f"{table}_moved"] = len(moved) - len(duplicates[table])
+                if table in UNIQUE_PER_CARD_TABLES:
+                    result[f"{table}_removed"] = len(duplicates[table])
+            if dry_run:
+                self.connection.commit()
+                return result
+
+            self._record_merges(cursor, merges, mapping)
+            self._remove_duplicates(cursor, duplicates)
+            for table in REFERENCING_TABLES:
+                # shop_mergesの対応表で、旧ショップを参照している行を1文で付け替える
+                cursor.execute(
+                    f"""
+                    UPDATE {table}
+                    SET shop_id = (SELECT new_shop_id FROM shop_merges WHERE old_shop_id = {table}.shop_id)
+                    WHERE shop_id IN (SELECT old_shop_id FROM shop_merges)
+                    """
+                )
+            deleted_at = datetime.now()
+            for chunk in chunks(sorted(mapping)):
+                cursor.execute(
+                    f"""
+                    UPDATE shops SET deleted_at = %s
+                    WHERE deleted_at IS NULL AND id IN ({", ".join(["%s"] * len(chunk))})
+                    """,
+                    [deleted_at] + chunk,
+                )
+            self.connection.commit()
+            # 統合した旧名は統合先に解決されるよう、索引を作り直させる
+            ShopIdentityIndex.clear_cache()
+            return result
+        except Error as e:
+            print(f"ショップ統合エラー: {e}")
+            self.db_handler.reconnect()
+            return self.apply(merges, dry_run)
+
+    def _referencing_rows(self, cursor, table: str, mapping: Dict[int, int]) -> List[Tuple[int, Any, int]]:
+        """統合に関わるショップ（旧ショップと残すショップ）を参照している(ID, カードID, ショップID)"""
+        shop_ids = sorted(set(mapping) | set(mapping.values()))
+        card_column = "card_id" if table in UNIQUE_PER_CARD_TABLES else "NULL"
+        rows = []
+        for chunk in chunks(shop_ids):
+            cursor.execute(
+                f"SELECT id, {card_column}, shop_id FROM {table} WHERE shop_id IN ({', '.join(['%s'] * len(chunk))})",
+                chunk,
+            )
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def _duplicates(self, rows: List[Tuple[int, Any, int]], mapping: Dict[int, int]) -> Dict[int, int]:
+        """付け替えると同じ(カード, ショップ)になる行のうち、削除する行→残す行の対応
+
+        残す行は、すでに残すショップを参照している行、なければIDが最も小さい行。
+        """
+        by_target: Dict[Tuple[Any, int], List[Tuple[bool, int]]] = defaultdict(list)
+        for row_id, card_id, shop_id in rows:
+            by_target[(card_id, mapping.get(shop_id, shop_id))].append((shop_id in mapping, row_id))
+        duplicates = {}
+        for candidates in by_target.values():
+            candidates.sort()
+            kept = candidates[0][1]
+            for _, row_id in candidates[1:]:
+                duplicates[row_id] = kept
+        return duplicates
+
+    def _record_merges(self, cursor, merges: List[Dict[str, Any]], mapping: Dict[int, int]) -> None:
+        # 以前に統合した先が今回統合される場合は、最終的な統合先を直接指すようにする
+        cursor.executemany(
+            "UPDATE shop_merges SET new_shop_id = %s WHERE new_shop_id = %s",
+            [(new_shop_id, old_shop_id) for old_shop_id, new_shop_id in mapping.items()],
+        )
+        cursor.executemany(
+            f"""
+            INSERT INTO shop_merges (old_shop_id, new_shop_id, old_shop_name) VALUES (%s, %s, %s)
+            {self.db_handler.upsert_clause(["old_shop_id"], ["new_shop_id", "old_shop_name"])}
+            """,
+            [(old_id, merge["new_shop_id"], old_name) for merge in merges for old_id, old_name in merge["old"]],
+        )
+
+    def _remove_duplicates(self, cursor, duplicates: Dict[str, Dict[int, int]]) -> None:
+        """重複する行を削除する（ポイント還元の条件は残す行に移し、移せない重複条件は削除）"""
+        point_rewards = duplicates["point_rewards"]
+        if point_rewards:
+            cursor.executemany(
+                f"{self.db_handler.update_ignore} point_reward_conditions SET point_reward_id = %s WHERE point_reward_id = %s",
+                [(kept, removed) for removed, kept in point_rewards.items()],
+            )
+            for chunk in chunks(sorted(point_rewards)):
+                cursor.execute(
+                    f"DELETE FROM point_reward_conditions WHERE point_reward_id IN ({', '.join(['%s'] * len(chunk))})",
+                    chunk,
+                )
+        for table in UNIQUE_PER_CARD_TABLES:
+            for chunk in chunks(sorted(duplicates[table])):
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def survivor_reason(
+    survivor: Dict[str, Any], members: List[Dict[str, Any]], exact: Counter, keys: Dict[int, str]
+) -> str:
+    """残すショップを選んだ理由（別の表記で最上位のショップと比べて、最初に差がついた条件）"""
+    rivals = [shop for shop in members[1:] if keys[shop["id"]] != keys[survivor["id"]]]
+    runner_up = rivals[0] if rivals else members[1]
+    if survivor["checked_by"] is not None and runner_up["checked_by"] is None:
+        return "確認済み"
+    if exact[keys[survivor["id"]]] > exact[keys[runner_up["id"]]]:
+        return f"完全一致{exact[keys[survivor['id']]]}件"
+    return "IDが最小"
+
+
+def describe_merge(result: Dict[str, int], dry_run: bool = False) -> str:
+    action = "ショップ統合（dry-run）" if dry_run else "ショップ統合"
+    counts = [f"{result['groups']}グループ / 統合{result['shops']}件"]
+    for table in REFERENCING_TABLES:
+        if f"{table}_moved" in result:
+            counts.append(f"{table}: 付け替え{result[f'{table}_moved']}件")
+        if f"{table}_removed" in result:
+            counts[-1] += f"・重複削除{result[f'{table}_removed']}件"
+    return f"{action}: {' / '.join(counts)}"
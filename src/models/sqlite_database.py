@@ -0,0 +1,223 @@
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Iterator, Sequence, Callable
+from models.database import DatabaseHandler
+from models.migrations import split_sql_statements, schema_path
+
+# SQLite 3.32より前はバインド変数が1文あたり999個まで
+SQLITE_MAX_VARIABLES = 999
+
+# MySQLのCURRENT_TIMESTAMP（TZ=Asia/Tokyoのローカル時刻）に合わせる
+SQLITE_NOW = "datetime('now', 'localtime')"
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def translate_schema(sql: str) -> str:
+    """MySQL用のschema.sqlをSQLite用のスクリプトに変換
+
+    - AUTO_INCREMENT → INTEGER PRIMARY KEY AUTOINCREMENT
+    - COMMENT、ON UPDATE CURRENT_TIMESTAMP を除く（updated_atはトリガーで更新）
+    - UNIQUE KEY → UNIQUE制約、KEY → CREATE INDEX
+    - FULLTEXT KEY → 同じ列を持つFTS5の仮想テーブル（テーブル名_fts、rowidは元の行の主キー）
+    """
+    statements = []
+    for statement in split_sql_statements(sql):
+        match = re.match(r"CREATE TABLE IF NOT EXISTS (\w+) \(\s*\n(.*)\n\s*\)$", statement, re.S)
+        if not match:
+            statements.append(statement)
+            continue
+        table, body = match.groups()
+        columns, indexes = [], []
+        for line in body.split("\n"):
+            line = line.strip().rstrip(",")
+            if not line:
+                continue
+            fulltext = re.match(r"FULLTEXT KEY \w+ \((.*?)\)", line)
+            if fulltext:
+                # ngramへの分割は書き込む側（CardSearchIndex）で行う
+                indexes.append(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({fulltext.group(1)})")
+                continue
+            key = re.match(r"KEY (\w+) \((.*)\)$", line)
+            if key:
+                indexes.append(f"CREATE INDEX IF NOT EXISTS {key.group(1)} ON {table} ({key.group(2)})")
+                continue
+            unique = re.match(r"UNIQUE KEY (\w+) \((.*)\)$", line)
+            if unique:
+                columns.append(f"CONSTRAINT {unique.group(1)} UNIQUE ({unique.group(2)})")
+                continue
+            line = re.sub(r"(BIG)?INT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT", line)
+            line = re.sub(r" COMMENT '[^']*'", "", line)
+            line = line.replace(" ON UPDATE CURRENT_TIMESTAMP", "")
+            line = line.replace("DEFAULT CURRENT_TIMESTAMP", f"DEFAULT ({SQLITE_NOW})")
+            columns.append(line)
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ",\n    ".join(columns) + "\n)")
+        statements.extend(indexes)
+        if any(column.startswith("updated_at ") for column in columns):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_updated_at AFTER UPDATE ON {table} "
+                f"FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at "
+                f"BEGIN UPDATE {table} SET updated_at = {SQLITE_NOW} WHERE rowid = NEW.rowid; END"
+            )
+    return ";\n\n".join(statements) + ";\n"
+
+
+@lru_cache(maxsize=None)
+def load_sqlite_schema(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return translate_schema(f.read())
+
+
+class SQLiteCursor:
+    """mysql-connectorのカーソルと同じ書き方（%sプレースホルダ、dictionary=True）で使えるラッパー"""
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cursor = cursor
+        if dictionary:
+            cursor.row_factory = lambda c, row: {column[0]: value for column, value in zip(c.description, row)}
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> None:
+        self._cursor.execute(query.replace("%s", "?"), tuple(params or ()))
+
+    def executemany(self, query: str, seq_of_params: Sequence[Sequence[Any]]) -> None:
+        self._cursor.executemany(query.replace("%s", "?"), [tuple(params) for params in seq_of_params])
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self) -> List[Any]:
+        return self._cursor.fetchall()
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+
+class SQLiteConnection:
+    """mysql-connectorの接続と同じメソッドを持つsqlite3接続のラッパー
+
+    batch()の区間内ではcommit()を遅らせ、区間の終わりにまとめて1回コミットする。
+    after_commit()で渡した処理は区間がコミットされてから実行し、ロールバックしたときは捨てる。
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(
+            path,
+            timeout=30,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._batch_depth = 0
+        self._after_commit: List[Callable[[], None]] = []
+        self._closed = False
+
+    def cursor(self, dictionary: bool = False) -> SQLiteCursor:
+        return SQLiteCursor(self._connection.cursor(), dictionary=dictionary)
+
+    def executescript(self, script: str) -> None:
+        self._connection.executescript(script)
+
+    def commit(self) -> None:
+        if self._batch_depth == 0:
+            self._connection.commit()
+
+    def rollback(self) -> None:
+        self._connection.rollback()
+        self._after_commit.clear()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """コミット済みの内容だけをプロセス内のキャッシュに載せるため、区間内では実行を遅らせる"""
+        if self._batch_depth == 0:
+            callback()
+        else:
+            self._after_commit.append(callback)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.rollback()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._connection.commit()
+            callbacks, self._after_commit = self._after_commit, []
+            for callback in callbacks:
+                callback()
+
+    def is_connected(self) -> bool:
+        return not self._closed
+
+    def close(self) -> None:
+        self._connection.close()
+        self._closed = True
+
+
+class SQLiteDatabaseHandler(DatabaseHandler):
+    """SQLiteのストレージバックエンド（DB_BACKEND=sqlite）
+
+    MySQLコンテナなしでローカル実行や小規模な運用ができるよう、単一ファイルに保存する。
+    スキーマは接続時にschema.sqlを変換して作成する（既存のテーブルはそのまま）。
+    """
+
+    dialect = "sqlite"
+    insert_ignore = "INSERT OR IGNORE"
+    update_ignore = "UPDATE OR IGNORE"
+
+    def __init__(self, database: Optional[str] = None):
+        super().__init__(database or os.getenv("SQLITE_PATH", "card_db.sqlite3"))
+
+    def connect(self) -> None:
+        """データベースファイルを開き、スキーマを作成"""
+        try:
+            self.connection = SQLiteConnection(self.database)
+            self.connection.executescript(load_sqlite_schema(schema_path()))
+            print("データベース接続成功")
+        except sqlite3.Error as e:
+            print(f"データベース接続エラー: {e}")
+            raise
+
+    def upsert_clause(self, conflict_columns: List[str], update_columns: List[str]) -> str:
+        """一意キーが重複したときに指定した列を更新する句（SQLiteは対象の一意キーを明示する）"""
+        assignments = ",\n".join(f"{column} = excluded.{column}" for column in update_columns)
+        return f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET\n{assignments}"
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """区間内の書き込みを1トランザクションにまとめる"""
+        self._ensure_connection()
+        with self.connection.batch():
+            yield
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        self.connection.after_commit(callback)
+
+    def get_shop_ids(self, shops: List[Dict[str, Any]]) -> Dict[str, int]:
+        """バインド変数の上限を超えないようショップ名を分割して取得"""
+        shop_ids = {}
+        for start in range(0, len(shops), SQLITE_MAX_VARIABLES):
+            shop_ids.update(super().get_shop_ids(shops[start:start + SQLITE_MAX_VARIABLES]))
+        return shop_ids
+
+    def upsert_point_rewards(self, point_rewards: List[Dict[str, Any]]) -> None:
+        """バインド変数の上限（1行6個）を超えないよう分割して挿入"""
+        rows = SQLITE_MAX_VARIABLES // 6
+        with self.batch():
+            for start in range(0, len(point_rewards), rows):
+                super().upsert_point_rewards(point_rewards[start:start + rows])
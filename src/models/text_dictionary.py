@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from typing import Dict, Iterable, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from models.database import DatabaseHandler
+
+# 1文あたりのハッシュ数（SQLiteのバインド変数の上限より小さくする）
+LOOKUP_BATCH_SIZE = 500
+
+# プロセス内で保持する本文の件数（超えたら作り直す）
+TEXT_CACHE_SIZE = 100000
+
+# 辞書化した列（*_id）を本文に戻した子テーブル（元のテーブルと同じ列名で読める）
+RESOLVED_TABLES = {
+    "card_include_insurances": """(
+        SELECT
+            i.id, i.card_id, category.content AS category, i.coverage_type,
+            amount.content AS coverage_amount, i.remarks, i.created_at, i.updated_at, i.deleted_at
+        FROM card_include_insurances i
+        JOIN text_dictionary category ON category.id = i.category_id
+        JOIN text_dictionary amount ON amount.id = i.coverage_amount_id
+    )""",
+    "card_include_services": """(
+        SELECT
+            s.id, s.card_id, s.service_name, content.content AS service_content,
+            s.remarks, s.created_at, s.updated_at, s.deleted_at
+        FROM card_include_services s
+        JOIN text_dictionary content ON content.id = s.service_content_id
+    )""",
+}
+
+
+def resolved_table(table: str) -> str:
+    """FROM句に書くテーブル（辞書化した列がある場合は本文に戻した副問い合わせ）"""
+    if table in RESOLVED_TABLES:
+        return f"{RESOLVED_TABLES[table]} AS {table}"
+    return table
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class TextDictionary:
+    """同じ文字列をtext_dictionaryの1行にまとめ、子テーブルには整数のIDだけを保存する
+
+    本文のSHA-1を一意キーにし、登録済みの本文とIDはプロセス内（DBごと）に保持する。
+    キャッシュにある本文はDBに送らずにIDを返す（キャッシュにはコミットされた本文だけを載せる）。
+    """
+
+    _cache: Dict[str, Dict[str, int]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, db_handler: "DatabaseHandler"):
+        self.db_handler = db_handler
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """DBを作り直したときなどに、保持している本文とIDを捨てる"""
+        with cls._lock:
+            cls._cache.clear()
+
+    @property
+    def cache(self) -> Dict[str, int]:
+        with self._lock:
+            return self._cache.setdefault(f"{self.db_handler.dialect}:{self.db_handler.database}", {})
+
+    def intern(self, texts: Iterable[str]) -> Dict[str, int]:
+        """本文ごとのIDを取得（未登録の本文はまとめて登録）
+
+        接続は呼び出し元（DatabaseHandlerのメソッド）が確認し、エラー時の再接続も呼び出し元が行う。
+        """
+        cache = self.cache
+        ids = {}
+        missing = {}
+        for text in texts:
+            if text in cache:
+                ids[text] = cache[text]
+            else:
+                missing[text_hash(text)] = text
+        if not missing:
+            return ids
+
+        connection = self.db_handler.connection
+        cursor = connection.cursor()
+        hashes = list(missing)
+        found = self._lookup(cursor, hashes)
+        new = [content_hash for content_hash in hashes if content_hash not in found]
+        if new:
+            cursor.executemany(
+                f"{self.db_handler.insert_ignore} INTO text_dictionary (content_hash, content) VALUES (%s, %s)",
+                [(content_hash, missing[content_hash]) for content_hash in new],
+            )
+            connection.commit()
+            found.update(self._lookup(cursor, new))
+
+        interned = {missing[content_hash]: text_id for content_hash, text_id in found.items()}
+        ids.update(interned)
+        # batch()の区間がロールバックされたときに、存在しないIDをキャッシュに残さない
+        self.db_handler.after_commit(lambda: self._remember(cache, interned))
+        return ids
+
+    def _remember(self, cache: Dict[str, int], interned: Dict[str, int]) -> None:
+        with self._lock:
+            if len(cache) > TEXT_CACHE_SIZE:
+                cache.clear()
+            cache.update(interned)
+
+    def _lookup(self, cursor, hashes: List[str]) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            chunk = hashes[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"SELECT content_hash, id FROM text_dictionary WHERE content_hash IN ({placeholders})",
+                chunk,
+            )
+            found.update({content_hash: text_id for content_hash, text_id in cursor.fetchall()})
+        return found
@@ -0,0 +1,124 @@
+import os
+import fcntl
+import shutil
+from typing import List, Optional
+
+# プロファイルを同時に使えるセッション数の上限（SE_NODE_MAX_SESSIONSより大きくしておく）
+MAX_SLOTS = 16
+
+# 複製しないファイル（起動中のChromeが持つロック。複製すると別のChromeが起動できなくなる）
+LOCK_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile")
+
+CACHE_DIR = "cache"
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class BrowserProfile:
+    """Seleniumのセッションに付けるChromeのユーザーデータ・ディスクキャッシュ（実行をまたいで再利用する）
+
+    1つのユーザーデータは同時に1つのChromeしか使えないため、セッションごとに番号付きの枠（profile-N）を
+    ロックファイルで確保する。新しい枠は、使われていないときに限りprofile-0を複製して作る。
+    local_rootはこのプロセスから、remote_rootはSeleniumノードから見た同じディレクトリ（共有ボリューム）。
+    """
+
+    def __init__(self, local_root: str, remote_root: str, cache_max_bytes: int):
+        self.local_root = local_root
+        self.remote_root = remote_root
+        self.cache_max_bytes = cache_max_bytes
+        self.slot: Optional[int] = None
+        # none: プロファイルなし / cold: 空のプロファイルで開始 / warm: 前回までのプロファイルで開始
+        self.state = "none"
+        self._lock_file = None
+
+    def _try_lock(self, slot: int):
+        lock_file = open(os.path.join(self.local_root, f"profile-{slot}.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except OSError:
+            lock_file.close()
+            return None
+
+    def acquire(self) -> None:
+        """使われていない枠を確保し、必要なら複製・キャッシュの削除をする（確保済みなら何もしない）"""
+        if self.slot is not None:
+            return
+        os.makedirs(self.local_root, exist_ok=True)
+        for slot in range(MAX_SLOTS):
+            lock_file = self._try_lock(slot)
+            if lock_file is not None:
+                self.slot, self._lock_file = slot, lock_file
+                break
+        else:
+            raise RuntimeError(f"ブラウザプロファイルの空きがありません: {self.local_root}")
+
+        path = self.local_path
+        if os.path.isdir(path):
+            self.state = "warm"
+        elif self.slot > 0 and self._copy_primary(path):
+            self.state = "warm"
+        else:
+            self.state = "cold"
+            os.makedirs(path, exist_ok=True)
+        # Seleniumノードのユーザー（seluser）から書き込めるようにする
+        os.chmod(path, 0o777)
+
+        cache = os.path.join(path, CACHE_DIR)
+        if os.path.isdir(cache) and directory_size(cache) > self.cache_max_bytes:
+            print(f"ブラウザのキャッシュが上限を超えたため削除します: {cache}")
+            shutil.rmtree(cache, ignore_errors=True)
+
+    def _copy_primary(self, path: str) -> bool:
+        """profile-0が使われていなければ複製する（起動中のプロファイルは書き込み途中のことがあるため複製しない）"""
+        primary = os.path.join(self.local_root, "profile-0")
+        if not os.path.isdir(primary):
+            return False
+        lock_file = self._try_lock(0)
+        if lock_file is None:
+            return False
+        try:
+            shutil.copytree(primary, path, ignore=shutil.ignore_patterns(*LOCK_FILES), symlinks=True)
+            return True
+        except (OSError, shutil.Error) as e:
+            print(f"ブラウザプロファイルの複製に失敗したため空のプロファイルで開始します: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return False
+        finally:
+            lock_file.close()
+
+    def release(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()
+        self.slot, self._lock_file = None, None
+
+    @property
+    def local_path(self) -> str:
+        return os.path.join(self.local_root, f"profile-{self.slot}")
+
+    def chrome_arguments(self) -> List[str]:
+        remote_path = f"{self.remote_root.rstrip('/')}/profile-{self.slot}"
+        return [
+            f"--user-data-dir={remote_path}",
+            f"--disk-cache-dir={remote_path}/{CACHE_DIR}",
+            f"--disk-cache-size={self.cache_max_bytes}",
+        ]
+
+
+def create_browser_profile() -> Optional[BrowserProfile]:
+    """CHROME_PROFILE_DIRが設定されていればBrowserProfileを作成（未設定なら毎回空のプロファイル）"""
+    local_root = os.getenv("CHROME_PROFILE_DIR")
+    if not local_root:
+        return None
+    remote_root = os.getenv("CHROME_PROFILE_REMOTE_DIR", local_root)
+    cache_max_bytes = int(float(os.getenv("CHROME_CACHE_MAX_MB", "256")) * 1024 * 1024)
+    return BrowserProfile(local_root, remote_root, cache_max_bytes)
@@ -0,0 +1,131 @@
+import os
+import time
+import json
+import hashlib
+from typing import Optional, TYPE_CHECKING
+from services.card_scraper import CardScraper
+from models.database import DatabaseHandler
+from models.refresh_stats import RefreshStatsStore
+from models.change_history import ChangeHistoryRecorder
+from models.run_sweep import RunSweep
+from models.run_ledger import RunLedger, StageTimer
+from models.records import Record
+from services import profiler
+
+if TYPE_CHECKING:
+    from services.image_pipeline import ImagePipeline
+
+
+def _json_default(value):
+    # レコードはDBに保存する列（FIELDS）だけを含める（カード画像のURLはカードの内容として扱わない）
+    if isinstance(value, Record):
+        return dict(zip(value.FIELDS, value.to_params()))
+    return str(value)
+
+
+def content_hash(*parts) -> str:
+    """取得内容の変化検知用ハッシュ（保存するカードの列と子テーブルの行から求める）"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def create_image_pipeline(db_handler: DatabaseHandler) -> Optional["ImagePipeline"]:
+    """MinIOが設定されていれば画像パイプラインを作成（CARD_IMAGES_ENABLED=0で無効化）"""
+    if not os.getenv("MINIO_ENDPOINT") or os.getenv("CARD_IMAGES_ENABLED", "1") == "0":
+        return None
+    # MinIO・Pillowの読み込みは画像を扱うときだけ行う
+    from services.image_pipeline import ImagePipeline
+    from models.card_images import CardImageStore
+    return ImagePipeline(CardImageStore(db_handler))
+
+
+def process_card_url(
+    scraper: CardScraper,
+    db_handler: DatabaseHandler,
+    url: str,
+    history: Optional[ChangeHistoryRecorder] = None,
+    images: Optional["ImagePipeline"] = None,
+    sweep: Optional[RunSweep] = None,
+    ledger: Optional[RunLedger] = None,
+    from_ranking: bool = False,
+) -> int:
+    """1枚のカード詳細ページを取得し、関連情報とあわせて保存
+
+    ledgerを渡すと、成功・失敗と処理段階ごとの所要時間・再試行回数を実行記録に残す（例外はそのまま送出する）。
+    from_rankingは今回のランキングで見つけたURLかどうかで、Trueのときだけ論理削除済みのカードを復活させる。
+    """
+    timer = StageTimer()
+    retries = scraper.retries
+    try:
+        # --profile-scope cardのときはカード1枚ごとにプロファイルを取る
+        with profiler.capture(f"card_{url.split('id=')[-1]}"):
+            card_id = _scrape_and_save(scraper, db_handler, url, history, images, sweep, timer, from_ranking)
+    except Exception as e:
+        if ledger:
+            ledger.record_item(url, timer, scraper.retries - retries, e, scraper.profile_state)
+        raise
+    if ledger:
+        ledger.record_item(url, timer, scraper.retries - retries, browser_profile=scraper.profile_state)
+    return card_id
+
+
+def _scrape_and_save(
+    scraper: CardScraper,
+    db_handler: DatabaseHandler,
+    url: str,
+    history: Optional[ChangeHistoryRecorder],
+    images: Optional["ImagePipeline"],
+    sweep: Optional[RunSweep],
+    timer: StageTimer,
+    from_ranking: bool,
+) -> int:
+    started_at = time.time()
+
+    # カード情報の取得
+    with timer.stage("fetch"):
+        card_data = scraper.scrape_card_detail(url)
+    # 詳細ページ読み込み後の保存は1つのトランザクションにまとめる（SQLiteの場合）
+    with db_handler.batch():
+        # カード情報のupsert（変更履歴用に、上書きする前の内容を読んでおく）
+        with timer.stage("db"):
+            previous = history.load_previous(db_handler, card_data.kakaku_card_id) if history else None
+            card_id = db_handler.upsert_card(card_data, revive=from_ranking)
+
+        # カード画像のURLを画像パイプラインに登録
+        if images:
+            images.collect(card_id, card_data.image_urls or [])
+
+        # ポイント還元情報の取得と保存
+        with timer.stage("parse"):
+            rewards = scraper.scrape_point_rewards(card_id)
+        with timer.stage("db"):
+            db_handler.upsert_point_rewards(rewards)
+
+        # ポイント交換情報の取得と保存
+        with timer.stage("parse"):
+            exchanges = scraper.scrape_point_exchange(card_id)
+        with timer.stage("db"):
+            db_handler.upsert_point_exchanges(exchanges)
+
+        # 付帯保険情報・付帯サービス情報の取得と保存
+        with timer.stage("parse"):
+            insurances = scraper.scrape_include_insurance(card_id)
+            services = scraper.scrape_include_services(card_id)
+
+        with timer.stage("db"):
+            # 前回からの差分を変更履歴に記録
+            if history:
+                history.record_card(card_id, card_data, exchanges, insurances, services, previous)
+
+            # 再取得スケジューリング用の履歴を記録
+            RefreshStatsStore(db_handler).record_scrape(
+                card_data.kakaku_card_id,
+                content_hash(card_data, rewards, exchanges, insurances, services),
+                time.time() - started_at,
+            )
+
+        # 実行の最後に、今回のページになかった子テーブルの行を論理削除する
+        if sweep:
+            sweep.record_card(card_id, exchanges, insurances, services)
+
+    return card_id
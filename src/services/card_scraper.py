@@ -1,7 +1,7 @@
 import os
 import time
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, TYPE_CHECKING
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -9,15 +9,117 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import WebDriverException, TimeoutException, NoSuchElementException, StaleElementReferenceException
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from models.database import DatabaseHandler
-from services.sheets_handler import SheetsHandler
+from models.records import CardRecord, ExchangeRecord, InsuranceRecord, ServiceRecord
+from services.rate_limiter import get_pacer
+from services.browser_profile import create_browser_profile
+
+if TYPE_CHECKING:
+    # Google APIクライアントの読み込みは重いため、型チェック時のみimportする
+    from services.sheets_handler import SheetsHandler
+
+
+# カード画像の要素（ページ構成の変更に備えて環境変数で上書きできるようにする）
+CARD_IMAGE_SELECTOR = os.getenv("CARD_IMAGE_SELECTOR", ".p-cardImg img, .cardImg img, .itmImg img")
+
+# スロットリング・メンテナンス画面の判定に使うタイトル文字列
+THROTTLE_MARKERS = {
+    "http_429": ("Too Many Requests",),
+    "http_503": ("Service Unavailable", "Service Temporarily Unavailable"),
+}
+
+
+# 還元率テーブルの全行と注記を1回で読み出すスクリプト
+RATE_TABLE_SCRIPT = """
+const table = document.querySelector(".p-rateTbl.p-rateTbl-type2.p-rateTbl01.s-highlightTbl");
+if (!table) {
+    return null;
+}
+const notes = Array.from(document.querySelectorAll(".p-rateNotes_label")).map(
+    (label) => (label.nextSibling ? label.nextSibling.textContent.trim() : "")
+);
+const rows = [];
+table.querySelectorAll("tbody tr").forEach((tr) => {
+    const th = tr.querySelector("th");
+    const td = tr.querySelector("td");
+    if (!th) {
+        return;
+    }
+    rows.push({
+        classes: th.className,
+        label: th.textContent.trim(),
+        title: th.getAttribute("title") || "",
+        value: td ? td.textContent.trim() : "",
+    });
+});
+return {rows: rows, notes: notes};
+"""
+
+
+def parse_point_reward_rows(rows: List[Dict[str, str]], notes: List[str]) -> List[Dict[str, Any]]:
+    """還元率テーブルの行からショップと還元内容を取り出す"""
+    parsed = []
+    category = ""
+    for row in rows:
+        try:
+            classes = set(row["classes"].split())
+            if {"p-rateTbl_label", "p-rateTbl_labelParent", "fixCol"}.issubset(classes):
+                category = row["label"]
+                continue
+
+            shop_text = row["title"].split("※")
+            remarks = ""
+            if len(shop_text) > 1:
+                remarks = notes[int(shop_text[-1].strip()) - 1]
+
+            numbers = re.findall(r"\d+,?\d*", row["value"])
+            parsed.append({
+                "shop": {
+                    "shop_name": shop_text[0],
+                    "is_online": category == "ECサイト",
+                    "category": category,
+                },
+                "spending_amount": int(numbers[0].replace(",", "")),
+                "given_points": int(numbers[1]),
+                "remarks": remarks,
+            })
+        except Exception as e:
+            print(f"ポイント還元情報の行処理中にエラーが発生: {str(e)}")
+            continue
+    return parsed
+
+
+def count_retry(retry_state) -> None:
+    """tenacityが再試行する前に、スクレイパーの再試行回数を数える（実行記録用）"""
+    scraper = retry_state.args[0] if retry_state.args else None
+    if isinstance(scraper, CardScraper):
+        scraper.retries += 1
+
+
+class ThrottledError(WebDriverException):
+    """アクセス制限・一時停止ページが返された"""
+
+    def __init__(self, throttle_kind: str, url: str):
+        super().__init__(f"アクセス制限を検知しました({throttle_kind}): {url}")
+        self.throttle_kind = throttle_kind
 
 
 class CardScraper:
-    def __init__(self, db_handler: DatabaseHandler, sheets_handler: SheetsHandler):
+    def __init__(
+        self,
+        db_handler: DatabaseHandler,
+        sheets_handler: Optional["SheetsHandler"] = None,
+        selenium_url: Optional[str] = None,
+    ):
         self.db_handler = db_handler
         self.sheets_handler = sheets_handler
+        self.selenium_url = selenium_url or os.getenv("SELENIUM_URL", "http://selenium:4444/wd/hub")
         self.driver = None
         self.wait = None
+        self.ranking_complete = False
+        # tenacityで再試行した回数（count_retryが加算する）
+        self.retries = 0
+        # CHROME_PROFILE_DIRを設定すると、実行をまたいでCookie・キャッシュを再利用する
+        self.profile = create_browser_profile()
         self._init_driver()
         self._init_wait()
 
@@ -28,9 +130,15 @@ class CardScraper:
             chrome_options.add_argument('--no-sandbox')
             chrome_options.add_argument('--headless')
             chrome_options.add_argument('--disable-dev-shm-usage')
-            
+            if self.profile:
+                # 同じユーザーデータを使う前のセッションが残っていると起動できないため終了させる
+                self._quit_driver()
+                self.profile.acquire()
+                for argument in self.profile.chrome_arguments():
+                    chrome_options.add_argument(argument)
+
             self.driver = webdriver.Remote(
-                command_executor=os.getenv("SELENIUM_URL", "http://selenium:4444/wd/hub"),
+                command_executor=self.selenium_url,
                 options=chrome_options
             )
         except Exception as e:
@@ -51,96 +159,143 @@ class CardScraper:
             self._init_driver()
             self._init_wait()
 
+    def _check_throttled(self, url: str) -> None:
+        """アクセス制限ページが表示されていないか確認"""
+        title = self.driver.title or ""
+        for kind, markers in THROTTLE_MARKERS.items():
+            if any(marker in title for marker in markers):
+                raise ThrottledError(kind, url)
+
     @retry(
         retry=retry_if_exception_type((WebDriverException, TimeoutException, StaleElementReferenceException)),
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        before_sleep=count_retry,
     )
-    def get_card_urls(self, base_url: str, max_pages: int = 5) -> List[str]:
-        """カード詳細ページのURL一覧を取得"""
+    def _open_ranking(self, base_url: str) -> None:
+        """ランキングの1ページ目を開き、検索結果が表示されるまで待機"""
         print(f"カードURL一覧の取得中: {base_url}")
         self._ensure_driver()
-        detail_urls = []
+        pacer = get_pacer(base_url)
 
         try:
-            self.driver.get(base_url)
-            
-            # ページの読み込みを待機
-            time.sleep(5)
-            
-            # 検索結果の表示を待機
-            try:
-                self.wait.until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "p-planSearchList"))
-                )
-            except TimeoutException:
-                print("検索結果が見つかりません。ページを再読み込みします。")
-                self.driver.refresh()
+            with pacer.page_load(base_url) as load:
+                self.driver.get(base_url)
+
+                # ページの読み込みを待機
                 time.sleep(5)
-                self.wait.until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "p-planSearchList"))
-                )
+                self._check_throttled(base_url)
 
-            for _ in range(max_pages):
+                # 検索結果の表示を待機
                 try:
-                    # カードリストの要素を待機
-                    card_list_elements = self.wait.until(
-                        EC.presence_of_all_elements_located(
-                            (By.CSS_SELECTOR, ".p-planSearchList_item")
-                        )
+                    self.wait.until(
+                        EC.presence_of_element_located((By.CLASS_NAME, "p-planSearchList"))
+                    )
+                except TimeoutException:
+                    load.fail("missing_list")
+
+            if load.error:
+                print("検索結果が見つかりません。ページを再読み込みします。")
+                with pacer.page_load(base_url):
+                    self.driver.refresh()
+                    time.sleep(5)
+                    self._check_throttled(base_url)
+                    self.wait.until(
+                        EC.presence_of_element_located((By.CLASS_NAME, "p-planSearchList"))
+                    )
+        except Exception as e:
+            print(f"URL取得中にエラーが発生: {str(e)}")
+            self._init_driver()
+            self._init_wait()
+            raise e
+
+    def iter_card_pages(self, base_url: str, max_pages: Optional[int] = None) -> Iterator[List[str]]:
+        """ランキングを1ページずつ読み進め、そのページで初めて見つけたカード詳細URLを返す
+
+        max_pagesを省略（または0）した場合は最後のページまで読む。途中でエラーになった場合は
+        それまでに返したURLを残して終了する。最後のページまで読めたかはranking_completeに記録する。
+        """
+        self.ranking_complete = False
+        self._open_ranking(base_url)
+        pacer = get_pacer(base_url)
+        found = set()
+        page = 0
+
+        while not max_pages or page < max_pages:
+            page += 1
+            try:
+                # カードリストの要素を待機
+                card_list_elements = self.wait.until(
+                    EC.presence_of_all_elements_located(
+                        (By.CSS_SELECTOR, ".p-planSearchList_item")
                     )
+                )
 
-                    for element in card_list_elements:
-                        try:
-                            link = element.find_element(
-                                By.CSS_SELECTOR, ".p-planSearchList_name_link"
-                            )
-                            url = link.get_attribute("href")
-                            if url:
-                                detail_urls.append(url)
-                        except NoSuchElementException:
-                            print("リンク要素が見つかりません")
-                            continue
-
-                    # 次のページボタンを探す
+                page_urls = []
+                for element in card_list_elements:
                     try:
-                        next_button = self.driver.find_element(By.CSS_SELECTOR, ".next")
-                        if not next_button.is_displayed():
-                            print("次のページボタンが表示されていません")
-                            break
+                        link = element.find_element(
+                            By.CSS_SELECTOR, ".p-planSearchList_name_link"
+                        )
+                        url = link.get_attribute("href")
+                        if url and url not in found:
+                            found.add(url)
+                            page_urls.append(url)
+                    except NoSuchElementException:
+                        print("リンク要素が見つかりません")
+                        continue
+
+                # 新しいURLがないページは同じページの繰り返しとみなして終了
+                if not page_urls:
+                    print(f"{page}ページ目に新しいカードがないため終了します")
+                    return
+                yield page_urls
+
+                # 次のページボタンを探す
+                try:
+                    next_button = self.driver.find_element(By.CSS_SELECTOR, ".next")
+                    if not next_button.is_displayed():
+                        print("次のページボタンが表示されていません")
+                        self.ranking_complete = True
+                        return
+                except NoSuchElementException:
+                    print(f"最後のページまで取得しました: {page}ページ")
+                    self.ranking_complete = True
+                    return
+                try:
+                    with pacer.page_load(base_url):
                         next_button.click()
                         time.sleep(3)  # ページ遷移後の待機
                         self.wait.until(EC.staleness_of(card_list_elements[0]))
-                    except (NoSuchElementException, TimeoutException):
-                        print("次のページボタンが見つからないか、クリックできません")
-                        break
+                except TimeoutException:
+                    print("次のページボタンをクリックできません")
+                    return
 
-                except Exception as e:
-                    print(f"ページ処理中にエラーが発生: {str(e)}")
-                    break
-
-            return detail_urls
+            except Exception as e:
+                print(f"ページ処理中にエラーが発生: {str(e)}")
+                return
 
-        except Exception as e:
-            print(f"URL取得中にエラーが発生: {str(e)}")
-            self._init_driver()
-            self._init_wait()
-            raise e
+    def get_card_urls(self, base_url: str, max_pages: Optional[int] = None) -> List[str]:
+        """カード詳細ページのURL一覧を取得"""
+        return [url for page_urls in self.iter_card_pages(base_url, max_pages) for url in page_urls]
 
     @retry(
         retry=retry_if_exception_type((WebDriverException, TimeoutException, StaleElementReferenceException)),
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        before_sleep=count_retry,
     )
-    def scrape_card_detail(self, url: str) -> Dict[str, Any]:
-        """カード詳細ページから情報を取得"""
+    def scrape_card_detail(self, url: str) -> CardRecord:
+        """カード詳細ページから情報を取得（項目の型はCardRecordの生成時に検証する）"""
         self._ensure_driver()
 
         try:
-            self.driver.get(url)
-            
-            # ページの読み込みを待機
-            self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "def-tbl1")))
+            with get_pacer(url).page_load(url):
+                self.driver.get(url)
+                self._check_throttled(url)
+
+                # ページの読み込みを待機
+                self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "def-tbl1")))
 
             kakaku_card_id = url.split("id=")[-1]
 
@@ -159,14 +314,20 @@ class CardScraper:
             else:
                 official_url = ""
 
-            # 基本情報の取得
-            card_data = {
-                "kakaku_card_id": kakaku_card_id,
-                "card_name": rows[0].find_element(By.TAG_NAME, "td").text,
-                "official_url": official_url,
-                "grade": grade,
-            }
-            print(f"カード名: {card_data['card_name']}")
+            # 基本情報の取得（辞書を介さずにレコードの項目へ直接設定し、最後に検証する）
+            card = CardRecord.blank()
+            card.kakaku_card_id = kakaku_card_id
+            card.card_name = rows[0].find_element(By.TAG_NAME, "td").text
+            card.official_url = official_url
+            card.grade = grade
+            print(f"カード名: {card.card_name}")
+
+            # カード画像のURL（画像の取得・保存は後段のImagePipelineでまとめて行う）
+            card.image_urls = [
+                image.get_attribute("src")
+                for image in self.driver.find_elements(By.CSS_SELECTOR, CARD_IMAGE_SELECTOR)
+                if image.get_attribute("src")
+            ]
 
             # 発行会社と提携会社の処理
             issuer_name = rows[2].find_element(By.TAG_NAME, "td").text
@@ -174,45 +335,35 @@ class CardScraper:
 
             # データベース接続を確認し、必要に応じて再接続
             try:
-                card_data["issuer_id"] = self.db_handler.get_issuer_id(issuer_name)
-                # card_data["partner_id"] = self.db_handler.get_partner_id(partner_name)
+                card.issuer_id = self.db_handler.get_issuer_id(issuer_name)
+                # card.partner_id = self.db_handler.get_partner_id(partner_name)
             except Exception as e:
                 print(f"データベース接続エラー: {str(e)}")
                 self.db_handler.reconnect()  # データベース接続を再確立
-                card_data["issuer_id"] = self.db_handler.get_issuer_id(issuer_name)
-                # card_data["partner_id"] = self.db_handler.get_partner_id(partner_name)
+                card.issuer_id = self.db_handler.get_issuer_id(issuer_name)
+                # card.partner_id = self.db_handler.get_partner_id(partner_name)
 
             # ブランド情報の処理
             brands = rows[4].find_element(By.TAG_NAME, "td").text.split("、")
-            card_data.update(
-                {
-                    "visa": "Visa" in brands,
-                    "mastercard": "Mastercard" in brands,
-                    "jcb": "JCB" in brands,
-                    "amex": "AMEX（アメックス）" in brands,
-                    "diners": "Diners" in brands,
-                    "unionpay": "銀聯（UnionPay）" in brands,
-                }
-            )
+            card.visa = "Visa" in brands
+            card.mastercard = "Mastercard" in brands
+            card.jcb = "JCB" in brands
+            card.amex = "AMEX（アメックス）" in brands
+            card.diners = "Diners" in brands
+            card.unionpay = "銀聯（UnionPay）" in brands
 
             # その他の情報
-            card_data.update(
-                {
-                    "eligibility": rows[5].find_element(By.TAG_NAME, "td").text,
-                    "application_method": rows[6].find_element(By.TAG_NAME, "td").text,
-                    "screening_period": rows[7].find_element(By.TAG_NAME, "td").text,
-                    "annual_fee_raw": rows[8].find_element(By.TAG_NAME, "td").text,
-                    "shopping_limit": rows[9].find_element(By.TAG_NAME, "td").text,
-                    "cashing_limit": rows[10].find_element(By.TAG_NAME, "td").text,
-                    "revolving_interest_rate": rows[11]
-                    .find_element(By.TAG_NAME, "td")
-                    .text,
-                    "cashing_interest_rate": rows[12].find_element(By.TAG_NAME, "td").text,
-                    "payment_methods": rows[13].find_element(By.TAG_NAME, "td").text,
-                    "closing_date": rows[14].find_element(By.TAG_NAME, "td").text,
-                    "remarks": rows[15].find_element(By.TAG_NAME, "td").text,
-                }
-            )
+            card.eligibility = rows[5].find_element(By.TAG_NAME, "td").text
+            card.application_method = rows[6].find_element(By.TAG_NAME, "td").text
+            card.screening_period = rows[7].find_element(By.TAG_NAME, "td").text
+            card.annual_fee_raw = rows[8].find_element(By.TAG_NAME, "td").text
+            card.shopping_limit = rows[9].find_element(By.TAG_NAME, "td").text
+            card.cashing_limit = rows[10].find_element(By.TAG_NAME, "td").text
+            card.revolving_interest_rate = rows[11].find_element(By.TAG_NAME, "td").text
+            card.cashing_interest_rate = rows[12].find_element(By.TAG_NAME, "td").text
+            card.payment_methods = rows[13].find_element(By.TAG_NAME, "td").text
+            card.closing_date = rows[14].find_element(By.TAG_NAME, "td").text
+            card.remarks = rows[15].find_element(By.TAG_NAME, "td").text
 
             # ポイント還元情報の取得
             point_table = self.wait.until(
@@ -225,35 +376,28 @@ class CardScraper:
                 "point_name": point_name,
                 "expiration": expiration,
             }
-            point_id = self.db_handler.get_point_id(point_data)
-            card_data["point_id"] = point_id
-            annual_bonus_raw = rows[11].find_element(By.TAG_NAME, "td").text
-            card_data["annual_bonus_raw"] = annual_bonus_raw
+            card.point_id = self.db_handler.get_point_id(point_data)
+            card.annual_bonus_raw = rows[11].find_element(By.TAG_NAME, "td").text
 
-            # 追加機能
+            # 追加機能（テーブルがないカードは空文字）
+            card.etc_card = card.family_card = card.electronic_money = card.electronic_money_charge = ""
+            card.electronic_money_point = card.digital_wallet = card.code_payment = ""
             tables = self.driver.find_elements(By.CLASS_NAME, "def-tbl1")
             if len(tables) > 2:
                 additional_info = tables[2]
                 rows = additional_info.find_elements(By.TAG_NAME, "tr")
                 first_row_th = rows[0].find_element(By.TAG_NAME, "th")
                 if first_row_th.text == "ETCカード":
-                    card_data["etc_card"] = rows[1].find_element(By.TAG_NAME, "td").text
-                    card_data["family_card"] = rows[2].find_element(By.TAG_NAME, "td").text
-                    card_data["electronic_money"] = rows[3].find_element(By.TAG_NAME, "td").text
-                    card_data["electronic_money_charge"] = rows[4].find_element(By.TAG_NAME, "td").text
-                    card_data["electronic_money_point"] = rows[5].find_element(By.TAG_NAME, "td").text
-                    card_data["digital_wallet"] = rows[6].find_element(By.TAG_NAME, "td").text
-                    card_data["code_payment"] = rows[7].find_element(By.TAG_NAME, "td").text
-                    return card_data
-                    
-            card_data["etc_card"] = ""
-            card_data["family_card"] = ""
-            card_data["electronic_money"] = ""
-            card_data["electronic_money_charge"] = ""
-            card_data["electronic_money_point"] = ""
-            card_data["digital_wallet"] = ""
-            card_data["code_payment"] = ""
-            return card_data
+                    card.etc_card = rows[1].find_element(By.TAG_NAME, "td").text
+                    card.family_card = rows[2].find_element(By.TAG_NAME, "td").text
+                    card.electronic_money = rows[3].find_element(By.TAG_NAME, "td").text
+                    card.electronic_money_charge = rows[4].find_element(By.TAG_NAME, "td").text
+                    card.electronic_money_point = rows[5].find_element(By.TAG_NAME, "td").text
+                    card.digital_wallet = rows[6].find_element(By.TAG_NAME, "td").text
+                    card.code_payment = rows[7].find_element(By.TAG_NAME, "td").text
+
+            card.validate()
+            return card
 
         except Exception as e:
             print(f"カード詳細の取得中にエラーが発生: {str(e)}")
@@ -264,75 +408,41 @@ class CardScraper:
     @retry(
         retry=retry_if_exception_type((WebDriverException, TimeoutException, StaleElementReferenceException)),
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        before_sleep=count_retry,
     )
     def scrape_point_rewards(self, card_id: int) -> List[Dict[str, Any]]:
-        """ポイント還元情報を取得"""
+        """ポイント還元情報を取得
+
+        還元率テーブルと注記を1回のスクリプト実行でまとめて読み出し、
+        ショップIDは一括で解決する。
+        """
         print(f"ポイント還元情報の取得中: {card_id}")
-        rewards = []
         try:
-            point_tables = self.wait.until(
+            self.wait.until(
                 EC.presence_of_all_elements_located(
                     (By.CSS_SELECTOR, ".p-rateTbl.p-rateTbl-type2.p-rateTbl01.s-highlightTbl")
                 )
             )
+            rate_table = self.driver.execute_script(RATE_TABLE_SCRIPT)
+            if not rate_table:
+                return []
 
-            if not point_tables:
-                return rewards
-
-            table = point_tables[0]
-            rows = table.find_element(By.TAG_NAME, "tbody").find_elements(By.TAG_NAME, "tr")
-            notes = self.driver.find_elements(By.CLASS_NAME, "p-rateNotes_label")
+            parsed_rows = parse_point_reward_rows(rate_table["rows"], rate_table["notes"])
+            shop_ids = self.db_handler.get_shop_ids([row["shop"] for row in parsed_rows])
 
-            category = ""
-            for row in rows:
-                try:
-                    th = row.find_element(By.TAG_NAME, "th")
-                    classes = set(th.get_attribute("class").split())
-
-                    if {"p-rateTbl_label", "p-rateTbl_labelParent", "fixCol"}.issubset(classes):
-                        category = th.get_attribute("textContent").strip()
-                        continue
-
-                    shop_text = th.get_attribute("title").split("※")
-                    shop = shop_text[0]
-                    shop_data = {
-                        "shop_name": shop,
-                        "is_online": category == "ECサイト",
-                        "category": category,
-                    }
-                    shop_id = self.db_handler.get_shop_id(shop_data)
-
-                    remarks = ""
-                    if len(shop_text) > 1:
-                        remarks_number = shop_text[-1].strip()
-                        remarks = self.driver.execute_script(
-                            "return arguments[0].nextSibling.textContent;",
-                            notes[int(remarks_number) - 1],
-                        ).strip()
-
-                    td = row.find_element(By.XPATH, ".//td")
-                    rewards_text = td.get_attribute("textContent").strip()
-                    numbers = re.findall(r"\d+,?\d*", rewards_text)
-
-                    amount = int(numbers[0].replace(",", ""))
-                    given_points = int(numbers[1])
-
-                    rewards.append(
-                        {
-                            "card_id": card_id,
-                            "shop_id": shop_id,
-                            "spending_amount": amount,
-                            "given_points": given_points,
-                            "remarks": remarks,
-                            "from_kakaku": True,
-                        }
-                    )
-                except Exception as e:
-                    print(f"ポイント還元情報の行処理中にエラーが発生: {str(e)}")
-                    continue
-
-            return rewards
+            return [
+                {
+                    "card_id": card_id,
+                    "shop_id": shop_ids[row["shop"]["shop_name"]],
+                    "spending_amount": row["spending_amount"],
+                    "given_points": row["given_points"],
+                    "remarks": row["remarks"],
+                    "from_kakaku": True,
+                }
+                for row in parsed_rows
+                if row["shop"]["shop_name"] in shop_ids
+            ]
 
         except Exception as e:
             print(f"ポイント還元情報の取得中にエラーが発生: {str(e)}")
@@ -343,9 +453,10 @@ class CardScraper:
     @retry(
         retry=retry_if_exception_type((WebDriverException, TimeoutException, StaleElementReferenceException)),
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        before_sleep=count_retry,
     )
-    def scrape_point_exchange(self, card_id: int) -> List[Dict[str, Any]]:
+    def scrape_point_exchange(self, card_id: int) -> List[ExchangeRecord]:
         """ポイント交換情報を取得"""
         print(f"ポイント交換情報の取得中: {card_id}")
         exchanges = []
@@ -397,13 +508,13 @@ class CardScraper:
                         }
                         reward_id = self.db_handler.get_reward_id(reward)
 
-                        exchanges.append({
-                            "card_id": card_id,
-                            "exchangeable_reward_id": reward_id,
-                            "before_value": before_value,
-                            "after_value": after_value,
-                            "remarks": remarks,
-                        })
+                        exchanges.append(ExchangeRecord(
+                            card_id=card_id,
+                            exchangeable_reward_id=reward_id,
+                            before_value=before_value,
+                            after_value=after_value,
+                            remarks=remarks,
+                        ))
                     else:
                         raise ValueError(f"Invalid exchange rate format: {exchange_rate_str}")
                     
@@ -414,14 +525,15 @@ class CardScraper:
             self._init_wait()
             raise e
     
-    def scrape_include_insurance(self, card_id: int):
-        """付帯保険情報を取得"""
+    def scrape_include_insurance(self, card_id: int) -> List[InsuranceRecord]:
+        """付帯保険情報を取得して保存し、保存した行を返す"""
         print(f"付帯保険情報の取得中: {card_id}")
+        insurances = []
         try:
             tables = self.driver.find_elements(By.CLASS_NAME, "def-tbl2")
             if len(tables) < 2:
                 print(f"カードID {card_id} の付帯保険情報テーブルが見つかりません")
-                return
+                return insurances
             insurance_table = tables[-1]
             
             rows = insurance_table.find_elements(By.TAG_NAME, "tr")
@@ -444,14 +556,17 @@ class CardScraper:
                 if coverage_amount == "-":
                     continue
                 
-                include_insurance_data = {
-                    "card_id": card_id,
-                    "category": category,
-                    "coverage_type": coverage_type,
-                    "coverage_amount": coverage_amount,
-                    "remarks": "",
-                }
+                include_insurance_data = InsuranceRecord(
+                    card_id=card_id,
+                    category=category,
+                    coverage_type=coverage_type,
+                    coverage_amount=coverage_amount,
+                    remarks="",
+                )
                 self.db_handler.upsert_include_insurance(include_insurance_data)
+                insurances.append(include_insurance_data)
+
+            return insurances
 
         except Exception as e:
             print(f"付帯保険情報の取得中にエラーが発生: {str(e)}")
@@ -459,14 +574,15 @@ class CardScraper:
             self._init_wait()
             raise e
 
-    def scrape_include_services(self, card_id: int):
-        """付帯サービス情報を取得"""
+    def scrape_include_services(self, card_id: int) -> List[ServiceRecord]:
+        """付帯サービス情報を取得して保存し、保存した行を返す"""
         print(f"付帯サービス情報の取得中: {card_id}")
+        services = []
         try:
             tables = self.driver.find_elements(By.CLASS_NAME, "def-tbl1")
             if len(tables) < 4:
                 print(f"カードID {card_id} の付帯サービス情報テーブルが見つかりません")
-                return
+                return services
             
             service_table = tables[3]
             rows = service_table.find_elements(By.TAG_NAME, "tr")
@@ -474,13 +590,16 @@ class CardScraper:
                 service_name = row.find_element(By.TAG_NAME, "th").text
                 service_content = row.find_element(By.TAG_NAME, "td").text
                 
-                include_service_data = {
-                    "card_id": card_id,
-                    "service_name": service_name,
-                    "service_content": service_content,
-                    "remarks": "",
-                }
+                include_service_data = ServiceRecord(
+                    card_id=card_id,
+                    service_name=service_name,
+                    service_content=service_content,
+                    remarks="",
+                )
                 self.db_handler.upsert_include_service(include_service_data)
+                services.append(include_service_data)
+
+            return services
 
         except Exception as e:
             print(f"付帯サービス情報の取得中にエラーが発生: {str(e)}")
@@ -505,7 +624,22 @@ class CardScraper:
         except Exception as e:
             print(f"ポイント情報の取得中にエラーが発生: {str(e)}")
 
+    @property
+    def profile_state(self) -> str:
+        """ブラウザプロファイルの状態（none / cold / warm。実行記録で読み込み時間を比べるために使う）"""
+        return self.profile.state if self.profile else "none"
+
+    def _quit_driver(self) -> None:
+        if self.driver:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+            self.driver = None
+
     def close(self):
-        """ドライバーを終了"""
+        """ドライバーを終了（プロファイルの枠も解放する）"""
         if self.driver:
             self.driver.quit()
+        if self.profile:
+            self.profile.release()
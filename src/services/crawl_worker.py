@@ -0,0 +1,231 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from typing import Dict, Any, List, Iterable, Optional
+from models.database import DatabaseHandler, create_database_handler
+from models.crawl_queue import CrawlQueue, LeaseHeartbeat
+from models.change_history import ChangeHistoryRecorder
+from models.run_sweep import RunSweep, describe_sweep
+from models.run_ledger import RunLedger
+from models.host_rate_limits import HostRateLimitStore
+from models.search_index import CardSearchIndex
+from models.card_vectors import CardVectorStore
+from models.card_facets import CardFacetStore
+from services.tag_rules import TagEngine
+from services.exchange_graph import ExchangeValueEngine
+from services.card_scraper import CardScraper
+from services.card_pipeline import process_card_url, create_image_pipeline
+from services.rate_limiter import describe_pacers, enable_shared_pacing
+
+
+class CrawlWorker:
+    """共有キューからURLを取得してカード情報をスクレイピングするワーカー
+
+    キューが空になる（処理待ち・処理中のURLがなくなる）まで取得と処理を繰り返す。
+    """
+
+    def __init__(
+        self,
+        scraper: CardScraper,
+        db_handler: DatabaseHandler,
+        queue: CrawlQueue,
+        batch_size: int = 1,
+        poll_interval: float = 10,
+        startup_timeout: float = 600,
+    ):
+        self.scraper = scraper
+        self.db_handler = db_handler
+        self.queue = queue
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.startup_timeout = startup_timeout
+
+    def run(self) -> Dict[str, Any]:
+        """キューが空になるまで処理"""
+        heartbeat = LeaseHeartbeat(
+            self.queue.run_id,
+            self.queue.owner,
+            self.queue.lease_seconds,
+            interval=max(self.queue.lease_seconds / 3, 1),
+        )
+        heartbeat.start()
+        history = ChangeHistoryRecorder(self.db_handler, run_id=self.queue.run_id)
+        # 実行記録はワーカーごとに1件（同じrun_idの記録を集計すればクロール全体になる）
+        ledger = RunLedger(self.db_handler, "worker", self.queue.run_id)
+        status = "failed"
+        images = create_image_pipeline(self.db_handler)
+        # 子テーブルの行は、このワーカーが取得したカードの分だけ論理削除する
+        sweep = RunSweep(self.db_handler)
+        processed = 0
+        failed = 0
+        started_at = time.time()
+        try:
+            while True:
+                items = self.queue.claim(self.batch_size)
+                if not items:
+                    stats = self.queue.stats()
+                    if stats["remaining"] == 0:
+                        # コーディネーターがまだURLを登録していない場合は待機する
+                        total = sum(count for status, count in stats.items() if status != "remaining")
+                        if total > 0 or time.time() - started_at > self.startup_timeout:
+                            break
+                    # 他ノードが処理中のリースが期限切れになる可能性があるため待機して再取得
+                    time.sleep(self.poll_interval)
+                    continue
+
+                for item_id, url in items:
+                    heartbeat.hold(item_id)
+                for item_id, url in items:
+                    try:
+                        # キューのURLはdiscoverがランキングから登録したもの
+                        process_card_url(
+                            self.scraper, self.db_handler, url, history, images, sweep, ledger, from_ranking=True
+                        )
+                        self.queue.complete(item_id)
+                        processed += 1
+                    except Exception as e:
+                        print(f"[ERROR] カード情報の取得に失敗: {url}")
+                        print(e)
+                        self.queue.fail(item_id, str(e))
+                        failed += 1
+                    finally:
+                        heartbeat.release(item_id)
+            status = "completed"
+        finally:
+            heartbeat.stop()
+            history.flush()
+            ledger.finish(status)
+            CardSearchIndex(self.db_handler).refresh(history.changed_card_ids)
+            CardVectorStore(self.db_handler).refresh(history.changed_card_ids)
+            TagEngine(self.db_handler).run(history.changed_card_ids)
+            CardFacetStore(self.db_handler).refresh(history.changed_card_ids)
+            ExchangeValueEngine(self.db_handler).refresh()
+            print(describe_sweep(sweep.sweep()))
+            if images:
+                images.run()
+
+        elapsed = time.time() - started_at
+        result = {
+            "owner": self.queue.owner,
+            "processed": processed,
+            "failed": failed,
+            "elapsed": elapsed,
+            "cards_per_minute": processed / elapsed * 60 if elapsed > 0 else 0.0,
+        }
+        print(f"ワーカー終了: {result}")
+        return result
+
+
+def selenium_url_for(index: int) -> str:
+    """ノード番号に対応するSeleniumエンドポイントを取得
+
+    SELENIUM_URLS にカンマ区切りで複数指定した場合はノード番号で振り分ける。
+    """
+    urls = [url.strip() for url in os.getenv("SELENIUM_URLS", "").split(",") if url.strip()]
+    if not urls:
+        return os.getenv("SELENIUM_URL", "http://selenium:4444/wd/hub")
+    return urls[index % len(urls)]
+
+
+def run_worker(run_id: str, index: int = 0, batch_size: int = 1) -> Dict[str, Any]:
+    """1ノード分のワーカーを起動（DB接続とWebDriverはノードごとに持つ）
+
+    ホストごとのリクエストレートはhost_rate_limitsで全ワーカーと共有する。
+    ワーカーは1ページずつ取得するため、同時実行数はワーカーの数（プロセス数×ノード数）になる。
+    """
+    db_handler = create_database_handler()
+    rate_handler = create_database_handler()
+    scraper = None
+    try:
+        scraper = CardScraper(db_handler, selenium_url=selenium_url_for(index))
+        queue = CrawlQueue(db_handler, run_id)
+        enable_shared_pacing(HostRateLimitStore(rate_handler))
+        return CrawlWorker(scraper, db_handler, queue, batch_size=batch_size).run()
+    finally:
+        if scraper:
+            scraper.close()
+        db_handler.close()
+        rate_handler.close()
+
+
+def run_local_workers(run_id: str, processes: int, batch_size: int = 1) -> List[Optional[int]]:
+    """同一ホスト上で複数プロセスのワーカーを起動し、全て終了するまで待機"""
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(run_id, index, batch_size))
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [worker.exitcode for worker in workers]
+
+
+def run_threaded(
+    urls: Iterable[str],
+    threads: int,
+    report_every: int = 10,
+    history: Optional[ChangeHistoryRecorder] = None,
+    images=None,
+    sweep: Optional[RunSweep] = None,
+    ledger: Optional[RunLedger] = None,
+    from_ranking: bool = False,
+) -> Dict[str, int]:
+    """複数のWebDriverを使ってURLを並列に処理
+
+    実際に同時に読み込むページ数はホストごとのペーサーが調整する。
+    DB接続とWebDriverはスレッドごとに持つ。
+    urlsにはUrlStreamのように処理中に増えていくものも渡せる（届いた順に処理する）。
+    """
+    url_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def feed() -> None:
+        try:
+            for url in urls:
+                url_queue.put(url)
+        finally:
+            # スレッドごとに終了の合図を入れる
+            for _ in range(threads):
+                url_queue.put(None)
+
+    counts = {"processed": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def work(index: int) -> None:
+        db_handler = create_database_handler()
+        scraper = None
+        try:
+            scraper = CardScraper(db_handler, selenium_url=selenium_url_for(index))
+            while True:
+                url = url_queue.get()
+                if url is None:
+                    return
+                try:
+                    process_card_url(scraper, db_handler, url, history, images, sweep, ledger, from_ranking)
+                    key = "processed"
+                except Exception as e:
+                    print(f"[ERROR] カード情報の取得に失敗: {url}")
+                    print(e)
+                    key = "failed"
+                with lock:
+                    counts[key] += 1
+                    done = counts["processed"] + counts["failed"]
+                if done % report_every == 0:
+                    print(f"進捗: {done}件")
+                    print(describe_pacers())
+        finally:
+            if scraper:
+                scraper.close()
+            db_handler.close()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    workers = [threading.Thread(target=work, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(describe_pacers())
+    return counts
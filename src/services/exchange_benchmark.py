@@ -0,0 +1,49 @@
+import random
+from typing import List, Dict, Any, Tuple
+from services.exchange_graph import ExchangeGraph
+from services.record_benchmark import measure_time
+
+# ダミーのグラフの規模（価格.comのポイント・交換先の件数に近い値）
+PROGRAMS = 200
+REWARDS = 600
+EXCHANGES_PER_CARD = 8
+
+# 交換先のうちポイント名と同じ名前にする割合（ポイント→ポイントの多段の経路になる）
+CHAINED_REWARDS = 0.25
+
+REWARD_UNITS = ("円", "P", "マイル", "口")
+
+
+def sample_inputs(cards: int, seed: int = 0) -> Dict[str, List[Tuple]]:
+    """全カード分の交換グラフの入力（ExchangeValueStore.load_inputsと同じ形）"""
+    rng = random.Random(seed)
+    programs = [(point_id, f"ポイント{point_id}") for point_id in range(1, PROGRAMS + 1)]
+    rewards = []
+    for reward_id in range(1, REWARDS + 1):
+        if rng.random() < CHAINED_REWARDS:
+            rewards.append((reward_id, "ポイント", f"ポイント{rng.randint(1, PROGRAMS)}", "P"))
+        else:
+            rewards.append((reward_id, "ギフト券", f"交換先{reward_id}", rng.choice(REWARD_UNITS)))
+    exchanges = []
+    for card_id in range(1, cards + 1):
+        point_id = card_id % PROGRAMS + 1
+        for reward_id in rng.sample(range(1, REWARDS + 1), EXCHANGES_PER_CARD):
+            before_value = rng.choice([1, 100, 200, 500, 1000])
+            exchanges.append((card_id, point_id, reward_id, before_value, int(before_value * rng.uniform(0.3, 1.2)) or 1))
+    return {"programs": programs, "rewards": rewards, "exchanges": exchanges}
+
+
+def run_exchange_benchmark(cards: int = 2000, repeat: int = 5) -> Dict[str, Any]:
+    """全カード分の交換グラフの構築・最良経路の計算・カードごとの集計時間"""
+    inputs = sample_inputs(cards)
+    graph = ExchangeGraph(**inputs)
+    values = graph.solve()
+    return {
+        "cards": cards,
+        "nodes": len(graph),
+        "edges": graph.edge_count,
+        "build_ms": measure_time(lambda: ExchangeGraph(**inputs), repeat),
+        "solve_ms": measure_time(graph.solve, repeat),
+        "card_values_ms": measure_time(lambda: graph.card_values(values), repeat),
+        "max_path_length": max((len(path) for _, path in values.values()), default=0),
+    }
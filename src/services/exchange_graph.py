@@ -0,0 +1,181 @@
+import time
+import unicodedata
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from models.database import DatabaseHandler
+from models.exchange_values import ExchangeValueStore, graph_hash
+
+# 交換先の単位ごとの1単位あたりの円換算額（単位が不明な交換先は、さらに交換できる場合だけ価値を持つ）
+UNIT_VALUES = {
+    "円": 1.0,
+    "P": 1.0,
+    "pt": 1.0,
+    "ポイント": 1.0,
+    "マイル": 2.0,
+    "mile": 2.0,
+}
+
+# 交換先名・カテゴリに含まれる語による円換算額（単位より優先。マイルは単位が「口」などでも2円とみなす）
+NAME_VALUES = (
+    ("マイル", 2.0),
+)
+
+# 経路の最大の辺の数（ポイント→交換先→同名のポイント→… の「交換先→ポイント」も1辺と数える）
+MAX_HOPS = 6
+
+Node = Tuple[str, int]
+
+
+def name_key(name: str) -> str:
+    """交換先名とポイント名を対応付けるキー（「Pontaポイント」と「Ponta」を同じとみなす）"""
+    key = "".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+    for suffix in ("ポイント", "point", "pt"):
+        if key.endswith(suffix) and len(key) > len(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def reward_value(category: str, reward_name: str, unit: str) -> Optional[float]:
+    """交換先1単位あたりの円換算額（評価できなければNone）"""
+    text = unicodedata.normalize("NFKC", f"{category} {reward_name}")
+    for keyword, value in NAME_VALUES:
+        if keyword in text:
+            return value
+    return UNIT_VALUES.get(unicodedata.normalize("NFKC", unit or "").strip())
+
+
+class ExchangeGraph:
+    """ポイント（("point", ID)）と交換先（("reward", ID)）を頂点、交換レートを辺の重みにしたグラフ
+
+    ポイントから交換先への辺は、そのポイントのカードの中で最も良いレートにする。
+    交換先の名前がポイント名と一致する場合は、交換先からそのポイントへレート1の辺を張る。
+    各頂点の価値は、辺の重みの積 × 終点の交換先の円換算額の最大値（最長でMAX_HOPS辺、同じ頂点は通らない）。
+    """
+
+    def __init__(self, programs: List[tuple], rewards: List[tuple], exchanges: List[tuple]):
+        self.names: Dict[Node, str] = {("point", point_id): point_name for point_id, point_name in programs}
+        self.terminal: Dict[Node, float] = {}
+        self.edges: Dict[Node, Dict[Node, float]] = defaultdict(dict)
+        self.card_edges: Dict[int, Dict[Node, float]] = defaultdict(dict)
+
+        programs_by_key = {name_key(point_name): ("point", point_id) for point_id, point_name in programs}
+        for reward_id, category, reward_name, unit in rewards:
+            node = ("reward", reward_id)
+            self.names[node] = reward_name
+            value = reward_value(category, reward_name, unit)
+            if value is not None:
+                self.terminal[node] = value
+            program = programs_by_key.get(name_key(reward_name))
+            if program is not None:
+                self.edges[node][program] = 1.0
+
+        for card_id, point_id, reward_id, before_value, after_value in exchanges:
+            rate = after_value / before_value
+            node = ("reward", reward_id)
+            if rate > self.card_edges[card_id].get(node, 0.0):
+                self.card_edges[card_id][node] = rate
+            if point_id is not None and rate > self.edges[("point", point_id)].get(node, 0.0):
+                self.edges[("point", point_id)][node] = rate
+        self.card_programs = {card_id: point_id for card_id, point_id, _, _, _ in exchanges}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(targets) for targets in self.edges.values()) + sum(len(targets) for targets in self.card_edges.values())
+
+    def solve(self) -> Dict[Node, Tuple[float, Tuple[Node, ...]]]:
+        """頂点ごとの(最良の円換算額, 経路)を、辺の数を1つずつ増やしながら求める
+
+        重みの対数を取ると最長経路問題になるため、辺の数を上限にしたBellman-Ford法で緩和する。
+        経路は頂点自身を含まず、終点の交換先で終わる。
+        """
+        values = {node: (value, ()) for node, value in self.terminal.items()}
+        for _ in range(MAX_HOPS):
+            updated = dict(values)
+            changed = False
+            for node, targets in self.edges.items():
+                best = updated.get(node, (0.0, ()))
+                for target, rate in targets.items():
+                    if target not in values or node in values[target][1]:
+                        continue
+                    value, path = values[target]
+                    if rate * value > best[0]:
+                        best = (rate * value, (target,) + path)
+                        changed = True
+                if best[0] > 0:
+                    updated[node] = best
+            values = updated
+            if not changed:
+                break
+        return values
+
+    def card_values(self, values: Dict[Node, Tuple[float, Tuple[Node, ...]]]) -> Dict[int, Tuple[float, Tuple[Node, ...]]]:
+        """カードごとの(最良の円換算額, 経路)（1辺目はカード自身の交換レート、2辺目以降はポイントの最良の経路）"""
+        cards = {}
+        for card_id, targets in self.card_edges.items():
+            program = ("point", self.card_programs.get(card_id))
+            best = (0.0, ())
+            for target, rate in targets.items():
+                if target not in values or program in values[target][1]:
+                    continue
+                value, path = values[target]
+                if rate * value > best[0]:
+                    best = (rate * value, (target,) + path)
+            if best[0] > 0:
+                cards[card_id] = best
+        return cards
+
+    def describe_path(self, path: Tuple[Node, ...]) -> str:
+        """経路の表示（交換先とそれと同名のポイントは1つにまとめる）"""
+        names: List[str] = []
+        for node in path:
+            name = self.names.get(node, f"{node[0]}:{node[1]}")
+            if not names or names[-1] != name:
+                names.append(name)
+        return " → ".join(names)
+
+
+class ExchangeValueEngine:
+    """交換グラフから、ポイント・カードごとの最良の円換算額を計算してpoint_exchange_values・card_exchange_valuesに保存
+
+    入力（ポイント交換の行など）のハッシュが保存済みの値と同じなら計算し直さない。
+    """
+
+    def __init__(self, db_handler: DatabaseHandler):
+        self.store = ExchangeValueStore(db_handler)
+
+    def refresh(self, force: bool = False) -> Dict[str, Any]:
+        inputs = self.store.load_inputs()
+        input_hash = graph_hash(inputs)
+        result: Dict[str, Any] = {"changed": False, "programs": 0, "cards": 0}
+        if not force and self.store.stored_hashes() == {input_hash}:
+            return result
+
+        started_at = time.perf_counter()
+        graph = ExchangeGraph(**inputs)
+        values = graph.solve()
+        cards = graph.card_values(values)
+        programs = [
+            (node[1], value, path[-1][1], graph.describe_path(path))
+            for node, (value, path) in sorted(values.items()) if node[0] == "point"
+        ]
+        card_rows = [
+            (card_id, value, path[-1][1], graph.describe_path(path))
+            for card_id, (value, path) in sorted(cards.items())
+        ]
+        result.update({
+            "changed": True,
+            "programs": len(programs),
+            "cards": len(card_rows),
+            "solve_ms": (time.perf_counter() - started_at) * 1000,
+        })
+        self.store.save(input_hash, programs, card_rows)
+        return result
+
+
+def describe(result: Dict[str, Any]) -> str:
+    if not result["changed"]:
+        return "交換価値: ポイント交換に変更なし（再計算なし）"
+    return f"交換価値更新: ポイント{result['programs']}件 / カード{result['cards']}枚 ({result['solve_ms']:.1f}ms)"
@@ -0,0 +1,145 @@
+import re
+from collections import defaultdict
+from typing import List, Dict, Iterable, Optional, Tuple, Union
+from models.card_facets import CardFacetStore, FacetKey, FACETS, ALL_KEY, popcount
+
+# 条件式の字句（括弧・演算子・「属性=値」。値に空白や括弧を含む場合は"..."で囲む）
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|(\w+)\s*=\s*(?:"([^"]*)"|([^\s()"]+))|([^\s()]+))')
+OPERATORS = {"AND", "OR", "NOT"}
+
+Node = Union[FacetKey, Tuple[str, ...]]
+
+
+class FilterSyntaxError(ValueError):
+    """絞り込みの条件式が読み取れない"""
+
+
+def tokenize(expression: str) -> List[Union[str, FacetKey]]:
+    tokens: List[Union[str, FacetKey]] = []
+    for match in TOKEN_PATTERN.finditer(expression.strip()):
+        opening, closing, facet, quoted, value, word = match.groups()
+        if opening or closing:
+            tokens.append(opening or closing)
+        elif facet:
+            if facet not in FACETS:
+                raise FilterSyntaxError(f"不明な属性です: {facet}（{', '.join(FACETS)}）")
+            tokens.append((facet, quoted if quoted is not None else value))
+        elif word.upper() in OPERATORS:
+            tokens.append(word.upper())
+        else:
+            raise FilterSyntaxError(f"条件式を読み取れません: {word}（属性=値 と AND / OR / NOT で指定します）")
+    return tokens
+
+
+def parse_filter(expression: str) -> Node:
+    """条件式を構文木にする（優先順位は NOT > AND > OR、空の条件式は全カード）
+
+    例: brand=visa AND (issuer="楽天カード株式会社" OR NOT feature=etc_card)
+    """
+    tokens = tokenize(expression)
+    if not tokens:
+        return ALL_KEY
+    position = 0
+
+    def peek() -> Optional[Union[str, FacetKey]]:
+        return tokens[position] if position < len(tokens) else None
+
+    def take() -> Union[str, FacetKey]:
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise FilterSyntaxError("条件式が途中で終わっています")
+        position += 1
+        return token
+
+    def parse_or() -> Node:
+        node = parse_and()
+        while peek() == "OR":
+            take()
+            node = ("OR", node, parse_and())
+        return node
+
+    def parse_and() -> Node:
+        node = parse_not()
+        while peek() == "AND":
+            take()
+            node = ("AND", node, parse_not())
+        return node
+
+    def parse_not() -> Node:
+        if peek() == "NOT":
+            take()
+            return ("NOT", parse_not())
+        token = take()
+        if token == "(":
+            node = parse_or()
+            if take() != ")":
+                raise FilterSyntaxError("括弧が閉じていません")
+            return node
+        if isinstance(token, tuple):
+            return token
+        raise FilterSyntaxError(f"属性=値 が必要な位置に {token} があります")
+
+    node = parse_or()
+    if peek() is not None:
+        raise FilterSyntaxError(f"余分な字句があります: {peek()}")
+    return node
+
+
+class FacetIndex:
+    """(属性, 値)ごとのビットマップをメモリに持ち、条件式の評価と属性ごとの件数を求める
+
+    ビットマップはカードID番目のビットを立てたPythonの整数で、AND / OR / NOTは整数のビット演算で行う。
+    NOTは掲載中の全カード（ALL_KEY）を基準にする。
+    """
+
+    def __init__(self, bitmaps: Dict[FacetKey, int]):
+        self.bitmaps = bitmaps
+        self.universe = bitmaps.get(ALL_KEY, 0)
+        self._parsed: Dict[str, Node] = {}
+
+    @classmethod
+    def load(cls, store: CardFacetStore) -> "FacetIndex":
+        return cls(store.load())
+
+    def __len__(self) -> int:
+        return popcount(self.universe)
+
+    def evaluate(self, node: Node) -> int:
+        operator = node[0]
+        if operator == "AND":
+            return self.evaluate(node[1]) & self.evaluate(node[2])
+        if operator == "OR":
+            return self.evaluate(node[1]) | self.evaluate(node[2])
+        if operator == "NOT":
+            return self.universe & ~self.evaluate(node[1])
+        return self.bitmaps.get(node, 0)
+
+    def filter(self, expression: str) -> int:
+        """条件式に合うカードのビットマップ（構文木は条件式ごとに使い回す）"""
+        node = self._parsed.get(expression)
+        if node is None:
+            node = self._parsed[expression] = parse_filter(expression)
+        return self.evaluate(node) & self.universe
+
+    def counts(self, bitmap: int, facets: Iterable[str] = FACETS) -> Dict[str, List[Tuple[str, int]]]:
+        """絞り込んだカードの、属性の値ごとの件数（件数の多い順、0件の値は除く）"""
+        facets = set(facets)
+        counts: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        for (facet, value), facet_bitmap in self.bitmaps.items():
+            if facet not in facets:
+                continue
+            count = popcount(bitmap & facet_bitmap)
+            if count:
+                counts[facet].append((value, count))
+        return {facet: sorted(values, key=lambda item: (-item[1], item[0])) for facet, values in counts.items()}
+
+    @staticmethod
+    def card_ids(bitmap: int, limit: Optional[int] = None) -> List[int]:
+        """ビットマップのカードID（小さい順、limit件まで）"""
+        card_ids = []
+        while bitmap and (limit is None or len(card_ids) < limit):
+            lowest = bitmap & -bitmap
+            card_ids.append(lowest.bit_length() - 1)
+            bitmap ^= lowest
+        return card_ids
@@ -0,0 +1,330 @@
+import os
+import re
+import time
+import json
+import random
+import threading
+from collections import Counter
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+# 合成するカードIDの接頭辞（本物の価格.comのカードと同じDBに入っても区別できるようにする）
+CARD_ID_PREFIX = "FX"
+
+RANKING_PATH = "/card/ranking/"
+DETAIL_PATH = "/card/item.asp"
+
+# 1x1の透過PNG（カード画像・遅いリソースの本文）
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000b49444154789c6360000200000500017a5eab3f0000000049454e44ae426082"
+)
+
+GRADES = ("一般", "ゴールド", "プラチナ", "ブラック")
+BRANDS = ("Visa", "Mastercard", "JCB", "AMEX（アメックス）", "Diners", "銀聯（UnionPay）")
+ISSUERS = ("フィクスチャカード株式会社", "テスト信販株式会社", "サンプル銀行", "ダミーファイナンス株式会社")
+POINTS = ("Pontaポイント", "楽天ポイント", "dポイント", "Vポイント", "ポイント126", "WAONポイント")
+SHOPS = (
+    ("ECサイト", ("Amazon", "楽天市場", "Yahoo!ショッピング", "ZOZOTOWN", "LOHACO", "au PAY マーケット")),
+    ("コンビニ", ("セブン-イレブン", "ローソン", "ファミリーマート", "ミニストップ")),
+    ("飲食店", ("マクドナルド", "スターバックス", "ドトール", "すき家", "ガスト")),
+    ("ガソリンスタンド", ("ENEOS", "出光", "コスモ石油")),
+    ("旅行", ("じゃらん", "楽天トラベル", "一休.com")),
+)
+# 交換先（カテゴリ, 交換先名, 単位）。単位はカード詳細の交換レートの正規表現に合う文字にする
+REWARDS = (
+    ("マイル", "ANAマイル", "口"),
+    ("マイル", "JALマイル", "口"),
+    ("電子マネー", "楽天Edy", "円"),
+    ("電子マネー", "nanaco", "円"),
+    ("ポイント", "Pontaポイント", "pt"),
+    ("ポイント", "dポイント", "pt"),
+    ("商品券", "ギフトカード", "円"),
+)
+SERVICES = ("空港ラウンジ", "コンシェルジュ", "ショッピング保険", "ロードサービス", "優待レストラン")
+INSURANCES = (
+    ("海外旅行", ("傷害死亡・後遺障害", "傷害治療費用", "疾病治療費用", "携行品損害")),
+    ("国内旅行", ("傷害死亡・後遺障害", "入院日額")),
+)
+
+
+class FaultConfig(NamedTuple):
+    """詳細ページ・ランキングページに加える遅延とエラー"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    slow_resource_rate: float = 0.0
+    slow_resource_ms: float = 3000.0
+
+
+def card_id(number: int) -> str:
+    return f"{CARD_ID_PREFIX}{number:05d}"
+
+
+def _rows(cells: List[Tuple[str, str]]) -> str:
+    return "".join(f"<tr><th>{escape(th)}</th><td>{td}</td></tr>" for th, td in cells)
+
+
+def render_page(title: str, body: str) -> str:
+    return f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>{escape(title)}</title></head><body>{body}</body></html>'
+
+
+def render_ranking(numbers: List[int], page: int, has_next: bool) -> str:
+    """ランキング1ページ分（p-planSearchListのカード一覧と、次のページがあれば.nextのリンク）"""
+    items = "".join(
+        f'<li class="p-planSearchList_item"><p class="p-planSearchList_name">'
+        f'<a class="p-planSearchList_name_link" href="{DETAIL_PATH}?id={card_id(number)}">フィクスチャカード {number}</a></p></li>'
+        for number in numbers
+    )
+    pager = f'<a class="next" href="{RANKING_PATH}?page={page + 1}">次へ</a>' if has_next else ""
+    return render_page(
+        f"クレジットカード 人気ランキング {page}ページ目",
+        f'<ul class="p-planSearchList">{items}</ul><div class="pager">{pager}</div>',
+    )
+
+
+def render_detail(number: int, seed: int, slow_resource_ms: Optional[float] = None) -> str:
+    """カード詳細ページ（CardScraperが読むdef-tbl1・def-tbl2・p-rateTblの構造をカードごとに乱数で埋める）"""
+    rng = random.Random(f"{seed}:{number}")
+    grade = rng.choice(GRADES)
+    brands = rng.sample(BRANDS, rng.randint(1, 3))
+    annual_fee = rng.choice((0, 0, 550, 1375, 11000, 22000))
+    notes: List[str] = []
+
+    def note(text: str) -> str:
+        notes.append(text)
+        return f"※{len(notes)}"
+
+    summary = _rows([("還元率", f"{rng.choice((0.5, 1.0, 1.2, 1.5))}%"), ("年会費", f"{annual_fee:,}円")])
+    base = _rows([
+        ("カード名", f"フィクスチャ{grade}カード {number}"),
+        ("公式サイト", f'<a href="https://example.com/cards/{number}">公式サイト</a>'),
+        ("発行会社", rng.choice(ISSUERS)),
+        ("提携会社", "-"),
+        ("国際ブランド", "、".join(brands)),
+        ("申込資格", f"{rng.choice((18, 20, 25))}歳以上で安定した収入のある方"),
+        ("申込方法", "インターネット"),
+        ("審査期間", f"最短{rng.randint(1, 7)}営業日"),
+        ("年会費", f"{annual_fee:,}円（税込）" if annual_fee else "永年無料"),
+        ("ショッピング枠", f"{rng.choice((10, 50, 100, 300))}万円"),
+        ("キャッシング枠", f"{rng.choice((0, 10, 50))}万円"),
+        ("リボ金利", "15.0%"),
+        ("キャッシング金利", "18.0%"),
+        ("支払方法", "1回、2回、ボーナス一括、リボ"),
+        ("締め日", f"毎月{rng.choice((5, 10, 15, 20))}日"),
+        ("備考", f"合成データ（seed={seed}）"),
+    ])
+    additional = _rows([
+        ("ETCカード", "発行可"),
+        ("ETCカード年会費", rng.choice(("無料", "550円"))),
+        ("家族カード", rng.choice(("あり", "なし"))),
+        ("電子マネー", rng.choice(("iD", "QUICPay", "楽天Edy"))),
+        ("電子マネーチャージ", rng.choice(("可", "不可"))),
+        ("電子マネーのポイント付与", rng.choice(("あり", "なし"))),
+        ("スマホ決済", "Apple Pay、Google Pay"),
+        ("コード決済", rng.choice(("楽天ペイ", "d払い", "-"))),
+    ])
+    services = _rows([(name, "あり") for name in rng.sample(SERVICES, rng.randint(1, len(SERVICES)))])
+
+    point_name = rng.choice(POINTS)
+    point_rows = [("ポイント名", point_name), ("還元率", "1.0%"), ("有効期限", f"{rng.choice((12, 24, 36))}ヶ月")]
+    point_rows += [(f"項目{index}", "-") for index in range(3, 11)]
+    point_rows.append(("年間ボーナス", rng.choice(("なし", "年間100万円利用で10,000ポイント"))))
+    points = _rows(point_rows)
+
+    insurance_rows = []
+    for category, coverage_types in INSURANCES:
+        for index, coverage_type in enumerate(coverage_types):
+            category_cell = f'<th class="bd-cell2" rowspan="{len(coverage_types)}">{category}</th>' if index == 0 else ""
+            amount = rng.choice(("-", "最高1,000万円", "最高3,000万円", "200万円"))
+            insurance_rows.append(f"<tr>{category_cell}<th>{coverage_type}</th><td>{amount}</td></tr>")
+    insurance_rows.append("<tr><th>備考</th><td>自動付帯</td></tr>")
+
+    rewards = rng.sample(REWARDS, rng.randint(2, len(REWARDS)))
+    reward_categories: Dict[str, List[Tuple[str, str, str]]] = {}
+    for reward in rewards:
+        reward_categories.setdefault(reward[0], []).append(reward)
+    category_headers = "".join(
+        f'<th colspan="{len(members)}">{category}</th>' for category, members in reward_categories.items()
+    )
+    ordered = [reward for members in reward_categories.values() for reward in members]
+    reward_headers = "".join(
+        f"<th>{name}{note('交換は1,000ポイント単位') if rng.random() < 0.2 else ''}</th>" for _, name, _ in ordered
+    )
+    rate_headers = "".join(f"<th>1,000pt→{rng.choice((300, 500, 1000)):,}{unit}</th>" for _, _, unit in ordered)
+
+    shop_rows = []
+    for category, shops in SHOPS:
+        shop_rows.append(f'<tr><th class="p-rateTbl_label p-rateTbl_labelParent fixCol">{category}</th></tr>')
+        for shop in rng.sample(shops, rng.randint(1, len(shops))):
+            title = shop + (note("一部対象外の商品があります") if rng.random() < 0.1 else "")
+            rate = rng.choice((1, 2, 3, 5))
+            shop_rows.append(
+                f'<tr><th class="p-rateTbl_label fixCol" title="{escape(title)}">{escape(title)}</th>'
+                f"<td>100円につき{rate}ポイント</td></tr>"
+            )
+    rate_table = (
+        '<table class="p-rateTbl p-rateTbl-type2 p-rateTbl01 s-highlightTbl">'
+        f'<thead><tr><th class="fixCol" rowspan="3">交換先</th>{category_headers}</tr>'
+        f"<tr>{reward_headers}</tr><tr>{rate_headers}</tr></thead>"
+        f'<tbody>{"".join(shop_rows)}</tbody></table>'
+    )
+    rate_notes = "".join(f'<p><span class="p-rateNotes_label">※{index}</span>{text}</p>' for index, text in enumerate(notes, 1))
+
+    slow = f'<img src="/static/slow.png?ms={slow_resource_ms:.0f}" alt="">' if slow_resource_ms else ""
+    body = (
+        f'<ul class="menu-list3"><li class="icon2">{grade}カードランキング</li></ul>'
+        f'<div class="p-cardImg"><img src="/static/card/{card_id(number)}.png" alt=""></div>{slow}'
+        f'<table class="def-tbl1">{summary}</table>'
+        f'<table class="def-tbl1">{base}</table>'
+        f'<table class="def-tbl2">{points}</table>'
+        f"{rate_table}<div class=\"p-rateNotes\">{rate_notes}</div>"
+        f'<table class="def-tbl1">{additional}</table>'
+        f'<table class="def-tbl1">{services}</table>'
+        f'<table class="def-tbl2">{"".join(insurance_rows)}</table>'
+    )
+    return render_page(f"フィクスチャ{grade}カード {number} の詳細", body)
+
+
+class FixtureSite:
+    """価格.comの代わりに、ランキング・カード詳細ページを返すローカルのサイト
+
+    recorded_dirに保存したページ（ranking-N.html・item-ID.html）があればそれを返し、
+    なければカードIDごとに決まった内容のページを合成する。保存したページの価格.comへの絶対URLは
+    このサーバーへの相対URLに書き換える。
+    """
+
+    def __init__(
+        self,
+        cards: int,
+        per_page: int = 20,
+        seed: int = 0,
+        faults: FaultConfig = FaultConfig(),
+        recorded_dir: Optional[str] = None,
+    ):
+        self.cards = cards
+        self.per_page = per_page
+        self.seed = seed
+        self.faults = faults
+        self.recorded_dir = recorded_dir
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def delay(self) -> None:
+        latency = self.faults.latency_ms
+        if self.faults.jitter_ms:
+            with self._lock:
+                latency += self._rng.uniform(0, self.faults.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def recorded(self, name: str) -> Optional[str]:
+        if not self.recorded_dir:
+            return None
+        path = os.path.join(self.recorded_dir, name)
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return re.sub(r"https?://kakaku\.com/", "/", f.read())
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.cards // self.per_page))
+
+    def ranking(self, page: int) -> str:
+        recorded = self.recorded(f"ranking-{page}.html")
+        if recorded is not None:
+            return recorded
+        start = (page - 1) * self.per_page + 1
+        numbers = list(range(start, min(start + self.per_page, self.cards + 1)))
+        return render_ranking(numbers, page, page < self.pages)
+
+    def detail(self, kakaku_card_id: str) -> Optional[str]:
+        recorded = self.recorded(f"item-{kakaku_card_id}.html")
+        if recorded is not None:
+            return recorded
+        if not kakaku_card_id.startswith(CARD_ID_PREFIX) or not kakaku_card_id[len(CARD_ID_PREFIX):].isdigit():
+            return None
+        number = int(kakaku_card_id[len(CARD_ID_PREFIX):])
+        if not 1 <= number <= self.cards:
+            return None
+        slow = self.faults.slow_resource_ms if self.chance(self.faults.slow_resource_rate) else None
+        if slow:
+            self.count("slow_resources")
+        return render_detail(number, self.seed, slow)
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    site: FixtureSite
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/stats":
+            self.respond(200, json.dumps(dict(self.site.stats), ensure_ascii=False), "application/json")
+            return
+        if url.path.startswith("/static/"):
+            if url.path == "/static/slow.png":
+                time.sleep(float(query.get("ms", ["0"])[0]) / 1000)
+            self.respond(200, PIXEL_PNG, "image/png")
+            return
+
+        if url.path not in (RANKING_PATH, DETAIL_PATH):
+            self.respond(404, render_page("Not Found", "<h1>Not Found</h1>"))
+            return
+        kind = "ranking" if url.path == RANKING_PATH else "detail"
+        self.site.delay()
+        # スロットリング（CardScraperはタイトルで判定する）とサーバーエラーを一定の割合で返す
+        if self.site.chance(self.site.faults.throttle_rate):
+            self.site.count(f"{kind}_429")
+            self.respond(429, render_page("429 Too Many Requests", "<h1>Too Many Requests</h1>"))
+            return
+        if self.site.chance(self.site.faults.error_rate):
+            self.site.count(f"{kind}_500")
+            self.respond(500, render_page("500 Internal Server Error", "<h1>Internal Server Error</h1>"))
+            return
+
+        if kind == "ranking":
+            page = query.get("page", ["1"])[0]
+            html = self.site.ranking(int(page)) if page.isdigit() and int(page) > 0 else None
+        else:
+            html = self.site.detail(query.get("id", [""])[0])
+        if html is None:
+            self.site.count(f"{kind}_404")
+            self.respond(404, render_page("Not Found", "<h1>Not Found</h1>"))
+            return
+        self.site.count(kind)
+        self.respond(200, html)
+
+    def respond(self, status: int, body, content_type: str = "text/html; charset=utf-8") -> None:
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # リクエストごとのログは負荷試験の邪魔になるため出さない（集計は/statsで確認する）
+        pass
+
+
+def create_server(host: str, port: int, site: FixtureSite) -> ThreadingHTTPServer:
+    handler = type("BoundFixtureRequestHandler", (FixtureRequestHandler,), {"site": site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
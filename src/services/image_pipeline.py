@@ -0,0 +1,227 @@
+import io
+import os
+import hashlib
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from minio import Minio
+from minio.error import MinioException
+from PIL import Image
+from models.card_images import CardImageStore
+
+
+def make_thumbnail(content: bytes, size: int) -> bytes:
+    """サムネイル（PNG）を生成（プロセスプールで実行するためモジュール関数にする）"""
+    with Image.open(io.BytesIO(content)) as image:
+        image.thumbnail((size, size))
+        output = io.BytesIO()
+        image.save(output, format="PNG", optimize=True)
+        return output.getvalue()
+
+
+def create_minio_client() -> Minio:
+    """環境変数からMinIOクライアントを作成"""
+    endpoint = urlparse(os.getenv("MINIO_ENDPOINT", "http://minio:9000"))
+    return Minio(
+        endpoint.netloc,
+        access_key=os.getenv("MINIO_ROOT_USER") or "minioadmin",
+        secret_key=os.getenv("MINIO_ROOT_PASSWORD") or "minioadmin",
+        secure=endpoint.scheme == "https",
+    )
+
+
+class ImagePipeline:
+    """カード画像をダウンロードしてMinIOに保存する
+
+    1. 接続プール付きのHTTPセッションで並列にダウンロード（ETag等で未変更ならスキップ）
+    2. 内容のハッシュで重複を除き、アップロード済みの画像はスキップ
+    3. サムネイルをプロセスプールで生成
+    4. 画像とサムネイルを並列にアップロード（大きい画像はマルチパート）
+    """
+
+    def __init__(
+        self,
+        store: CardImageStore,
+        client: Optional[Minio] = None,
+        bucket: Optional[str] = None,
+        workers: int = 8,
+        thumbnail_size: int = 320,
+        part_size: int = 10 * 1024 * 1024,
+    ):
+        self.store = store
+        self.client = client or create_minio_client()
+        self.bucket = bucket or os.getenv("MINIO_BUCKET_NAME", "card-images")
+        self.workers = workers
+        self.thumbnail_size = thumbnail_size
+        self.part_size = part_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._targets: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+
+    def collect(self, card_id: int, image_urls: List[str]) -> None:
+        """スクレイピング中に見つけた画像URLを登録（スレッドセーフ）"""
+        with self._lock:
+            self._targets.extend((card_id, url) for url in image_urls if url)
+
+    def run(self, targets: Optional[List[Tuple[int, str]]] = None) -> Dict[str, int]:
+        """登録済み（またはtargetsで指定した）画像を処理"""
+        if targets is None:
+            with self._lock:
+                targets, self._targets = self._targets, []
+        targets = list(dict.fromkeys(targets))
+        counts = {"targets": len(targets), "unchanged": 0, "failed": 0, "deduplicated": 0, "uploaded": 0}
+        if not targets:
+            return counts
+
+        known = self.store.get_known(targets)
+
+        # 1. 並列ダウンロード
+        with ThreadPoolExecutor(self.workers) as pool:
+            downloads = list(pool.map(lambda target: self._download(target, known.get(target)), targets))
+        changed = []
+        for download in downloads:
+            if download is None:
+                counts["failed"] += 1
+            elif download["content"] is None:
+                counts["unchanged"] += 1
+            else:
+                changed.append(download)
+
+        # 2. 内容のハッシュで重複を除く
+        uploaded = self.store.get_uploaded_hashes(download["content_hash"] for download in changed)
+        new_contents: Dict[str, Dict[str, Any]] = {}
+        for download in changed:
+            content_hash = download["content_hash"]
+            if content_hash in uploaded:
+                download["object_key"], download["thumbnail_key"] = uploaded[content_hash]
+                counts["deduplicated"] += 1
+            elif content_hash in new_contents:
+                counts["deduplicated"] += 1
+            else:
+                new_contents[content_hash] = download
+
+        # 3. サムネイル生成（CPU負荷が高いためプロセスプールで実行）
+        contents = list(new_contents.values())
+        thumbnails: List[Optional[bytes]] = []
+        if contents:
+            with ProcessPoolExecutor() as pool:
+                futures = [pool.submit(make_thumbnail, item["content"], self.thumbnail_size) for item in contents]
+                for future in futures:
+                    try:
+                        thumbnails.append(future.result())
+                    except Exception as e:
+                        print(f"サムネイル生成エラー: {e}")
+                        thumbnails.append(None)
+
+        # 4. 並列アップロード（MinIOに接続できない場合は、アップロードする画像をすべて失敗として数える）
+        results: List[Optional[Tuple[str, Optional[str]]]] = [None] * len(contents)
+        if contents:
+            try:
+                self._ensure_bucket()
+            except (MinioException, urllib3.exceptions.HTTPError) as e:
+                print(f"MinIO接続エラー: {self.bucket} {e}")
+            else:
+                with ThreadPoolExecutor(self.workers) as pool:
+                    results = list(pool.map(self._upload, contents, thumbnails))
+        keys_by_hash = {}
+        for item, keys in zip(contents, results):
+            if keys is None:
+                counts["failed"] += 1
+                continue
+            keys_by_hash[item["content_hash"]] = keys
+            counts["uploaded"] += 1
+        for download in changed:
+            if download["content_hash"] in keys_by_hash:
+                download["object_key"], download["thumbnail_key"] = keys_by_hash[download["content_hash"]]
+
+        self.store.upsert_many([
+            download for download in changed if download.get("object_key")
+        ] + [
+            download for download in downloads if download is not None and download["content"] is None
+        ])
+        print(f"カード画像: {counts}")
+        return counts
+
+    def _download(self, target: Tuple[int, str], known: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        card_id, url = target
+        headers = {}
+        if known and known.get("object_key"):
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+        try:
+            response = self.session.get(url, headers=headers, timeout=30)
+            result = {
+                "card_id": card_id,
+                "source_url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content": None,
+            }
+            if response.status_code == 304:
+                for key in ("content_hash", "object_key", "thumbnail_key", "content_type", "size_bytes"):
+                    result[key] = known[key]
+                result["etag"] = result["etag"] or known.get("etag")
+                result["last_modified"] = result["last_modified"] or known.get("last_modified")
+                return result
+            response.raise_for_status()
+
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            result.update({
+                "content_hash": content_hash,
+                "content_type": response.headers.get("Content-Type", "application/octet-stream").split(";")[0],
+                "size_bytes": len(response.content),
+                "object_key": None,
+                "thumbnail_key": None,
+            })
+            if known and known.get("content_hash") == content_hash and known.get("object_key"):
+                # ETag非対応のサーバーでも内容が同じならアップロードしない
+                result["object_key"] = known["object_key"]
+                result["thumbnail_key"] = known["thumbnail_key"]
+                return result
+            result["content"] = response.content
+            return result
+        except requests.RequestException as e:
+            print(f"カード画像ダウンロードエラー: {url} {e}")
+            return None
+
+    def _ensure_bucket(self) -> None:
+        if not self.client.bucket_exists(self.bucket):
+            self.client.make_bucket(self.bucket)
+
+    def _upload(self, item: Dict[str, Any], thumbnail: Optional[bytes]) -> Optional[Tuple[str, Optional[str]]]:
+        content_hash = item["content_hash"]
+        extension = mimetypes.guess_extension(item["content_type"]) or ""
+        object_key = f"cards/{content_hash[:2]}/{content_hash}{extension}"
+        thumbnail_key = f"thumbnails/{content_hash[:2]}/{content_hash}.png" if thumbnail else None
+        try:
+            # part_sizeを超える画像はMinIOクライアントがマルチパートでアップロードする
+            self.client.put_object(
+                self.bucket,
+                object_key,
+                io.BytesIO(item["content"]),
+                length=len(item["content"]),
+                content_type=item["content_type"],
+                part_size=self.part_size,
+            )
+            if thumbnail:
+                self.client.put_object(
+                    self.bucket,
+                    thumbnail_key,
+                    io.BytesIO(thumbnail),
+                    length=len(thumbnail),
+                    content_type="image/png",
+                )
+            return object_key, thumbnail_key
+        except Exception as e:
+            print(f"カード画像アップロードエラー: {object_key} {e}")
+            return None
@@ -0,0 +1,294 @@
+import os
+import re
+import sys
+import json
+import time
+import inspect
+import functools
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple
+
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_SCOPES = ("stage", "card")
+
+# cProfileの呼び出しグラフを積み上げ形式に変換するとき、これより短い経路は省く（秒）
+MIN_COLLAPSED_SECONDS = 0.0001
+
+_profiler: Optional["Profiler"] = None
+
+
+def _frame_label(filename: str, line: int, name: str) -> str:
+    if filename == "~":
+        # 組み込み関数
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapse_stats(stats) -> Dict[str, int]:
+    """pstats.Statsを積み上げ形式（flamegraph.pl・speedscope）に変換（値はマイクロ秒）
+
+    呼び出し元ごとの累積時間の比で、関数の自己時間を各呼び出し経路に按分する。
+    """
+    callees: Dict[Tuple, Dict[Tuple, float]] = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees[caller][func] = cumulative
+    folded: Counter = Counter()
+
+    def walk(func: Tuple, path: str, share: float, visited: frozenset) -> None:
+        _, _, own, cumulative, _ = stats.stats[func]
+        fraction = share / cumulative if cumulative else 0.0
+        stack = f"{path};{_frame_label(*func)}" if path else _frame_label(*func)
+        micros = int(own * fraction * 1_000_000)
+        if micros:
+            folded[stack] += micros
+        for callee, callee_cumulative in callees[func].items():
+            part = callee_cumulative * fraction
+            if callee not in visited and part >= MIN_COLLAPSED_SECONDS:
+                walk(callee, stack, part, visited | {callee})
+
+    for func, (_, _, _, cumulative, callers) in stats.stats.items():
+        if not callers:
+            walk(func, "", cumulative, frozenset([func]))
+    return dict(folded)
+
+
+def collapse_frame(frame) -> str:
+    """実行中のフレームから呼び出し元までを積み上げ形式の1行にする"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler(threading.Thread):
+    """登録したスレッドのスタックを一定間隔で記録する（対象のスレッドは止めない）"""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self._targets: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def add(self, thread_id: int) -> Counter:
+        samples: Counter = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+        return samples
+
+    def remove(self, thread_id: int) -> None:
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse_frame(frame)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class Profiler:
+    """ステージ（計測対象のメソッド）または1枚ごとの区間をプロファイルする
+
+    プロファイルは区間ごとに1つだけ取り、入れ子になったステージは外側の区間に含める。
+    stage: ステージ名ごとに合算して終了時に保存 / card: 1枚ごとに保存
+    """
+
+    def __init__(self, mode: str, scope: str, directory: str, interval: float):
+        self.mode = mode
+        self.scope = scope
+        self.directory = directory
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.profiles: Dict[str, Any] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.sampler: Optional[Sampler] = None
+        if mode == "sample":
+            self.sampler = Sampler(interval)
+            self.sampler.start()
+        os.makedirs(directory, exist_ok=True)
+
+    def _begin(self):
+        if getattr(self._local, "active", False):
+            return None
+        if self.mode == "sample":
+            self._local.active = True
+            return self.sampler.add(threading.get_ident())
+
+        import cProfile
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12以降は別スレッドでcProfileが動いていると開始できない
+            return None
+        self._local.active = True
+        return profile
+
+    def _end(self, label: str, collected) -> None:
+        self._local.active = False
+        if self.mode == "sample":
+            self.sampler.remove(threading.get_ident())
+        else:
+            import pstats
+
+            collected.disable()
+            collected = pstats.Stats(collected)
+
+        if self.scope == "card":
+            self._write(label, collected)
+            return
+        with self._lock:
+            merged = self.profiles.get(label)
+            if merged is None:
+                self.profiles[label] = collected
+            elif self.mode == "sample":
+                merged.update(collected)
+            else:
+                merged.add(collected)
+
+    def run_stage(self, stage: str, function: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        started_at = time.perf_counter()
+        collected = self._begin() if self.scope == "stage" else None
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if collected is not None:
+                self._end(stage, collected)
+            elapsed = time.perf_counter() - started_at
+            with self._lock:
+                self.timings[stage].append(elapsed)
+
+    @contextmanager
+    def capture(self, label: str) -> Iterator[None]:
+        collected = self._begin()
+        try:
+            yield
+        finally:
+            if collected is not None:
+                self._end(label, collected)
+
+    def _write(self, label: str, collected) -> None:
+        """{label}.folded（積み上げ形式）と、cProfileの場合は{label}.prof（pstats）を書き出す"""
+        path = os.path.join(self.directory, re.sub(r"[^\w.-]", "_", label))
+        if self.mode == "sample":
+            folded = dict(collected)
+        else:
+            collected.dump_stats(f"{path}.prof")
+            folded = collapse_stats(collected)
+        with open(f"{path}.folded", "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in sorted(folded.items()))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ステージごとの呼び出し回数と所要時間（秒）"""
+        with self._lock:
+            return {
+                stage: {
+                    "calls": len(timings),
+                    "total": sum(timings),
+                    "mean": sum(timings) / len(timings),
+                    "max": max(timings),
+                }
+                for stage, timings in self.timings.items()
+            }
+
+    def finish(self) -> None:
+        if self.sampler:
+            self.sampler.stop()
+        for label, collected in self.profiles.items():
+            self._write(label, collected)
+        summary = self.summary()
+        with open(os.path.join(self.directory, "stages.json"), "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "scope": self.scope, "stages": summary}, f, ensure_ascii=False, indent=2)
+
+        print(f"プロファイルを保存しました: {self.directory}")
+        for stage, values in sorted(summary.items(), key=lambda item: -item[1]["total"])[:10]:
+            print(f"  {stage}: {values['calls']}回 合計{values['total']:.2f}秒 最大{values['max']:.2f}秒")
+
+
+# 計測するクラス（モジュール, クラス名, 追加で計測する非公開メソッド, 除くメソッド）
+HOOKS = (
+    ("services.card_scraper", "CardScraper", ("_open_ranking",), ()),
+    ("models.database", "DatabaseHandler", (), ("batch", "upsert_clause")),
+    ("models.sqlite_database", "SQLiteDatabaseHandler", (), ("batch", "upsert_clause")),
+)
+
+_installed: List[Tuple[type, str, Callable]] = []
+
+
+def profiled(function: Callable, stage: str) -> Callable:
+    """関数をステージとして計測するラッパー"""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profiler = _profiler
+        if profiler is None:
+            return function(*args, **kwargs)
+        return profiler.run_stage(stage, function, args, kwargs)
+
+    return wrapper
+
+
+def instrument(cls: type, include: Tuple[str, ...] = (), exclude: Tuple[str, ...] = ()) -> None:
+    """クラスの公開メソッド（とincludeのメソッド）を計測用のラッパーに置き換える
+
+    ジェネレーターは呼び出し時に処理が走らないため対象外にする。
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr in exclude or (attr.startswith("_") and attr not in include):
+            continue
+        if not inspect.isfunction(value) or inspect.isgeneratorfunction(value):
+            continue
+        _installed.append((cls, attr, value))
+        setattr(cls, attr, profiled(value, f"{cls.__name__}.{attr}"))
+
+
+def configure(mode: str, scope: str = "stage", directory: Optional[str] = None, interval: float = 0.005) -> Profiler:
+    """プロファイルを有効にし、HOOKSのクラスに計測用のラッパーを差し込む
+
+    無効のときは何も差し込まないため、計測による負荷はかからない。
+    """
+    import importlib
+
+    global _profiler
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"不明なプロファイルの種類: {mode}")
+    if scope not in PROFILE_SCOPES:
+        raise ValueError(f"不明なプロファイルの単位: {scope}")
+    directory = directory or os.path.join("profiles", time.strftime("%Y%m%d-%H%M%S"))
+    _profiler = Profiler(mode, scope, directory, interval)
+    if not _installed:
+        for module, name, include, exclude in HOOKS:
+            instrument(getattr(importlib.import_module(module), name), include, exclude)
+    return _profiler
+
+
+def finish() -> None:
+    """プロファイルと各ステージの所要時間を書き出し、差し込んだラッパーを外す"""
+    global _profiler
+    if _profiler:
+        _profiler.finish()
+        _profiler = None
+    while _installed:
+        cls, attr, function = _installed.pop()
+        setattr(cls, attr, function)
+
+
+def capture(label: str):
+    """--profile-scope cardのとき、区間（カード1枚分）のプロファイルを取る"""
+    if _profiler is None or _profiler.scope != "card":
+        return nullcontext()
+    return _profiler.capture(label)
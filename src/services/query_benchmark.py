@@ -0,0 +1,259 @@
+import os
+import time
+import random
+import statistics
+from typing import List, Dict, Any, Tuple, Callable
+import mysql.connector
+from models.database import DatabaseHandler
+from models.migrations import MigrationRunner, execute_sql_file, schema_path
+from models.text_dictionary import TextDictionary, resolved_table
+from models.shop_identity import ShopIdentityIndex
+
+# 本番相当のデータ量（--scaleで倍率を指定）
+SEED_VOLUMES = {
+    "issuers": 150,
+    "points": 200,
+    "shops": 5000,
+    "rewards": 300,
+    "cards": 1500,
+    "point_rewards_per_card": 20,
+    "exchanges_per_card": 8,
+    "insurances_per_card": 4,
+    "services_per_card": 6,
+    "changes_per_card": 30,
+    "queue_items": 3000,
+}
+
+# 件数が--scaleに比例するもの（カードあたりの件数は固定）
+SCALED_VOLUMES = {"issuers", "points", "shops", "rewards", "cards", "queue_items"}
+
+CATEGORIES = ["コンビニ", "スーパー", "ドラッグストア", "飲食", "通販", "旅行", "家電", "ガソリン"]
+
+INSERT_BATCH_SIZE = 1000
+
+# 作り直してよいベンチマーク用データベース名の接尾辞（本番のデータベースを消さないため）
+BENCH_DATABASE_SUFFIX = "_bench"
+
+
+def check_bench_database(name: str) -> None:
+    """作り直すデータベースがベンチマーク用の名前か確認（本番のMYSQL_DATABASEや_bench以外の名前は拒否する）"""
+    if name == os.getenv("MYSQL_DATABASE", "card_db") or not name.endswith(BENCH_DATABASE_SUFFIX):
+        raise ValueError(
+            f"ベンチマーク用のデータベースは作り直すため、名前は{BENCH_DATABASE_SUFFIX}で終わり、"
+            f"MYSQL_DATABASEと異なる必要があります: {name}"
+        )
+
+
+def create_database(name: str) -> None:
+    """ベンチマーク用のデータベースを作り直す"""
+    check_bench_database(name)
+    connection = mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST", "mysql"),
+        user=os.getenv("MYSQL_USER", "root"),
+        password=os.getenv("MYSQL_PASSWORD", "root"),
+        port=int(os.getenv("MYSQL_PORT", "3306")),
+    )
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    finally:
+        connection.close()
+    # 作り直す前のDBで登録した本文のIDを使わないようにする
+    TextDictionary.clear_cache()
+    ShopIdentityIndex.clear_cache()
+
+
+def _insert_many(db_handler: DatabaseHandler, query: str, rows: List[Tuple]) -> None:
+    cursor = db_handler.connection.cursor()
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        cursor.executemany(query, rows[start:start + INSERT_BATCH_SIZE])
+    db_handler.connection.commit()
+
+
+def seed(db_handler: DatabaseHandler, scale: float = 1.0, rng: random.Random = None) -> Dict[str, int]:
+    """本番相当の件数のダミーデータを投入し、投入した件数を返す"""
+    rng = rng or random.Random(0)
+    volumes = {
+        key: max(1, int(value * scale)) if key in SCALED_VOLUMES else value
+        for key, value in SEED_VOLUMES.items()
+    }
+    _insert_many(db_handler, "INSERT INTO m_issuers (issuer_name) VALUES (%s)",
+                 [(f"発行会社{i}",) for i in range(volumes["issuers"])])
+    _insert_many(db_handler, "INSERT INTO m_points (point_name, expiration) VALUES (%s, %s)",
+                 [(f"ポイント{i}", "2年") for i in range(volumes["points"])])
+    _insert_many(db_handler, "INSERT INTO shops (is_online, category, shop_name, created_by) VALUES (%s, %s, %s, %s)",
+                 [(i % 3 == 0, CATEGORIES[i % len(CATEGORIES)], f"ショップ{i}", "kakaku") for i in range(volumes["shops"])])
+    _insert_many(db_handler, "INSERT INTO m_exchangeable_rewards (category, reward_name, unit) VALUES (%s, %s, %s)",
+                 [(CATEGORIES[i % len(CATEGORIES)], f"交換先{i}", "円") for i in range(volumes["rewards"])])
+    _insert_many(
+        db_handler,
+        """
+        INSERT INTO cards (kakaku_card_id, card_name, grade, issuer_id, point_id, eligibility, annual_fee_raw, annual_fee, remarks)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        [
+            (f"{100000 + i}", f"カード{i}", rng.choice(["一般", "ゴールド", "プラチナ"]),
+             rng.randint(1, volumes["issuers"]), rng.randint(1, volumes["points"]),
+             "18歳以上", "永年無料", rng.choice([0, 1100, 11000]), "備考" * 20)
+            for i in range(volumes["cards"])
+        ],
+    )
+
+    card_ids = range(1, volumes["cards"] + 1)
+    text_ids = db_handler.texts.intern(
+        [f"保険{i}" for i in range(2)]
+        + [f"{i * 1000}万円" for i in range(volumes["insurances_per_card"])]
+        + ["サービス内容" * 5]
+    )
+    point_rewards, exchanges, insurances, services, changes = [], [], [], [], []
+    for card_id in card_ids:
+        for shop_id in rng.sample(range(1, volumes["shops"] + 1), min(volumes["shops"], volumes["point_rewards_per_card"])):
+            point_rewards.append((card_id, shop_id, 100, rng.randint(1, 10), True))
+        for reward_id in rng.sample(range(1, volumes["rewards"] + 1), min(volumes["rewards"], volumes["exchanges_per_card"])):
+            exchanges.append((card_id, reward_id, 1, 1))
+        for i in range(volumes["insurances_per_card"]):
+            insurances.append((card_id, text_ids[f"保険{i % 2}"], f"補償{i}", text_ids[f"{i * 1000}万円"]))
+        for i in range(volumes["services_per_card"]):
+            services.append((card_id, f"サービス{i}", text_ids["サービス内容" * 5]))
+        for i in range(volumes["changes_per_card"]):
+            field_name = "__row__" if i % 5 == 0 else rng.choice(["annual_fee", "remarks", "card_name"])
+            changes.append((card_id, "cards", "", field_name, "旧", "新", f"2024-01-{i % 28 + 1:02d} 00:00:00"))
+
+    _insert_many(db_handler, "INSERT INTO point_rewards (card_id, shop_id, spending_amount, given_points, from_kakaku) VALUES (%s, %s, %s, %s, %s)", point_rewards)
+    _insert_many(db_handler, "INSERT INTO point_exchanges (card_id, exchangeable_reward_id, before_value, after_value) VALUES (%s, %s, %s, %s)", exchanges)
+    _insert_many(db_handler, "INSERT INTO card_include_insurances (card_id, category_id, coverage_type, coverage_amount_id) VALUES (%s, %s, %s, %s)", insurances)
+    _insert_many(db_handler, "INSERT INTO card_include_services (card_id, service_name, service_content_id) VALUES (%s, %s, %s)", services)
+    _insert_many(
+        db_handler,
+        "INSERT INTO card_field_changes (card_id, entity, entity_key, field_name, old_value, new_value, changed_at) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        changes,
+    )
+    _insert_many(
+        db_handler,
+        "INSERT INTO crawl_queue (run_id, url, status) VALUES (%s, %s, %s)",
+        [(f"run{i % 10}", f"https://kakaku.com/card/item.asp?id={i}", rng.choice(["pending", "done", "done", "failed"]))
+         for i in range(volumes["queue_items"])],
+    )
+    cursor = db_handler.connection.cursor()
+    cursor.execute("ANALYZE TABLE m_issuers, m_points, shops, m_exchangeable_rewards, cards, point_rewards, point_exchanges, card_include_insurances, card_include_services, card_field_changes, crawl_queue")
+    cursor.fetchall()
+    db_handler.connection.commit()
+    return dict(
+        volumes,
+        point_rewards=len(point_rewards),
+        point_exchanges=len(exchanges),
+        card_field_changes=len(changes),
+    )
+
+
+def benchmark_queries(volumes: Dict[str, int], rng: random.Random) -> Dict[str, Tuple[str, Callable[[], Tuple]]]:
+    """DatabaseHandlerなどが実行する検索クエリと、そのパラメータの生成方法"""
+
+    def shop_params() -> Tuple:
+        i = rng.randrange(volumes["shops"])
+        return (f"ショップ{i}", i % 3 == 0, CATEGORIES[i % len(CATEGORIES)])
+
+    def reward_params() -> Tuple:
+        i = rng.randrange(volumes["rewards"])
+        return (CATEGORIES[i % len(CATEGORIES)], f"交換先{i}", "円")
+
+    def shop_names() -> Tuple:
+        return tuple(f"ショップ{rng.randrange(volumes['shops'])}" for _ in range(20))
+
+    def card_id() -> Tuple:
+        return (rng.randint(1, volumes["cards"]),)
+
+    return {
+        "get_issuer_id": ("SELECT id FROM m_issuers WHERE issuer_name = %s", lambda: (f"発行会社{rng.randrange(volumes['issuers'])}",)),
+        "get_point_id": ("SELECT id FROM m_points WHERE point_name = %s", lambda: (f"ポイント{rng.randrange(volumes['points'])}",)),
+        "get_shop_id": ("SELECT id FROM shops WHERE shop_name = %s AND is_online = %s AND category = %s", shop_params),
+        "get_shop_ids": (f"SELECT shop_name, id FROM shops WHERE shop_name IN ({', '.join(['%s'] * 20)})", shop_names),
+        "get_reward_id": ("SELECT id FROM m_exchangeable_rewards WHERE category = %s AND reward_name = %s AND unit = %s", reward_params),
+        "get_card_id": ("SELECT id FROM cards WHERE kakaku_card_id = %s", lambda: (f"{100000 + rng.randrange(volumes['cards'])}",)),
+        "point_rewards_by_card": ("SELECT shop_id, spending_amount, given_points FROM point_rewards WHERE card_id = %s AND deleted_at IS NULL", card_id),
+        "point_rewards_by_card_shop": (
+            "SELECT id FROM point_rewards WHERE card_id = %s AND shop_id = %s",
+            lambda: card_id() + (rng.randint(1, volumes["shops"]),),
+        ),
+        "services_by_card": (
+            f"SELECT service_name, service_content FROM {resolved_table('card_include_services')} WHERE card_id = %s AND deleted_at IS NULL",
+            card_id,
+        ),
+        "crawl_queue_claim": (
+            """
+            SELECT id, url FROM crawl_queue
+            WHERE run_id = %s AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < NOW()))
+            ORDER BY id LIMIT 10
+            """,
+            lambda: (f"run{rng.randrange(10)}",),
+        ),
+        "history_row_changes": (
+            "SELECT entity, entity_key, old_value, new_value FROM card_field_changes WHERE card_id = %s AND field_name = '__row__' ORDER BY changed_at, id",
+            card_id,
+        ),
+    }
+
+
+def explain(db_handler: DatabaseHandler, query: str, params: Tuple) -> List[Dict[str, Any]]:
+    """EXPLAINの結果からテーブル・アクセス方法・使用インデックス・推定行数を抜き出す"""
+    cursor = db_handler.connection.cursor(dictionary=True)
+    cursor.execute(f"EXPLAIN {query}", params)
+    plan = [
+        {"table": row["table"], "type": row["type"], "key": row["key"], "rows": row["rows"]}
+        for row in cursor.fetchall()
+    ]
+    db_handler.connection.commit()
+    return plan
+
+
+def measure(db_handler: DatabaseHandler, query: str, make_params: Callable[[], Tuple], repeat: int) -> Dict[str, float]:
+    """クエリをrepeat回実行し、p50/p95のレイテンシ（ミリ秒）を返す"""
+    cursor = db_handler.connection.cursor()
+    timings = []
+    for _ in range(repeat):
+        params = make_params()
+        started_at = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    db_handler.connection.commit()
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def run_query_benchmark(database: str, scale: float = 1.0, repeat: int = 200) -> Dict[str, Any]:
+    """ベンチマーク用DBにスキーマとマイグレーションを適用し、ダミーデータで検索クエリを計測"""
+    create_database(database)
+    db_handler = DatabaseHandler(database=database)
+    try:
+        execute_sql_file(db_handler, schema_path())
+        MigrationRunner(db_handler).migrate()
+        rng = random.Random(0)
+        counts = seed(db_handler, scale, rng)
+        results = {}
+        for name, (query, make_params) in benchmark_queries(counts, rng).items():
+            results[name] = measure(db_handler, query, make_params, repeat)
+            results[name]["plan"] = explain(db_handler, query, make_params())
+        return {"rows": counts, "queries": results}
+    finally:
+        db_handler.close()
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """ベースラインと比べてp95が許容範囲を超えて悪化したクエリや、新たにフルスキャンになったクエリを列挙"""
+    regressions = []
+    for name, result in current["queries"].items():
+        before = baseline.get("queries", {}).get(name)
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+        scanned_before = {step["table"] for step in before["plan"] if step["type"] == "ALL"}
+        for step in result["plan"]:
+            if step["type"] == "ALL" and step["table"] not in scanned_before:
+                regressions.append(f"{name}: {step['table']}がフルスキャンになりました")
+    return regressions
@@ -0,0 +1,284 @@
+import os
+import time
+import threading
+import statistics
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, TYPE_CHECKING
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from models.host_rate_limits import HostRateLimitStore
+
+# 共有レートをこの秒数以上変更していなければ、前回の実行の減速を引き継がずに初期レートに戻す
+SHARED_RATE_STALE_SECONDS = 600
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self) -> float:
+        """トークンを1つ取得（取得できるまで待機）し、待機した秒数を返す"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+
+class SharedTokenBucket:
+    """複数のプロセス・ノードで共有するトークンバケット（状態はhost_rate_limitsの1行）
+
+    TokenBucketと同じメソッドを持ち、rateは全ワーカー合計のレートになる。
+    1つのワーカーが減速すると、他のワーカーも次の取得から同じレートに従う。
+    """
+
+    def __init__(self, store: "HostRateLimitStore", host: str, rate: float):
+        self.store = store
+        self.host = host
+        self._lock = threading.Lock()
+        self.rate = store.register(host, rate, SHARED_RATE_STALE_SECONDS)
+
+    def acquire(self) -> float:
+        """全ワーカーで共有する次の枠を確保し、枠の時刻まで待機した秒数を返す"""
+        with self._lock:
+            delay, self.rate = self.store.reserve(self.host)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self.store.set_rate(self.host, rate)
+            self.rate = rate
+
+
+class AimdController:
+    """AIMD（加算増加・乗算減少）による同時実行数の制御
+
+    レイテンシとエラー率が健全な間は同時実行数を少しずつ増やし、
+    タイムアウトやスロットリングを検知したら半減させる。
+    """
+
+    def __init__(
+        self,
+        initial: float = 1.0,
+        minimum: float = 1.0,
+        maximum: float = 4.0,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def grow(self) -> None:
+        # 1往復（limit回の成功）あたりincrease分だけ増やす
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._condition.notify_all()
+
+    def shrink(self) -> None:
+        with self._condition:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+
+
+class PageLoad:
+    """1回のページ読み込みの結果"""
+
+    __slots__ = ("url", "error")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.error = None
+
+    def fail(self, kind: str) -> None:
+        """呼び出し側で検知した失敗（スロットリング等）を記録"""
+        self.error = kind
+
+
+class HostPacer:
+    """ホストごとのリクエスト間隔と同時実行数を自動調整する"""
+
+    def __init__(
+        self,
+        host: str,
+        rate: float = 0.5,
+        min_rate: float = 0.1,
+        max_rate: float = 2.0,
+        rate_increase: float = 0.05,
+        max_concurrency: float = 4.0,
+        target_latency: float = 8.0,
+        max_error_rate: float = 0.1,
+        window: int = 20,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        self.host = host
+        self.bucket = bucket or TokenBucket(rate)
+        self.controller = AimdController(maximum=max_concurrency)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_increase = rate_increase
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self._samples = deque(maxlen=window)
+        self._errors: Dict[str, int] = {}
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def page_load(self, url: str):
+        """ページ読み込みを囲み、待機・計測・調整を行う"""
+        self.controller.acquire()
+        self.bucket.acquire()
+        load = PageLoad(url)
+        started_at = time.monotonic()
+        try:
+            yield load
+        except Exception as e:
+            load.error = load.error or classify_error(e)
+            raise
+        finally:
+            latency = time.monotonic() - started_at
+            self.controller.release()
+            self._record(latency, load.error)
+
+    def _record(self, latency: float, error: Optional[str]) -> None:
+        with self._lock:
+            self._samples.append((latency, error is None))
+            if error:
+                self._errors[error] = self._errors.get(error, 0) + 1
+            healthy = (
+                error is None
+                and latency <= self.target_latency
+                and self._error_rate() <= self.max_error_rate
+            )
+            # 同じ輻輳で何度も減少させないよう、目標レイテンシの間は1回だけ減少させる
+            backoff = not healthy and time.monotonic() - self._last_backoff > self.target_latency
+            if backoff:
+                self._last_backoff = time.monotonic()
+
+        if healthy:
+            self.controller.grow()
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.rate_increase))
+        elif backoff:
+            self.controller.shrink()
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.controller.decrease))
+            reason = error or ("slow" if latency > self.target_latency else "error_rate")
+            print(f"[PACE] 減速: {reason} ({latency:.1f}s) {self.describe()}")
+
+    def _error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """現在のレートと同時実行数"""
+        with self._lock:
+            latencies = [latency for latency, _ in self._samples]
+            return {
+                "host": self.host,
+                "rate": self.bucket.rate,
+                "concurrency": self.controller.limit,
+                "in_flight": self.controller.in_flight,
+                "p50_latency": statistics.median(latencies) if latencies else None,
+                "error_rate": self._error_rate(),
+                "errors": dict(self._errors),
+            }
+
+    def describe(self) -> str:
+        snapshot = self.snapshot()
+        p50 = snapshot["p50_latency"]
+        p50_text = f"{p50:.1f}s" if p50 is not None else "-"
+        return (
+            f"{snapshot['host']} rate={snapshot['rate']:.2f}req/s "
+            f"concurrency={snapshot['concurrency']:.1f} (in-flight {snapshot['in_flight']}) "
+            f"p50={p50_text} errors={snapshot['error_rate']:.0%}"
+        )
+
+
+def classify_error(e: Exception) -> str:
+    """例外をスロットリング判定用の種別に分類"""
+    kind = getattr(e, "throttle_kind", None)
+    if kind:
+        return kind
+    if type(e).__name__ == "TimeoutException":
+        return "timeout"
+    return "error"
+
+
+_pacers: Dict[str, HostPacer] = {}
+_pacers_lock = threading.Lock()
+_shared_store: Optional["HostRateLimitStore"] = None
+
+
+def enable_shared_pacing(store: "HostRateLimitStore") -> None:
+    """以降に作成するペーサーのリクエストレートを、storeを通じて他のプロセス・ノードと共有する
+
+    分散クロールのワーカーは、同じホストへのリクエストが全ワーカー合計でRATE_LIMIT_MAX_RPSを超えないよう、
+    起動時にこれを呼ぶ（storeには他の処理と共有しない専用の接続を渡す）。
+    """
+    global _shared_store
+    with _pacers_lock:
+        _shared_store = store
+        _pacers.clear()
+
+
+def get_pacer(url: str) -> HostPacer:
+    """URLのホストに対応する共有ペーサーを取得（プロセス内で共有、enable_shared_pacing後はレートをプロセス間でも共有）"""
+    host = urlparse(url).netloc
+    with _pacers_lock:
+        if host not in _pacers:
+            rate = float(os.getenv("RATE_LIMIT_RPS", "0.5"))
+            _pacers[host] = HostPacer(
+                host,
+                rate=rate,
+                max_rate=float(os.getenv("RATE_LIMIT_MAX_RPS", "2.0")),
+                max_concurrency=float(os.getenv("MAX_CONCURRENCY", "4")),
+                target_latency=float(os.getenv("TARGET_LATENCY", "8")),
+                bucket=SharedTokenBucket(_shared_store, host, rate) if _shared_store else None,
+            )
+        return _pacers[host]
+
+
+def describe_pacers() -> str:
+    with _pacers_lock:
+        pacers = list(_pacers.values())
+    return "\n".join(f"[PACE] {pacer.describe()}" for pacer in pacers)
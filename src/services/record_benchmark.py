@@ -0,0 +1,120 @@
+import gc
+import time
+import tracemalloc
+from typing import List, Dict, Any, Callable
+from models.records import CardRecord, ExchangeRecord, InsuranceRecord, ServiceRecord, RecordBatch, CARD_FIELDS
+
+# 1枚あたりの子テーブルの行数（価格.comの詳細ページ1枚分に相当）
+EXCHANGES_PER_CARD = 8
+INSURANCES_PER_CARD = 4
+SERVICES_PER_CARD = 6
+
+
+def sample_values(count: int) -> List[Dict[str, Any]]:
+    """カードごとの項目値（文字列はカードごとに別のオブジェクト）"""
+    samples = []
+    for index in range(count):
+        card = {field: f"{field}の値{index}" for field in CARD_FIELDS}
+        card.update({
+            "issuer_id": index % 150 + 1, "point_id": index % 200 + 1,
+            "visa": True, "mastercard": False, "jcb": True, "amex": False, "diners": False, "unionpay": False,
+            "image_urls": [f"https://img.example.com/{index}.png"],
+        })
+        samples.append({
+            "card": card,
+            "card_values": tuple(card[field] for field in CardRecord.__slots__),
+            "exchanges": [
+                {"card_id": index, "exchangeable_reward_id": i + 1, "before_value": 1, "after_value": 1, "remarks": f"注記{index}"}
+                for i in range(EXCHANGES_PER_CARD)
+            ],
+            "insurances": [
+                {"card_id": index, "category": "海外旅行", "coverage_type": f"補償{i}", "coverage_amount": f"{index}万円", "remarks": ""}
+                for i in range(INSURANCES_PER_CARD)
+            ],
+            "services": [
+                {"card_id": index, "service_name": f"サービス{i}", "service_content": f"内容{index}", "remarks": ""}
+                for i in range(SERVICES_PER_CARD)
+            ],
+        })
+        for entity, record_type in (("exchanges", ExchangeRecord), ("insurances", InsuranceRecord), ("services", ServiceRecord)):
+            samples[-1][f"{entity}_values"] = [
+                tuple(row[field] for field in record_type.__slots__) for row in samples[-1][entity]
+            ]
+    return samples
+
+
+def as_dicts(sample: Dict[str, Any]) -> tuple:
+    return (
+        dict(sample["card"]),
+        [dict(row) for row in sample["exchanges"]],
+        [dict(row) for row in sample["insurances"]],
+        [dict(row) for row in sample["services"]],
+    )
+
+
+def as_records(sample: Dict[str, Any]) -> tuple:
+    # スクレイピング・RecordBatch.records()と同じく、キーワード引数を介さずに項目を設定する
+    return (
+        CardRecord.from_values(sample["card_values"]),
+        [ExchangeRecord.from_values(values) for values in sample["exchanges_values"]],
+        [InsuranceRecord.from_values(values) for values in sample["insurances_values"]],
+        [ServiceRecord.from_values(values) for values in sample["services_values"]],
+    )
+
+
+def measure_memory(samples: List[Dict[str, Any]], build: Callable[[Dict[str, Any]], tuple]) -> float:
+    """バッファに保持したときの1枚あたりの確保バイト数（項目値の文字列は含まない）"""
+    gc.collect()
+    tracemalloc.start()
+    buffered = [build(sample) for sample in samples]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del buffered
+    return current / len(samples)
+
+
+def measure_time(function: Callable[[], Any], repeat: int) -> float:
+    """repeat回の中で最も速かった実行時間（ミリ秒）"""
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings) * 1000
+
+
+def run_record_benchmark(cards: int = 2000, repeat: int = 5) -> Dict[str, Any]:
+    """辞書とレコードで、バッファ時のメモリとDBパラメータへの変換時間を比較"""
+    samples = sample_values(cards)
+    dict_cards = [dict(sample["card"]) for sample in samples]
+    record_cards = [CardRecord(**sample["card"]) for sample in samples]
+    record_exchanges = [ExchangeRecord(**row) for sample in samples for row in sample["exchanges"]]
+
+    def dict_to_params() -> None:
+        # 従来のupsert_cardと同じく、キーを1つずつ引いてタプルを作る
+        for card in dict_cards:
+            tuple(card[field] for field in CARD_FIELDS)
+
+    def record_to_params() -> None:
+        for card in record_cards:
+            card.to_params()
+
+    return {
+        "cards": cards,
+        "memory_bytes_per_card": {
+            "dict": measure_memory(samples, as_dicts),
+            "record": measure_memory(samples, as_records),
+        },
+        "build_ms": {
+            "dict": measure_time(lambda: [as_dicts(sample) for sample in samples], repeat),
+            "record": measure_time(lambda: [as_records(sample) for sample in samples], repeat),
+        },
+        "to_params_ms": {
+            "dict": measure_time(dict_to_params, repeat),
+            "record": measure_time(record_to_params, repeat),
+        },
+        "batch_ms": {
+            "from_records": measure_time(lambda: RecordBatch.from_records(ExchangeRecord, record_exchanges), repeat),
+            "to_params": measure_time(RecordBatch.from_records(ExchangeRecord, record_exchanges).to_params, repeat),
+        },
+    }
@@ -0,0 +1,99 @@
+import math
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from models.refresh_stats import RefreshStatsStore
+
+
+class RefreshScheduler:
+    """古くなっている可能性が高く、人気のあるカードから順に再取得対象を選ぶ
+
+    各カードの優先度 = 人気度 × 前回取得以降に内容が変化している確率。
+    変化の確率は観測された変化頻度（ポアソン過程を仮定）と経過時間から求める。
+    """
+
+    def __init__(
+        self,
+        stats_store: RefreshStatsStore,
+        prior_changes: float = 1.0,
+        prior_days: float = 7.0,
+        default_scrape_seconds: float = 15.0,
+        unranked_weight: float = 0.2,
+    ):
+        self.stats_store = stats_store
+        # 観測が少ないカードは「prior_days日に1回程度変化する」とみなす
+        self.prior_changes = prior_changes
+        self.prior_days = prior_days
+        self.default_scrape_seconds = default_scrape_seconds
+        self.unranked_weight = unranked_weight
+
+    def change_rate(self, stats: Dict[str, Any], now: datetime) -> float:
+        """1日あたりの変化回数の推定値"""
+        observed_days = 0.0
+        if stats.get("tracked_since"):
+            observed_days = max((now - stats["tracked_since"]).total_seconds() / 86400, 0.0)
+        return (stats.get("change_count", 0) + self.prior_changes) / (observed_days + self.prior_days)
+
+    def popularity(self, stats: Dict[str, Any]) -> float:
+        """ランキング順位による重み（上位ほど大きい）"""
+        position = stats.get("ranking_position")
+        if not position:
+            return self.unranked_weight
+        return 1.0 / math.log2(position + 1)
+
+    def priority(self, stats: Dict[str, Any], now: datetime) -> float:
+        last_seen = stats.get("last_scraped_at") or stats.get("card_updated_at")
+        if last_seen is None:
+            # 一度も取得していないカードは最優先
+            return math.inf
+        age_days = max((now - last_seen).total_seconds() / 86400, 0.0)
+        stale_probability = 1.0 - math.exp(-self.change_rate(stats, now) * age_days)
+        return self.popularity(stats) * stale_probability
+
+    def plan(
+        self,
+        max_pages: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        ids: Optional[List[str]] = None,
+        now: Optional[datetime] = None,
+    ) -> List[str]:
+        """予算内で再取得するkakaku_card_idを優先度順に返す
+
+        idsで指定したカードは予算に関係なく先頭に含める。
+        """
+        now = now or datetime.now()
+        selected = list(dict.fromkeys(ids or []))
+        forced = set(selected)
+
+        candidates = [stats for stats in self.stats_store.get_candidates() if stats["kakaku_card_id"] not in forced]
+        candidates.sort(key=lambda stats: self.priority(stats, now), reverse=True)
+
+        pages = 0
+        seconds = 0.0
+        for stats in candidates:
+            cost = stats.get("avg_scrape_seconds") or self.default_scrape_seconds
+            if max_pages is not None and pages + 1 > max_pages:
+                break
+            if max_seconds is not None and seconds + cost > max_seconds:
+                break
+            if self.priority(stats, now) <= 0:
+                break
+            selected.append(stats["kakaku_card_id"])
+            pages += 1
+            seconds += cost
+        return selected
+
+    def describe(self, kakaku_card_ids: List[str], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """選ばれたカードの優先度と根拠（dry-run表示用）"""
+        now = now or datetime.now()
+        stats_by_id = {stats["kakaku_card_id"]: stats for stats in self.stats_store.get_candidates()}
+        described = []
+        for kakaku_card_id in kakaku_card_ids:
+            stats = stats_by_id.get(kakaku_card_id, {"kakaku_card_id": kakaku_card_id})
+            described.append({
+                "kakaku_card_id": kakaku_card_id,
+                "priority": self.priority(stats, now),
+                "ranking_position": stats.get("ranking_position"),
+                "last_scraped_at": stats.get("last_scraped_at"),
+                "change_rate_per_day": self.change_rate(stats, now),
+            })
+        return described
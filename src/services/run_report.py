@@ -0,0 +1,63 @@
+import statistics
+from typing import List, Dict, Any, Optional
+from models.database import DatabaseHandler
+from models.run_ledger import RunLedgerReader, STAGES
+
+# 失敗率が過去の中央値からこれ以上（割合の差）増えたら悪化とみなす
+FAILURE_RATE_MARGIN = 0.05
+
+# 1枚あたりの所要時間の増加がこれ未満（秒）なら、割合が大きくても悪化とみなさない
+MIN_STAGE_REGRESSION_SECONDS = 0.05
+
+
+def find_regressions(runs: List[Dict[str, Any]], baseline: int, tolerance: float) -> List[str]:
+    """最新の実行を直前のbaseline回の中央値と比べ、スループットの低下や段階ごとの所要時間の悪化を列挙
+
+    runsは新しい順。比較できる過去の実行がなければ空のリストを返す。
+    """
+    if len(runs) < 2:
+        return []
+    latest, previous = runs[0], runs[1:baseline + 1]
+    regressions = []
+    throughputs = [run["cards_per_minute"] for run in previous if run["cards_per_minute"]]
+    if throughputs and latest["cards_per_minute"] is not None:
+        median = statistics.median(throughputs)
+        if latest["cards_per_minute"] < median * (1 - tolerance):
+            regressions.append(f"スループット: {median:.1f}枚/分 -> {latest['cards_per_minute']:.1f}枚/分")
+    for stage in STAGES:
+        column = f"{stage}_seconds"
+        durations = [run[column] for run in previous if run[column] is not None]
+        if durations and latest[column] is not None:
+            median = statistics.median(durations)
+            if latest[column] > median * (1 + tolerance) and latest[column] - median >= MIN_STAGE_REGRESSION_SECONDS:
+                regressions.append(f"{stage}: 1枚あたり {median:.2f}秒 -> {latest[column]:.2f}秒")
+    median = statistics.median(failure_rate(run) for run in previous)
+    if failure_rate(latest) > median + FAILURE_RATE_MARGIN:
+        regressions.append(f"失敗率: {median:.1%} -> {failure_rate(latest):.1%}")
+    return regressions
+
+
+def failure_rate(run: Dict[str, Any]) -> float:
+    cards = (run["cards_ok"] or 0) + (run["cards_failed"] or 0)
+    return (run["cards_failed"] or 0) / cards if cards else 0.0
+
+
+def build_report(
+    db_handler: DatabaseHandler,
+    command: Optional[str] = "scrape",
+    runs: int = 10,
+    baseline: int = 5,
+    tolerance: float = 0.2,
+    limit: int = 10,
+) -> Dict[str, Any]:
+    """直近の実行の一覧、最新の実行で時間がかかったカード、失敗が続くカード、前回までとの比較"""
+    reader = RunLedgerReader(db_handler)
+    recent = reader.recent_runs(command, max(runs, baseline + 1))
+    latest = recent[0] if recent else None
+    return {
+        "runs": recent[:runs],
+        "slowest": reader.slowest_items(latest["id"], limit) if latest else [],
+        "hotspots": reader.failure_hotspots([run["id"] for run in recent[:runs]], limit),
+        "profiles": reader.profile_latency([run["id"] for run in recent[:runs]]),
+        "regressions": find_regressions(recent, baseline, tolerance),
+    }
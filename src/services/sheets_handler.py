@@ -4,9 +4,40 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 from dotenv import load_dotenv
+from models.records import RecordBatch
 
 load_dotenv()
 
+# cardsシートの列（ヘッダー名とcardsテーブルの列。DBにない列は空欄）
+CARD_SHEET_COLUMNS = [
+    ("card_id", "id"),
+    ("kakaku_com_card_id", "kakaku_card_id"),
+    ("card_name", "card_name"),
+    ("official_url", "official_url"),
+    ("grade", "grade"),
+    ("issuer_id", "issuer_id"),
+    ("partner_id", "partner_id"),
+    ("visa", "visa"),
+    ("mastercard", "mastercard"),
+    ("jcb", "jcb"),
+    ("amex", "amex"),
+    ("diners", "diners"),
+    ("unionpay", "unionpay"),
+    ("eligibility", "eligibility"),
+    ("application_method", "application_method"),
+    ("screening_period", "screening_period"),
+    ("annual_fee", "annual_fee_raw"),
+    ("shopping_limit", "shopping_limit"),
+    ("cashing_limit", "cashing_limit"),
+    ("revolving_interest_rate", "revolving_interest_rate"),
+    ("cashing_interest_rate", "cashing_interest_rate"),
+    ("payment_methods", "payment_methods"),
+    ("closing_date", "closing_date"),
+    ("annual_bonus", "annual_bonus_raw"),
+    ("remarks", "remarks"),
+    ("detail_url", "detail_url"),
+]
+
 class SheetsHandler:
     def __init__(self):
         self.spreadsheet_id = os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID")
@@ -14,6 +45,12 @@ class SheetsHandler:
         # self.service = build("sheets", "v4", credentials=self.credentials)
         # self._init_sheets()
 
+    def connect(self) -> None:
+        """Google Sheets APIに接続し、シートを初期化"""
+        self.credentials = self._get_credentials()
+        self.service = build("sheets", "v4", credentials=self.credentials)
+        self._init_sheets()
+
     def _get_credentials(self) -> Credentials:
         """認証情報を取得"""
         try:
@@ -37,34 +74,7 @@ class SheetsHandler:
         # ヘッダーの設定
         self._write_data("issuers", [["issuer_id", "issuer_name"]])
         self._write_data("partners", [["partner_id", "partner_name"]])
-        self._write_data("cards", [[
-            "card_id",
-            "kakaku_com_card_id",
-            "card_name",
-            "official_url",
-            "grade",
-            "issuer_id",
-            "partner_id",
-            "visa",
-            "mastercard",
-            "jcb",
-            "amex",
-            "diners",
-            "unionpay",
-            "eligibility",
-            "application_method",
-            "screening_period",
-            "annual_fee",
-            "shopping_limit",
-            "cashing_limit",
-            "revolving_interest_rate",
-            "cashing_interest_rate",
-            "payment_methods",
-            "closing_date",
-            "annual_bonus",
-            "remarks",
-            "detail_url",
-        ]])
+        self._write_data("cards", [[header for header, _ in CARD_SHEET_COLUMNS]])
         self._write_data("point_rewards", [[
             "card_id",
             "category",
@@ -116,66 +126,12 @@ class SheetsHandler:
             + [[partner["partner_id"], partner["partner_name"]] for partner in partners_data]
         )
 
-        # カード情報の更新
-        cards_data = db_handler.get_all_cards()
+        # カード情報の更新（必要な列だけを列ごとの配列で取り出してから行に並べる）
+        cards = RecordBatch.from_rows(db_handler.get_all_cards(), [field for _, field in CARD_SHEET_COLUMNS])
         self._write_data(
             "cards",
-            [[
-                "card_id",
-                "kakaku_com_card_id",
-                "card_name",
-                "official_url",
-                "grade",
-                "issuer_id",
-                "partner_id",
-                "visa",
-                "mastercard",
-                "jcb",
-                "amex",
-                "diners",
-                "unionpay",
-                "eligibility",
-                "application_method",
-                "screening_period",
-                "annual_fee",
-                "shopping_limit",
-                "cashing_limit",
-                "revolving_interest_rate",
-                "cashing_interest_rate",
-                "payment_methods",
-                "closing_date",
-                "annual_bonus",
-                "remarks",
-                "detail_url",
-            ]]  # ヘッダー
-            + [[
-                card["id"],
-                card["card_id"],
-                card["card_name"],
-                card["official_url"],
-                "",
-                card["issuer_id"],
-                card["partner_id"],
-                card["visa"],
-                card["mastercard"],
-                card["jcb"],
-                card["amex"],
-                card["diners"],
-                card["unionpay"],
-                card["eligibility"],
-                card["application_method"],
-                card["screening_period"],
-                card["annual_fee"],
-                card["shopping_limit"],
-                card["cashing_limit"],
-                card["revolving_interest_rate"],
-                card["cashing_interest_rate"],
-                card["payment_methods"],
-                card["closing_date"],
-                card["annual_bonus"],
-                card["remarks"],
-                "",
-            ] for card in cards_data]
+            [[header for header, _ in CARD_SHEET_COLUMNS]]  # ヘッダー
+            + [["" if value is None else value for value in row] for row in cards.to_params()]
         )
 
         # ポイント還元情報の更新
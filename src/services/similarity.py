@@ -0,0 +1,103 @@
+import numpy as np
+from typing import List, Dict, Any, Optional
+from models.card_vectors import CardVectorStore, FEATURE_SLICES, VECTOR_DIMENSION
+
+SIMILARITY_METRICS = ("cosine", "weighted")
+
+
+def parse_weights(items: Optional[List[str]]) -> Dict[str, float]:
+    """「グループ=重み」の一覧を辞書にする（例：fee=3 brand=0.5）"""
+    weights = {}
+    for item in items or []:
+        group, _, value = item.partition("=")
+        if group not in FEATURE_SLICES:
+            raise ValueError(f"不明な特徴量グループ: {group}（{', '.join(FEATURE_SLICES)}）")
+        weights[group] = float(value)
+    return weights
+
+
+def weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    """グループごとの重みを次元ごとの重みに展開する（指定のないグループは1）"""
+    vector = np.ones(VECTOR_DIMENSION, dtype=np.float32)
+    for group, weight in weights.items():
+        vector[FEATURE_SLICES[group]] = weight
+    return vector
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SimilarityIndex:
+    """全カードの特徴ベクトルを1つの行列に持ち、近いカードを検索する
+
+    cosine: 行ごとに正規化した行列を事前に作っておき、内積1回で全カードとの類似度を求める
+    weighted: グループごとの重みをかけたユークリッド距離
+    """
+
+    def __init__(self, rows: List[tuple]):
+        rows = [row for row in rows if len(row[4]) == VECTOR_DIMENSION * 4]
+        self.card_ids = [row[0] for row in rows]
+        self.kakaku_card_ids = [row[1] for row in rows]
+        self.card_names = [row[2] for row in rows]
+        # 年会費が読み取れないカードはNaN（安いカードの絞り込みでは対象外）
+        self.annual_fees = np.array([np.nan if row[3] is None else row[3] for row in rows], dtype=np.float64)
+        self.matrix = np.frombuffer(b"".join(bytes(row[4]) for row in rows), dtype=np.float32)
+        self.matrix = self.matrix.reshape(len(rows), VECTOR_DIMENSION)
+        self.normalized = normalize_rows(self.matrix)
+        self.positions = {kakaku_card_id: position for position, kakaku_card_id in enumerate(self.kakaku_card_ids)}
+
+    @classmethod
+    def load(cls, store: CardVectorStore) -> "SimilarityIndex":
+        return cls(store.load())
+
+    def __len__(self) -> int:
+        return len(self.card_ids)
+
+    def scores(self, position: int, metric: str = "cosine", weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """全カードとの近さ（大きいほど近い。weightedは距離にマイナスをつけた値）"""
+        if metric == "cosine":
+            if not weights:
+                return self.normalized @ self.normalized[position]
+            # 重みを指定した場合は重みの平方根をかけてから正規化し直す
+            scaled = normalize_rows(self.matrix * np.sqrt(weight_vector(weights)))
+            return scaled @ scaled[position]
+        if metric == "weighted":
+            difference = self.matrix - self.matrix[position]
+            return -np.sqrt((difference * difference) @ weight_vector(weights or {}))
+        raise ValueError(f"不明な類似度: {metric}")
+
+    def query(
+        self,
+        kakaku_card_id: str,
+        k: int = 10,
+        metric: str = "cosine",
+        weights: Optional[Dict[str, float]] = None,
+        cheaper: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """指定したカードに近いカード（cheaper=Trueなら年会費が安いカードのみ）を近い順にk件"""
+        position = self.positions.get(kakaku_card_id)
+        if position is None:
+            raise KeyError(f"特徴ベクトルがありません: {kakaku_card_id}（similar --rebuildで作成してください）")
+        scores = self.scores(position, metric, weights)
+        candidates = np.ones(len(self), dtype=bool)
+        candidates[position] = False
+        if cheaper:
+            # NaNとの比較はFalseになるため、年会費が読み取れないカードは除かれる
+            candidates &= self.annual_fees < self.annual_fees[position]
+        indexes = np.flatnonzero(candidates)
+        if len(indexes) > k:
+            indexes = indexes[np.argpartition(-scores[indexes], k - 1)[:k]]
+        indexes = indexes[np.argsort(-scores[indexes], kind="stable")]
+        return [
+            {
+                "card_id": self.card_ids[index],
+                "kakaku_card_id": self.kakaku_card_ids[index],
+                "card_name": self.card_names[index],
+                "annual_fee": None if np.isnan(self.annual_fees[index]) else int(self.annual_fees[index]),
+                "score": float(scores[index]),
+            }
+            for index in indexes
+        ]
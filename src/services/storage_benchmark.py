@@ -0,0 +1,134 @@
+import os
+import time
+import random
+import tempfile
+import statistics
+from typing import List, Dict, Any
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.records import CardRecord, ExchangeRecord, InsuranceRecord, ServiceRecord
+from models.refresh_stats import RefreshStatsStore
+
+# 1枚あたりの件数（価格.comの詳細ページ1枚分に相当）
+POINT_REWARDS_PER_CARD = 20
+EXCHANGES_PER_CARD = 8
+INSURANCES_PER_CARD = 4
+SERVICES_PER_CARD = 6
+SHOP_POOL_SIZE = 2000
+
+
+def open_backend(backend: str, database: str) -> DatabaseHandler:
+    """計測用の空のデータベースを用意して接続"""
+    if backend == "mysql":
+        from services.query_benchmark import create_database
+        from models.migrations import MigrationRunner, execute_sql_file, schema_path
+
+        create_database(database)
+        db_handler = DatabaseHandler(database=database)
+        execute_sql_file(db_handler, schema_path())
+        MigrationRunner(db_handler).migrate()
+        return db_handler
+
+    from models.sqlite_database import SQLiteDatabaseHandler
+
+    # --databaseにパスを渡されても、計測用の一時ディレクトリの外（既存のファイル）には書き込まない
+    name = os.path.basename(os.path.normpath(database))
+    path = os.path.join(tempfile.mkdtemp(prefix="storage_bench_"), f"{name}.sqlite3")
+    return SQLiteDatabaseHandler(path)
+
+
+def write_card(db_handler: DatabaseHandler, index: int, rng: random.Random) -> None:
+    """スクレイピング1枚分と同じ順序・同じメソッドで書き込む"""
+    card_data = CardRecord(
+        kakaku_card_id=f"{100000 + index}",
+        card_name=f"カード{index}",
+        grade=rng.choice(["一般", "ゴールド", "プラチナ"]),
+        issuer_id=db_handler.get_issuer_id(f"発行会社{index % 150}"),
+        point_id=db_handler.get_point_id({"point_name": f"ポイント{index % 200}", "expiration": "2年"}),
+        visa=True, mastercard=False, jcb=False, amex=False, diners=False, unionpay=False,
+        eligibility="18歳以上",
+        annual_fee_raw="永年無料",
+        remarks="備考" * 20,
+    )
+    card_id = db_handler.upsert_card(card_data)
+
+    shops = [
+        {"shop_name": f"ショップ{i}", "is_online": i % 3 == 0, "category": "通販"}
+        for i in rng.sample(range(SHOP_POOL_SIZE), POINT_REWARDS_PER_CARD)
+    ]
+    shop_ids = db_handler.get_shop_ids(shops)
+    db_handler.upsert_point_rewards([
+        {
+            "card_id": card_id, "shop_id": shop_ids[shop["shop_name"]], "spending_amount": 100,
+            "given_points": rng.randint(1, 10), "remarks": None, "from_kakaku": True,
+        }
+        for shop in shops
+    ])
+    db_handler.upsert_point_exchanges([
+        ExchangeRecord(
+            card_id=card_id,
+            exchangeable_reward_id=db_handler.get_reward_id({"category": "ギフト券", "reward_name": f"交換先{i}", "unit": "円"}),
+            before_value=1, after_value=1, remarks="",
+        )
+        for i in range(EXCHANGES_PER_CARD)
+    ])
+    for i in range(INSURANCES_PER_CARD):
+        db_handler.upsert_include_insurance(InsuranceRecord(
+            card_id=card_id, category=f"保険{i % 2}", coverage_type=f"補償{i}",
+            coverage_amount=f"{i * 1000}万円", remarks="",
+        ))
+    for i in range(SERVICES_PER_CARD):
+        db_handler.upsert_include_service(ServiceRecord(
+            card_id=card_id, service_name=f"サービス{i}", service_content="サービス内容" * 5, remarks="",
+        ))
+    RefreshStatsStore(db_handler).record_scrape(card_data.kakaku_card_id, f"{index}:{rng.random()}", 1.0)
+
+
+def run_storage_benchmark(backend: str, database: str, cards: int = 300, batched: bool = True) -> Dict[str, Any]:
+    """1バックエンド分の書き込み（新規→再取得）と書き出しの時間を計測"""
+    db_handler = open_backend(backend, database)
+    try:
+        result: Dict[str, Any] = {}
+        rng = random.Random(0)
+        for phase in ("insert", "update"):
+            timings: List[float] = []
+            started_at = time.perf_counter()
+            for index in range(cards):
+                card_started_at = time.perf_counter()
+                if batched:
+                    with db_handler.batch():
+                        write_card(db_handler, index, rng)
+                else:
+                    write_card(db_handler, index, rng)
+                timings.append((time.perf_counter() - card_started_at) * 1000)
+            elapsed = time.perf_counter() - started_at
+            timings.sort()
+            result[phase] = {
+                "cards_per_sec": cards / elapsed,
+                "p50_ms": statistics.median(timings),
+                "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            }
+
+        started_at = time.perf_counter()
+        rows = len(db_handler.get_all_cards()) + len(db_handler.get_all_point_rewards())
+        result["export"] = {"rows": rows, "ms": (time.perf_counter() - started_at) * 1000}
+        if backend == "sqlite":
+            result["file_bytes"] = os.path.getsize(db_handler.database)
+        return result
+    finally:
+        db_handler.close()
+
+
+def compare_backends(backends: List[str], database: str, cards: int = 300) -> Dict[str, Any]:
+    """バックエンドごとに同じ書き込み・書き出しを実行して比較（SQLiteは1枚ごとのコミットとも比較）"""
+    results = {}
+    for backend in backends:
+        variants = [(backend, True)]
+        if backend == "sqlite":
+            variants.append(("sqlite-per-statement", False))
+        for name, batched in variants:
+            try:
+                results[name] = run_storage_benchmark(backend, database, cards, batched)
+            except Error as e:
+                print(f"{name}: 接続できないためスキップします ({e})")
+    return results
@@ -0,0 +1,123 @@
+import operator
+import numpy as np
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional, Tuple
+from models.database import DatabaseHandler
+from models.recommend_tags import RecommendTagStore, INPUT_COLUMNS
+
+# 条件に使える比較（NaNとの比較はFalseになるため、値が読み取れないカードには付かない）
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+
+class TagRule(NamedTuple):
+    """タグ名・カテゴリと、全て満たしたときにタグを付ける条件（入力列, 比較, 値）"""
+
+    tag_name: str
+    tag_category: str
+    conditions: Tuple[Tuple[str, str, Any], ...]
+
+
+RULES = (
+    TagRule("年会費無料", "年会費", (("annual_fee", "==", 0),)),
+    TagRule("年会費5,000円以下", "年会費", (("annual_fee", "<=", 5000),)),
+    TagRule("Visa", "国際ブランド", (("visa", "==", True),)),
+    TagRule("Mastercard", "国際ブランド", (("mastercard", "==", True),)),
+    TagRule("JCB", "国際ブランド", (("jcb", "==", True),)),
+    TagRule("American Express", "国際ブランド", (("amex", "==", True),)),
+    TagRule("Diners Club", "国際ブランド", (("diners", "==", True),)),
+    TagRule("銀聯", "国際ブランド", (("unionpay", "==", True),)),
+    TagRule("海外旅行保険付帯", "付帯保険", (("overseas_travel_insurance", ">", 0),)),
+    TagRule("海外旅行保険5,000万円以上", "付帯保険", (("overseas_travel_insurance", ">=", 50000000),)),
+    TagRule("国内旅行保険付帯", "付帯保険", (("domestic_travel_insurance", ">", 0),)),
+    TagRule("ショッピング保険付帯", "付帯保険", (("shopping_insurance", ">", 0),)),
+    TagRule("年会費無料で海外旅行保険付帯", "付帯保険", (
+        ("annual_fee", "==", 0),
+        ("overseas_travel_insurance", ">", 0),
+    )),
+    TagRule("空港ラウンジ", "付帯サービス", (("airport_lounge", "==", True),)),
+    TagRule("ETCカード無料", "付帯サービス", (("etc_card_free", "==", True),)),
+    TagRule("マイル交換", "ポイント", (("mile_exchange", "==", True),)),
+    TagRule("ポイント等価交換", "ポイント", (("max_exchange_rate", ">=", 1),)),
+)
+
+
+def validate_rules(rules: Iterable[TagRule]) -> None:
+    for rule in rules:
+        for column, op, _ in rule.conditions:
+            if column not in INPUT_COLUMNS:
+                raise ValueError(f"{rule.tag_name}: 不明な入力列 {column}")
+            if op not in OPERATORS:
+                raise ValueError(f"{rule.tag_name}: 不明な比較 {op}")
+
+
+def to_arrays(columns: Dict[str, List[Any]]) -> Dict[str, np.ndarray]:
+    """入力列をNumPyの配列にする（Noneは浮動小数点のNaN）"""
+    arrays = {}
+    for column, values in columns.items():
+        if any(value is None for value in values):
+            arrays[column] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        else:
+            arrays[column] = np.array(values)
+    return arrays
+
+
+def evaluate(rules: Iterable[TagRule], arrays: Dict[str, np.ndarray], size: int) -> Dict[str, np.ndarray]:
+    """ルールごとに全カードの条件を配列の比較でまとめて判定し、タグが付くカードのマスクを返す"""
+    masks = {}
+    for rule in rules:
+        mask = np.ones(size, dtype=bool)
+        for column, op, value in rule.conditions:
+            mask &= OPERATORS[op](arrays[column], value)
+        masks[rule.tag_name] = mask
+    return masks
+
+
+class TagEngine:
+    """RULESを全カード（または内容が変わったカード）に1回で適用し、card_recommend_tagsに反映する"""
+
+    def __init__(self, db_handler: DatabaseHandler, rules: Tuple[TagRule, ...] = RULES):
+        validate_rules(rules)
+        self.store = RecommendTagStore(db_handler)
+        self.rules = rules
+
+    def run(self, card_ids: Optional[Iterable[int]] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """指定したカード（省略時は全カード）を判定し、追加・削除したタグの件数を返す"""
+        card_ids = self.store.all_card_ids() if card_ids is None else sorted(set(card_ids))
+        result: Dict[str, Any] = {"cards": len(card_ids), "added": 0, "removed": 0, "tags": {}}
+        if not card_ids:
+            return result
+
+        arrays = to_arrays(self.store.load_inputs(card_ids))
+        masks = evaluate(self.rules, arrays, len(card_ids))
+        tag_ids = self.store.sync_tags([(rule.tag_name, rule.tag_category) for rule in self.rules])
+        desired = {
+            (int(card_id), tag_ids[tag_name])
+            for tag_name, mask in masks.items()
+            for card_id in arrays["card_id"][mask]
+        }
+        current = self.store.current_pairs(card_ids, tag_ids.values())
+        added = desired - current
+        removed = current - desired
+        if not dry_run:
+            self.store.apply(added, removed)
+
+        names = {tag_id: tag_name for tag_name, tag_id in tag_ids.items()}
+        for label, pairs in (("added", added), ("removed", removed)):
+            result[label] = len(pairs)
+            for _, tag_id in pairs:
+                counts = result["tags"].setdefault(names[tag_id], {"added": 0, "removed": 0})
+                counts[label] += 1
+        return result
+
+
+def describe(result: Dict[str, Any]) -> str:
+    lines = [f"レコメンドタグ更新: {result['cards']}枚 / 追加{result['added']}件 / 削除{result['removed']}件"]
+    for tag_name, counts in sorted(result["tags"].items()):
+        lines.append(f"  {tag_name}: +{counts['added']} -{counts['removed']}")
+    return "\n".join(lines)
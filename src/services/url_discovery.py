@@ -0,0 +1,137 @@
+import queue
+import threading
+from typing import List, Iterator, Optional
+from models.database import DatabaseHandler, create_database_handler
+from models.refresh_stats import RefreshStatsStore
+from models.run_sweep import RunSweep
+from services.card_scraper import CardScraper
+
+
+class RankingDiscovery:
+    """ランキングページを1ページずつ読み進め、見つけたカードURLを順位とともに記録する
+
+    前回までにランキングで見つけたカード（card_refresh_stats.last_seen_at）と比べて、
+    新しく載ったカードと消えたカードを求める。消えたカードは最後のページまで読めたときだけ判定する。
+    """
+
+    def __init__(
+        self,
+        scraper: CardScraper,
+        db_handler: DatabaseHandler,
+        base_url: str,
+        max_pages: Optional[int] = None,
+    ):
+        self.scraper = scraper
+        self.stats = RefreshStatsStore(db_handler)
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self.urls: List[str] = []
+        self.new_ids: List[str] = []
+        self.removed_ids: List[str] = []
+        self.complete = False
+
+    def pages(self) -> Iterator[List[str]]:
+        """ページごとのカードURL（前のページまでに見つけたURLは除く）"""
+        known = self.stats.get_seen_card_ids()
+        seen = set()
+        for page_urls in self.scraper.iter_card_pages(self.base_url, self.max_pages):
+            self.stats.record_rankings(page_urls, start=len(self.urls) + 1)
+            for url in page_urls:
+                kakaku_card_id = url.split("id=")[-1]
+                seen.add(kakaku_card_id)
+                if kakaku_card_id not in known:
+                    self.new_ids.append(kakaku_card_id)
+            self.urls.extend(page_urls)
+            yield page_urls
+
+        self.complete = self.scraper.ranking_complete
+        if self.complete:
+            self.removed_ids = sorted(known - seen)
+            self.stats.clear_seen(self.removed_ids)
+
+    def __iter__(self) -> Iterator[str]:
+        for page_urls in self.pages():
+            yield from page_urls
+
+    def describe(self) -> str:
+        removed = f"{len(self.removed_ids)}件" if self.complete else "未判定（最後のページまで取得していません）"
+        lines = [f"カードURL: {len(self.urls)}件 / 新規: {len(self.new_ids)}件 / 掲載終了: {removed}"]
+        if self.new_ids:
+            lines.append(f"  新規: {', '.join(self.new_ids)}")
+        if self.removed_ids:
+            lines.append(f"  掲載終了: {', '.join(self.removed_ids)}")
+        return "\n".join(lines)
+
+
+class UrlStream:
+    """別スレッド・別のWebDriverでランキングを読み進め、見つけたURLをすぐに詳細取得側へ渡す
+
+    1ページ読み終えるごとにURLをキューへ入れるため、URL取得の完了を待たずに詳細取得を始められる。
+    最後のページまで読めた場合は、終了を伝える前に見つけたカードIDをsweepに記録する。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_pages: Optional[int] = None,
+        selenium_url: Optional[str] = None,
+        sweep: Optional[RunSweep] = None,
+    ):
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self.selenium_url = selenium_url
+        self.sweep = sweep
+        self.discovery: Optional[RankingDiscovery] = None
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "UrlStream":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        db_handler = create_database_handler()
+        scraper = None
+        try:
+            scraper = CardScraper(db_handler, selenium_url=self.selenium_url)
+            self.discovery = RankingDiscovery(scraper, db_handler, self.base_url, self.max_pages)
+            for page_urls in self.discovery.pages():
+                for url in page_urls:
+                    self._queue.put(url)
+                if self._stopped.is_set():
+                    break
+            if self.sweep and self.discovery.complete:
+                self.sweep.record_ranking(url.split("id=")[-1] for url in self.discovery.urls)
+        except Exception as e:
+            print(f"カードURLの取得に失敗: {e}")
+        finally:
+            self._queue.put(None)
+            if scraper:
+                scraper.close()
+            db_handler.close()
+
+    def get(self) -> Optional[str]:
+        """次のURL（URL取得が終わり全て渡し終えたらNone）"""
+        url = self._queue.get()
+        if url is None:
+            # 他の取得待ちのスレッドにも終了を伝える
+            self._queue.put(None)
+        return url
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            url = self.get()
+            if url is None:
+                return
+            yield url
+
+    def close(self) -> None:
+        """URL取得を止めて終了を待つ（読み込み中のページは最後まで処理する）"""
+        self._stopped.set()
+        self._thread.join()
+
+    def describe(self) -> str:
+        if not self.discovery:
+            return "カードURL: 0件"
+        return self.discovery.describe()
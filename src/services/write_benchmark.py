@@ -0,0 +1,290 @@
+import time
+import random
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import List, Dict, Any, Callable
+from mysql.connector import Error
+from models.database import DatabaseHandler
+from models.records import CardRecord, ExchangeRecord, InsuranceRecord, ServiceRecord
+from services.storage_benchmark import open_backend, EXCHANGES_PER_CARD, INSURANCES_PER_CARD, SERVICES_PER_CARD
+
+# 事前に登録しておくマスタの件数
+MASTER_VOLUMES = {"issuers": 150, "points": 200, "shops": 2000, "rewards": 300}
+
+# 1枚あたりに引くショップ数
+SHOP_LOOKUPS_PER_CARD = 4
+
+# マスタにない名前（ライター間で登録が競合する）を使う割合と、その名前の種類
+NEW_MASTER_RATE = 0.05
+NEW_MASTER_POOL = 50
+
+# エラー番号と集計名（MySQL）
+MYSQL_ERROR_KINDS = {1213: "deadlocks", 1205: "lock_wait_timeouts", 1062: "duplicate_keys"}
+
+
+def error_kind(error: Exception) -> str:
+    """DBエラーの集計名"""
+    if isinstance(error, sqlite3.OperationalError) and "locked" in str(error):
+        return "busy"
+    if isinstance(error, sqlite3.IntegrityError):
+        return "duplicate_keys"
+    return MYSQL_ERROR_KINDS.get(getattr(error, "errno", None), "errors")
+
+
+class CountingCursor:
+    """実行時のエラーを種類ごとに数えるカーソル（エラーはそのまま呼び出し元へ送る）"""
+
+    def __init__(self, cursor, counters: Counter):
+        self._cursor = cursor
+        self._counters = counters
+
+    def execute(self, *args, **kwargs):
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        except (Error, sqlite3.Error) as e:
+            self._counters[error_kind(e)] += 1
+            raise
+
+    def executemany(self, *args, **kwargs):
+        try:
+            return self._cursor.executemany(*args, **kwargs)
+        except (Error, sqlite3.Error) as e:
+            self._counters[error_kind(e)] += 1
+            raise
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """コミット回数とカーソルのエラーを数える接続"""
+
+    def __init__(self, connection, counters: Counter):
+        self._connection = connection
+        self._counters = counters
+
+    def cursor(self, *args, **kwargs) -> CountingCursor:
+        return CountingCursor(self._connection.cursor(*args, **kwargs), self._counters)
+
+    def commit(self) -> None:
+        self._counters["commits"] += 1
+        self._connection.commit()
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection, name)
+
+
+def counting_handler(base: type, database: str) -> DatabaseHandler:
+    """接続（再接続を含む）をCountingConnectionで包んだハンドラーを作成"""
+
+    class CountingHandler(base):
+        def __init__(self, database: str):
+            self.counters: Counter = Counter()
+            super().__init__(database)
+
+        def connect(self) -> None:
+            super().connect()
+            self.connection = CountingConnection(self.connection, self.counters)
+
+    return CountingHandler(database)
+
+
+def seed_masters(db_handler: DatabaseHandler) -> None:
+    """発行会社・ポイント・ショップ・交換先のマスタを登録"""
+    cursor = db_handler.connection.cursor()
+    cursor.executemany("INSERT INTO m_issuers (issuer_name) VALUES (%s)",
+                       [(f"発行会社{i}",) for i in range(MASTER_VOLUMES["issuers"])])
+    cursor.executemany("INSERT INTO m_points (point_name, expiration) VALUES (%s, %s)",
+                       [(f"ポイント{i}", "2年") for i in range(MASTER_VOLUMES["points"])])
+    cursor.executemany("INSERT INTO shops (shop_name, is_online, category, created_by) VALUES (%s, %s, %s, %s)",
+                       [(f"ショップ{i}", False, "通販", "kakaku") for i in range(MASTER_VOLUMES["shops"])])
+    cursor.executemany("INSERT INTO m_exchangeable_rewards (category, reward_name, unit) VALUES (%s, %s, %s)",
+                       [("ギフト券", f"交換先{i}", "円") for i in range(MASTER_VOLUMES["rewards"])])
+    db_handler.connection.commit()
+
+
+def server_counters(db_handler: DatabaseHandler) -> Dict[str, int]:
+    """MySQLサーバー全体のコミット数・行ロック待ち・デッドロックの累計"""
+    cursor = db_handler.connection.cursor()
+    cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Com_commit', 'Innodb_row_lock_waits')")
+    counters = {name.lower(): int(value) for name, value in cursor.fetchall()}
+    cursor.execute("SELECT `COUNT` FROM information_schema.INNODB_METRICS WHERE NAME = 'lock_deadlocks'")
+    row = cursor.fetchone()
+    counters["lock_deadlocks"] = int(row[0]) if row else 0
+    return counters
+
+
+def master_name(rng: random.Random, prefix: str, volume: int) -> str:
+    """登録済みのマスタ名（一部はマスタにない名前）"""
+    if rng.random() < NEW_MASTER_RATE:
+        return f"追加{prefix}{rng.randrange(NEW_MASTER_POOL)}"
+    return f"{prefix}{rng.randrange(volume)}"
+
+
+def write_card(db_handler: DatabaseHandler, index: int, rng: random.Random, timed: Callable) -> None:
+    """スクレイピング1枚分の参照と書き込みを、メソッドごとに計測しながら実行"""
+    kakaku_card_id = f"{100000 + index}"
+    card_data = CardRecord(
+        kakaku_card_id=kakaku_card_id,
+        card_name=f"カード{index}",
+        grade=rng.choice(["一般", "ゴールド", "プラチナ"]),
+        issuer_id=timed("get_issuer_id", db_handler.get_issuer_id, master_name(rng, "発行会社", MASTER_VOLUMES["issuers"])),
+        point_id=timed("get_point_id", db_handler.get_point_id, {
+            "point_name": master_name(rng, "ポイント", MASTER_VOLUMES["points"]), "expiration": "2年",
+        }),
+        visa=True, mastercard=False, jcb=False, amex=False, diners=False, unionpay=False,
+        eligibility="18歳以上",
+        annual_fee_raw="永年無料",
+        remarks=f"備考{rng.random()}",
+    )
+    card_id = timed("upsert_card", db_handler.upsert_card, card_data)
+    timed("get_card_id", db_handler.get_card_id, kakaku_card_id)
+
+    for _ in range(SHOP_LOOKUPS_PER_CARD):
+        timed("get_shop_id", db_handler.get_shop_id, {
+            "shop_name": master_name(rng, "ショップ", MASTER_VOLUMES["shops"]), "is_online": False, "category": "通販",
+        })
+    for _ in range(EXCHANGES_PER_CARD):
+        reward_id = timed("get_reward_id", db_handler.get_reward_id, {
+            "category": "ギフト券", "reward_name": master_name(rng, "交換先", MASTER_VOLUMES["rewards"]), "unit": "円",
+        })
+        timed("upsert_point_exchange", db_handler.upsert_point_exchange, ExchangeRecord(
+            card_id=card_id, exchangeable_reward_id=reward_id,
+            before_value=rng.randint(1, 10), after_value=1, remarks="",
+        ))
+    for i in range(INSURANCES_PER_CARD):
+        timed("upsert_include_insurance", db_handler.upsert_include_insurance, InsuranceRecord(
+            card_id=card_id, category=f"保険{i % 2}", coverage_type=f"補償{i}",
+            coverage_amount=f"{rng.randint(1, 50) * 100}万円", remarks="",
+        ))
+    for i in range(SERVICES_PER_CARD):
+        timed("upsert_include_service", db_handler.upsert_include_service, ServiceRecord(
+            card_id=card_id, service_name=f"サービス{i}", service_content=f"内容{rng.random()}", remarks="",
+        ))
+
+
+def percentiles(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        "count": len(timings),
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+    }
+
+
+def run_writers(backend: str, database: str, writers: int, cards: int) -> Dict[str, Any]:
+    """空のDBにマスタを登録し、writers個のスレッドから同時に書き込む
+
+    各ライターは同じcards枚のカードから無作為に選んで書き込むため、同じ行への書き込みが競合する。
+    """
+    setup = open_backend(backend, database)
+    seed_masters(setup)
+    before = server_counters(setup) if backend == "mysql" else {}
+    timings: Dict[str, List[float]] = defaultdict(list)
+    counters: Counter = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(writers + 1)
+    failures: List[BaseException] = []
+
+    def work(index: int) -> None:
+        try:
+            db_handler = counting_handler(type(setup), setup.database)
+        except BaseException as e:
+            # 接続できなかったライターがいれば、バリアで待っている他のスレッドとメインスレッドを解放する
+            # （エラーはメインスレッドで送出する）
+            failures.append(e)
+            barrier.abort()
+            return
+        rng = random.Random(index)
+        local_timings: Dict[str, List[float]] = defaultdict(list)
+
+        def timed(name: str, method: Callable, *args) -> Any:
+            started_at = time.perf_counter()
+            try:
+                return method(*args)
+            except Exception:
+                # 再試行しないエラー（SQLiteのロック待ちのタイムアウトなど）は書き込みを取り消す
+                db_handler.counters["failed_ops"] += 1
+                db_handler.connection.rollback()
+                raise
+            finally:
+                local_timings[name].append(time.perf_counter() - started_at)
+
+        try:
+            barrier.wait()
+            for _ in range(cards):
+                try:
+                    write_card(db_handler, rng.randrange(cards), rng, timed)
+                except Exception as e:
+                    print(f"書き込みに失敗: {e}")
+        except threading.BrokenBarrierError:
+            # 他のライターが接続できず、計測を打ち切った
+            return
+        finally:
+            with lock:
+                for name, values in local_timings.items():
+                    timings[name].extend(values)
+                counters.update(db_handler.counters)
+            db_handler.close()
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    try:
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            for thread in threads:
+                thread.join()
+            raise failures[0]
+        started_at = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+
+        all_timings = [value for values in timings.values() for value in values]
+        result = {
+            "writers": writers,
+            "elapsed_sec": elapsed,
+            "cards_per_sec": writers * cards / elapsed,
+            "ops_per_sec": len(all_timings) / elapsed,
+            "latency": percentiles(all_timings),
+            "ops": {name: percentiles(values) for name, values in sorted(timings.items())},
+            "commits": counters["commits"],
+            "deadlocks": counters["deadlocks"],
+            "lock_wait_timeouts": counters["lock_wait_timeouts"],
+            "busy": counters["busy"],
+            "duplicate_keys": counters["duplicate_keys"],
+            "errors": counters["errors"],
+            "failed_ops": counters["failed_ops"],
+        }
+        if backend == "mysql":
+            after = server_counters(setup)
+            result["server"] = {name: after[name] - before.get(name, 0) for name in after}
+        return result
+    finally:
+        setup.close()
+
+
+def run_write_benchmark(
+    backends: List[str], database: str, writer_counts: List[int], cards: int = 100
+) -> Dict[str, Any]:
+    """バックエンドごとに、同時書き込み数を変えて書き込みのスループットを計測"""
+    results: Dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "cards_per_writer": cards,
+        "backends": {},
+    }
+    for backend in backends:
+        levels = []
+        for writers in writer_counts:
+            try:
+                levels.append(run_writers(backend, database, writers, cards))
+            except Error as e:
+                print(f"{backend}: 接続できないためスキップします ({e})")
+                break
+        if levels:
+            results["backends"][backend] = levels
+    return results